@@ -0,0 +1,194 @@
+import asyncio
+import heapq
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class AdmissionRejected(Exception):
+    """A run was refused; maps onto an HTTP 429 or 503 with Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admission control in front of the agent
+
+    At most `max_concurrent` runs execute at once. Further runs wait in a
+    priority queue (FIFO within a priority) of at most `max_queue` entries.
+    A client may have at most `per_client` runs running, queued or waiting
+    for their session. When a
+    limit is hit the run is refused right away instead of piling up, and a
+    queued run that waits longer than `queue_timeout` seconds is refused too.
+    Retry-After is estimated from recent run durations and the queue depth.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 64,
+        per_client: int = 4,
+        queue_timeout: float = 30.0,
+        window: int = 1000,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.per_client = per_client
+        self.queue_timeout = queue_timeout
+
+        self.running = 0
+        self.queued = 0
+        self._clients: Dict[str, int] = {}
+        # Turns waiting for their client to drop below per_client
+        self._client_waiters: Dict[str, List[asyncio.Future]] = {}
+        # (priority, arrival sequence, future resolved when the run may start)
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = 0
+
+        self._waits = deque(maxlen=window)
+        self._durations = deque(maxlen=window)
+        self.admitted = 0
+        self.completed = 0
+        self.rejected_client = 0
+        self.rejected_full = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free"""
+        average = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        return max(1, math.ceil(average * (self.queued + 1) / self.max_concurrent))
+
+    def check(self, client_id: str):
+        """Raise AdmissionRejected if a new run from this client would be refused"""
+        if self._clients.get(client_id, 0) >= self.per_client:
+            self.rejected_client += 1
+            raise AdmissionRejected(429, "Too many concurrent requests for this client", self.retry_after())
+        if self.running >= self.max_concurrent and self.queued >= self.max_queue:
+            self.rejected_full += 1
+            raise AdmissionRejected(503, "Server is busy, try again later", self.retry_after())
+
+    @asynccontextmanager
+    async def client(self, client_id: str, wait: bool = False):
+        """Count a turn against its client's limit for as long as it is held
+
+        Take this first, then anything the turn waits on (such as its
+        session's lock), and the run slot last, so turns waiting on something
+        else still count for their client but never hold a run slot.
+
+        With `wait`, a turn over its client's limit waits up to
+        `queue_timeout` seconds for one of the client's turns to finish
+        instead of being refused; batch work uses this.
+        """
+        if wait:
+            await self._wait_for_client(client_id)
+        self.check(client_id)
+        self._clients[client_id] = self._clients.get(client_id, 0) + 1
+        try:
+            yield
+        finally:
+            self._clients[client_id] -= 1
+            if not self._clients[client_id]:
+                del self._clients[client_id]
+            self._wake_client(client_id)
+
+    async def _wait_for_client(self, client_id: str):
+        deadline = time.monotonic() + self.queue_timeout
+        while self._clients.get(client_id, 0) >= self.per_client:
+            future = asyncio.get_running_loop().create_future()
+            waiters = self._client_waiters.setdefault(client_id, [])
+            waiters.append(future)
+            try:
+                await asyncio.wait_for(future, deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise AdmissionRejected(429, "Timed out waiting for this client's other requests", self.retry_after())
+            finally:
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters:
+                    self._client_waiters.pop(client_id, None)
+
+    def _wake_client(self, client_id: str):
+        for future in self._client_waiters.get(client_id, []):
+            if not future.done():
+                future.set_result(None)
+                return
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """Wait for, then hold, a run slot"""
+        await self._acquire(priority)
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._durations.append(time.monotonic() - started)
+            self.completed += 1
+            self._release()
+
+    async def _acquire(self, priority: int):
+        enqueued = time.monotonic()
+        if self.running < self.max_concurrent and not self.queued:
+            self.running += 1
+            self._waits.append(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._heap, (priority, self._sequence, future))
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the future, so it is skipped when slots free up
+            self.queued -= 1
+            self.timed_out += 1
+            raise AdmissionRejected(503, "Timed out waiting for a free slot", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the slot on
+                self._release()
+            else:
+                future.cancel()
+                self.queued -= 1
+            raise
+        self._waits.append(time.monotonic() - enqueued)
+
+    def _release(self):
+        self.running -= 1
+        while self._heap and self.running < self.max_concurrent:
+            _, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue
+            self.queued -= 1
+            self.running += 1
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, object]:
+        waits = sorted(self._waits)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected_client": self.rejected_client,
+            "rejected_full": self.rejected_full,
+            "timed_out": self.timed_out,
+            "wait_avg": sum(waits) / len(waits) if waits else None,
+            "wait_p95": waits[min(int(len(waits) * 0.95), len(waits) - 1)] if waits else None,
+        }
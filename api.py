@@ -1,11 +1,15 @@
-from fastapi import FastAPI, HTTPException
+# Imported first so the startup profile covers every import below
+from startup_profile import profile
+from fastapi import FastAPI, HTTPException, Header, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Iterator, Tuple, Dict, List
+from typing import Optional, Iterator, AsyncIterator, Tuple, Dict, List, Union
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 import json
+import time
 from langchain_core.messages import HumanMessage, AIMessage
 import uuid
 import os
@@ -13,22 +17,67 @@ import os
 # Import agent-related functions
 from chatbot import initialize_agent
 from conversation_manager import ConversationManager
+from session_locks import AsyncSessionLocks
+from maintenance import MaintenanceService
+from event_stream import RunStream, RunStreams, format_sse
+from admission import AdmissionController, AdmissionRejected, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from tools import cancellation, http_client, http_fixtures, jobs, resilience, response_cache, single_flight
+from cdp_wallet import get_wallet_service
 
 # Global variables for agent and config
 agent_instance = None
 agent_config = None
 conversation_manager = None
+maintenance = None
+job_manager = None
 conversation_histories: Dict[str, List[dict]] = {}
+# The wallet shared with the agent's CDP tools
+wallet_service = get_wallet_service()
+session_locks = AsyncSessionLocks()
+run_streams = RunStreams(retention=float(os.getenv("STREAM_RETENTION", "60")))
+# How long a token stream may have no client before its run is cancelled
+stream_abandon_grace = float(os.getenv("STREAM_ABANDON_GRACE", "15"))
+websocket_stats = {"connections": 0, "active": 0, "turns": 0, "cancelled_turns": 0}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize the agent and conversation manager on startup
-    global agent_instance, agent_config, conversation_manager
+    global agent_instance, agent_config, conversation_manager, maintenance, job_manager
     print("Initializing agent...")
-    agent_instance, agent_config = initialize_agent()
-    conversation_manager = ConversationManager()
+    # Synchronous tools (CDP, DALL-E, browser) run in this pool during astream
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_WORKER_THREADS", "32")), thread_name_prefix="agent")
+    )
+    # Checkpoints are pruned by the maintenance service below, not by the checkpointer
+    agent_instance, agent_config = initialize_agent(prune_checkpoints=False)
+    with profile.phase("conversation store"):
+        conversation_manager = ConversationManager()
+    # Slow tools run as background jobs; their progress is followed on this loop
+    with profile.phase("job store"):
+        job_manager = jobs.get_job_manager()
+    job_manager.attach_loop(asyncio.get_running_loop())
+    # Expire idle sessions and compact storage in the background
+    session_ttl = os.getenv("SESSION_TTL")
+    maintenance = MaintenanceService(
+        conversation_manager,
+        checkpointer=agent_instance.checkpointer,
+        session_ttl=float(session_ttl) if session_ttl else None,
+        interval=float(os.getenv("MAINTENANCE_INTERVAL", "300")),
+        job_manager=job_manager,
+        job_retention=float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600))),
+    )
+    maintenance.start()
+    profile.ready()
+    print(profile.format())
     yield
-    # Cleanup on shutdown
+    await maintenance.stop()
+    maintenance = None
+    job_manager.shutdown()
+    job_manager = None
+    await http_client.aclose()
+    # Cleanup on shutdown: persist every queued message before closing the store
+    conversation_manager.flush()
+    conversation_manager.close()
     agent_instance = None
     agent_config = None
     conversation_manager = None
@@ -52,25 +101,150 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     message: str
     stream: bool = False
+    # With stream=True, relay LLM tokens as Server-Sent Events instead of whole messages
+    tokens: bool = False
     session_id: Optional[str] = None
 
-def get_run_config():
-    """Get configuration for a new run with required checkpointer keys"""
+class BatchItem(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    # Plain strings run in new sessions of their own
+    messages: List[Union[str, BatchItem]]
+    concurrency: Optional[int] = None
+
+def get_run_config(session_id: str):
+    """Get the run configuration; each session is one checkpointer thread"""
     return {
         "configurable": {
-            "thread_id": str(uuid.uuid4()),
-            "checkpoint_id": str(uuid.uuid4()),
-            "checkpoint_ns": "chat_session"
+            "thread_id": session_id
         }
     }
 
-def get_tool_description(chunk):
+async def get_agent_input(session_id: str, user_message: HumanMessage, run_config: dict):
+    """Build the graph input for a turn
+
+    A session with a checkpoint resumes from it: the new message is sent
+    along with the updates that fold turns over the token budget into the
+    thread's stored summary. Otherwise (new session, or its checkpoints were
+    pruned) the thread is seeded from the stored conversation history.
+    """
+    state = await agent_instance.aget_state(run_config)
+    messages = state.values.get("messages")
+    if messages:
+        # The summarizer may call an LLM
+        updates, _ = await asyncio.to_thread(
+            conversation_manager.window.fold_state, [*messages, user_message]
+        )
+        return {"messages": [*updates, user_message]}
+    return {"messages": await asyncio.to_thread(conversation_manager.get_context, session_id)}
+
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_RUNS", "8")),
+    max_queue=int(os.getenv("MAX_QUEUED_RUNS", "64")),
+    per_client=int(os.getenv("MAX_RUNS_PER_CLIENT", "4")),
+    queue_timeout=float(os.getenv("QUEUE_TIMEOUT", "30")),
+)
+
+def get_client_id(raw_request: Request) -> str:
+    """Identify the caller for per-client limits"""
+    client_id = raw_request.headers.get("X-Client-Id")
+    if client_id:
+        return client_id
+    return raw_request.client.host if raw_request.client else "anonymous"
+
+async def run_agent(
+    message: str,
+    session_id: str,
+    client_id: str = "anonymous",
+    priority: int = PRIORITY_INTERACTIVE,
+    wait_for_client: bool = False,
+) -> AsyncIterator[dict]:
+    """Run one turn of the agent for a session, yielding its events
+
+    The graph is driven with astream_events, so the event loop stays free
+    while the LLM and tools work; synchronous tools run in the agent thread
+    pool. Turns of one session run in arrival order, and the admission
+    controller decides when the turn may start (see AdmissionController).
+    With wait_for_client, a turn over its client's limit waits for the
+    client's other turns instead of being refused.
+
+    If the consumer goes away (client disconnect), the run's cancel scope is
+    cancelled, which also aborts in-flight tool HTTP requests.
+
+    Yields dicts with a "type" of:
+        token       an LLM token delta of the agent
+        message     a complete agent message with content
+        tool_start  a tool call starting (tool, call_id, input)
+        tool_end    a tool call returning (tool, call_id, content)
+    """
+    scope = cancellation.open_scope()
+    # Background jobs started by this turn's tools belong to the session
+    jobs.set_session(session_id)
+    events = _run_agent(message, session_id, client_id, priority, wait_for_client)
+    try:
+        async for event in events:
+            yield event
+    except (asyncio.CancelledError, GeneratorExit):
+        scope.cancel("client disconnected")
+        cancellation.record_cancelled_run()
+        raise
+    finally:
+        # Release the admission slot and session lock right away
+        await events.aclose()
+
+async def _run_agent(
+    message: str, session_id: str, client_id: str, priority: int, wait_for_client: bool
+) -> AsyncIterator[dict]:
+    # Queued turns of one session wait for its lock without holding a run slot
+    async with admission.client(client_id, wait_for_client), session_locks.hold(session_id), admission.slot(priority):
+        run_config = get_run_config(session_id)
+        response = []
+
+        # Add user message to history; off the loop, as it waits for the
+        # session's lock and for room in the write-behind queue
+        user_message = HumanMessage(content=message)
+        await asyncio.to_thread(conversation_manager.add_message, session_id, user_message)
+
+        agent_input = await get_agent_input(session_id, user_message, run_config)
+        async for event in agent_instance.astream_events(agent_input, run_config, version="v2"):
+            kind = event["event"]
+            from_agent = event.get("metadata", {}).get("langgraph_node") == "agent"
+            if kind == "on_chat_model_stream" and from_agent:
+                delta = event["data"]["chunk"].content
+                if delta and isinstance(delta, str):
+                    yield {"type": "token", "content": delta}
+            elif kind == "on_chat_model_end" and from_agent:
+                content = event["data"]["output"].content
+                if content:
+                    response.append(content)
+                    yield {"type": "message", "content": content}
+            elif kind == "on_tool_start":
+                yield {
+                    "type": "tool_start",
+                    "tool": event["name"],
+                    "call_id": event["run_id"],
+                    "input": event["data"].get("input"),
+                }
+            elif kind == "on_tool_end":
+                output = event["data"].get("output")
+                yield {
+                    "type": "tool_end",
+                    "tool": event["name"],
+                    "call_id": event["run_id"],
+                    "content": str(getattr(output, "content", output)),
+                }
+
+        # Add agent's response to history
+        if response:
+            ai_message = AIMessage(content=" ".join(response))
+            await asyncio.to_thread(conversation_manager.add_message, session_id, ai_message)
+
+def get_tool_description(tool_message: str):
     """Extract a user-friendly description of what tool is being used"""
-    if "tools" in chunk:
+    if tool_message is not None:
         try:
-            # Get the raw tool message
-            tool_message = chunk["tools"]["messages"][0].content
-            
             # Try to parse it as JSON first
             try:
                 tool_data = json.loads(tool_message)
@@ -110,19 +284,9 @@ def get_tool_description(chunk):
             }
     return None
 
-async def stream_response(message: str, session_id: str) -> Iterator[str]:
+async def stream_response(message: str, session_id: str, client_id: str) -> AsyncIterator[str]:
     """Stream the agent's response"""
     try:
-        run_config = get_run_config()
-        current_response = []
-        
-        # Add user message to history
-        user_message = HumanMessage(content=message)
-        conversation_manager.add_message(session_id, user_message)
-        
-        # Get full conversation history
-        history = conversation_manager.get_history(session_id)
-
         # Send session ID first
         yield json.dumps({
             "type": "session",
@@ -130,20 +294,15 @@ async def stream_response(message: str, session_id: str) -> Iterator[str]:
             "session_id": session_id
         }) + "\n"
         
-        for chunk in agent_instance.stream(
-            {"messages": history},
-            run_config
-        ):
-            if "agent" in chunk and chunk["agent"]["messages"][0].content:
-                content = chunk["agent"]["messages"][0].content
-                current_response.append(content)
+        async for event in run_agent(message, session_id, client_id):
+            if event["type"] == "message":
                 yield json.dumps({
                     "type": "message",
-                    "content": content,
+                    "content": event["content"],
                     "session_id": session_id
                 }) + "\n"
-            elif "tools" in chunk:
-                tool_desc = get_tool_description(chunk)
+            elif event["type"] == "tool_end":
+                tool_desc = get_tool_description(event["content"])
                 if tool_desc:
                     yield json.dumps({
                         "type": "tool",
@@ -151,11 +310,6 @@ async def stream_response(message: str, session_id: str) -> Iterator[str]:
                         "session_id": session_id
                     }) + "\n"
         
-        # Add agent's response to history
-        if current_response:
-            ai_message = AIMessage(content=" ".join(current_response))
-            conversation_manager.add_message(session_id, ai_message)
-        
         # Send completion message
         yield json.dumps({
             "type": "complete",
@@ -170,75 +324,398 @@ async def stream_response(message: str, session_id: str) -> Iterator[str]:
             "session_id": session_id
         }) + "\n"
 
+def rejection_response(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+async def produce_run_events(stream: RunStream, message: str, client_id: str):
+    """Run the agent for a run stream, publishing every event into it"""
+    try:
+        stream.publish("session", {"session_id": stream.session_id, "run_id": stream.run_id})
+        async for event in run_agent(message, stream.session_id, client_id):
+            if event["type"] in ("token", "message"):
+                run_streams.first_token(stream)
+            stream.publish(event.pop("type"), event)
+        stream.publish("complete", {"ttft": stream.ttft, "duration": time.monotonic() - stream.started})
+    except asyncio.CancelledError:
+        stream.publish("cancelled", {"content": "Run cancelled: no client connected"})
+        raise
+    except Exception as e:
+        stream.publish("error", {"content": str(e)})
+    finally:
+        stream.close()
+
+async def sse_response(stream: RunStream, last_event_id: int = 0) -> AsyncIterator[str]:
+    """Relay a run stream as Server-Sent Events, starting after last_event_id"""
+    try:
+        async for event_id, event, data in stream.follow(last_event_id):
+            yield format_sse(event_id, event, data)
+    finally:
+        if not stream.done and not stream.subscribers:
+            # Give the client a moment to reconnect before giving up on the run
+            asyncio.get_running_loop().call_later(stream_abandon_grace, cancel_if_abandoned, stream)
+
+def cancel_if_abandoned(stream: RunStream):
+    if not stream.done and not stream.subscribers and stream.task is not None:
+        stream.task.cancel()
+
+async def run_until_disconnected(raw_request: Request, coro, poll_interval: float = 1.0):
+    """Await coro, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await raw_request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
 @app.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, raw_request: Request):
     """
     Chat with the agent
     
     If stream=True, returns a streaming response
+    If stream=True and tokens=True, streams LLM tokens and tool events as SSE
     If stream=False, returns a regular JSON response
+
+    Returns 429 (per-client limit) or 503 (queue full) with Retry-After
+    when the request cannot be admitted.
     """
     if agent_instance is None or conversation_manager is None:
         raise HTTPException(status_code=500, detail="Agent not initialized")
     
+    client_id = get_client_id(raw_request)
+    try:
+        # Refuse fast, before a streaming response has been started
+        admission.check(client_id)
+    except AdmissionRejected as e:
+        raise rejection_response(e)
+    
     try:
         # Create or get session ID
         session_id = request.session_id or str(uuid.uuid4())
         
-        if request.stream:
+        if request.stream and request.tokens:
+            stream = run_streams.create(session_id)
+            # The run is not tied to this connection, so a client can resume it
+            stream.task = asyncio.create_task(produce_run_events(stream, request.message, client_id))
+            return StreamingResponse(
+                sse_response(stream),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Run-Id": stream.run_id}
+            )
+        elif request.stream:
             return StreamingResponse(
-                stream_response(request.message, session_id),
+                stream_response(request.message, session_id, client_id),
                 media_type='text/event-stream'
             )
         else:
-            # Add user message to history
-            user_message = HumanMessage(content=request.message)
-            conversation_manager.add_message(session_id, user_message)
-            
-            response = []
-            run_config = get_run_config()
-            for chunk in agent_instance.stream(
-                {"messages": conversation_manager.get_history(session_id)},
-                run_config
-            ):
-                if "agent" in chunk and chunk["agent"]["messages"][0].content:
-                    response.append(chunk["agent"]["messages"][0].content)
-            
-            # Add agent's response to history
-            if response:
-                ai_message = AIMessage(content=" ".join(response))
-                conversation_manager.add_message(session_id, ai_message)
-            
+            async def collect():
+                response = []
+                async for event in run_agent(request.message, session_id, client_id):
+                    if event["type"] == "message":
+                        response.append(event["content"])
+                return response
+
+            response = await run_until_disconnected(raw_request, collect())
             return {"response": " ".join(response)}
             
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise rejection_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def batch_response(items: List[BatchItem], client_id: str, concurrency: int) -> AsyncIterator[str]:
+    """Run batch items on a bounded worker pool, emitting NDJSON as each one finishes"""
+    started = time.monotonic()
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        pending.put_nowait((index, item))
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                index, item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            session_id = item.session_id or str(uuid.uuid4())
+            item_started = time.monotonic()
+            result = {"index": index, "session_id": session_id}
+            try:
+                response = []
+                # Items count against the caller's own quota, waiting for room in it
+                async for event in run_agent(item.message, session_id, client_id, PRIORITY_BATCH, wait_for_client=True):
+                    if event["type"] == "message":
+                        response.append(event["content"])
+                result.update(type="result", response=" ".join(response))
+            except AdmissionRejected as e:
+                result.update(type="error", content=e.detail, status_code=e.status_code)
+            except Exception as e:
+                result.update(type="error", content=str(e))
+            result["latency"] = time.monotonic() - item_started
+            await finished.put(result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(items)))]
+    latencies = []
+    failed = 0
+    try:
+        for _ in range(len(items)):
+            result = await finished.get()
+            latencies.append(result["latency"])
+            failed += result["type"] == "error"
+            yield json.dumps(result) + "\n"
+
+        latencies.sort()
+        yield json.dumps({
+            "type": "summary",
+            "items": len(items),
+            "succeeded": len(items) - failed,
+            "failed": failed,
+            "concurrency": len(workers),
+            "makespan": time.monotonic() - started,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p95": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None,
+        }) + "\n"
+    finally:
+        # On disconnect, cancel whatever is still running
+        for task in workers:
+            task.cancel()
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, raw_request: Request):
+    """
+    Run many prompts concurrently, streaming NDJSON results as they finish
+
+    Each line is a "result" or "error" for one item (with its index and
+    latency), followed by a final "summary" with the makespan. Items run at
+    batch priority, behind interactive requests, on at most `concurrency`
+    workers (BATCH_CONCURRENCY by default, capped one below MAX_RUNS_PER_CLIENT).
+    """
+    if agent_instance is None or conversation_manager is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+    if not request.messages:
+        raise HTTPException(status_code=400, detail="No messages given")
+    max_items = int(os.getenv("MAX_BATCH_ITEMS", "500"))
+    if len(request.messages) > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} messages per batch")
+
+    items = [BatchItem(message=item) if isinstance(item, str) else item for item in request.messages]
+    concurrency = request.concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+    # Each worker holds one of the caller's per-client slots; leave one free
+    # for the same client's interactive requests
+    concurrency = max(1, min(concurrency, admission.per_client - 1))
+    return StreamingResponse(
+        batch_response(items, get_client_id(raw_request), concurrency),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/chat/stream/{run_id}")
+async def resume_stream(run_id: str, last_event_id: Optional[int] = Header(None)):
+    """
+    Resume the SSE stream of a token-streaming run
+
+    Events after the Last-Event-ID header are replayed, then the stream
+    follows the run live. Runs stay available for STREAM_RETENTION seconds
+    after they finish.
+    """
+    stream = run_streams.get(run_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return StreamingResponse(
+        sse_response(stream, last_event_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+class WebSocketChat:
+    """One WebSocket connection, bound to one session for its whole life
+
+    Turns run one at a time in a task of their own, so the connection keeps
+    reading while the agent works and a "cancel" message can stop the turn.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, client_id: str):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.client_id = client_id
+        self.turn: Optional[asyncio.Task] = None
+        self.turn_id: Optional[str] = None
+        # Turn events and replies to the client are sent from different tasks
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, event: str, **data):
+        async with self._send_lock:
+            await self.websocket.send_json({"type": event, "session_id": self.session_id, **data})
+
+    async def start_turn(self, message: str, turn_id: Optional[str]):
+        if self.turn is not None and not self.turn.done():
+            await self.send("error", turn_id=turn_id, content="A turn is already running; cancel it or wait for it to complete")
+            return
+        self.turn_id = turn_id or str(uuid.uuid4())
+        self.turn = asyncio.create_task(self.run_turn(message, self.turn_id))
+
+    async def run_turn(self, message: str, turn_id: str):
+        started = time.monotonic()
+        ttft = None
+        websocket_stats["turns"] += 1
+        try:
+            await self.send("start", turn_id=turn_id)
+            async for event in run_agent(message, self.session_id, self.client_id):
+                if ttft is None and event["type"] in ("token", "message"):
+                    ttft = time.monotonic() - started
+                await self.send(event.pop("type"), turn_id=turn_id, **event)
+            await self.send("complete", turn_id=turn_id, ttft=ttft, duration=time.monotonic() - started)
+        except asyncio.CancelledError:
+            websocket_stats["cancelled_turns"] += 1
+            raise
+        except AdmissionRejected as e:
+            await self.send("error", turn_id=turn_id, content=e.detail, status_code=e.status_code, retry_after=e.retry_after)
+        except Exception as e:
+            try:
+                await self.send("error", turn_id=turn_id, content=str(e))
+            except Exception:
+                # The connection is gone too
+                pass
+
+    async def cancel_turn(self) -> bool:
+        """Cancel the running turn and wait for it to unwind"""
+        if self.turn is None or self.turn.done():
+            return False
+        self.turn.cancel()
+        try:
+            await self.turn
+        except asyncio.CancelledError:
+            pass
+        return True
+
+@app.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Chat with the agent over a WebSocket that stays open across turns
+
+    The connection is bound to one session (the session_id query parameter,
+    or a new one). Client messages are JSON:
+        {"type": "message", "content": "...", "id": "optional turn id"}
+        {"type": "cancel"}
+        {"type": "ping"}
+    The server pushes the same events as the token stream (token, message,
+    tool_start, tool_end), bracketed by "start" and "complete", each tagged
+    with the turn id. A cancelled turn ends with "cancelled". Closing the
+    connection cancels the running turn.
+    """
+    await websocket.accept()
+    if agent_instance is None or conversation_manager is None:
+        await websocket.close(code=1011, reason="Agent not initialized")
+        return
+
+    client_id = websocket.headers.get("X-Client-Id") or (websocket.client.host if websocket.client else "anonymous")
+    chat = WebSocketChat(websocket, session_id or str(uuid.uuid4()), client_id)
+    websocket_stats["connections"] += 1
+    websocket_stats["active"] += 1
+    try:
+        await chat.send("session", content="Session started")
+        while True:
+            try:
+                request = await websocket.receive_json()
+            except (json.JSONDecodeError, KeyError):
+                await chat.send("error", content="Expected a JSON message")
+                continue
+            kind = request.get("type", "message") if isinstance(request, dict) else None
+
+            if kind == "message" and isinstance(request.get("content"), str):
+                await chat.start_turn(request["content"], request.get("id"))
+            elif kind == "cancel":
+                turn_id = chat.turn_id
+                if await chat.cancel_turn():
+                    await chat.send("cancelled", turn_id=turn_id, content="Run cancelled by client")
+                else:
+                    await chat.send("error", content="No turn is running")
+            elif kind == "ping":
+                await chat.send("pong")
+            else:
+                await chat.send("error", content="Unknown message; expected message, cancel or ping")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        websocket_stats["active"] -= 1
+        await chat.cancel_turn()
+
+def get_job_or_404(job_id: str) -> dict:
+    if job_manager is None:
+        raise HTTPException(status_code=500, detail="Job manager not initialized")
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs")
+async def list_jobs(session_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    """List recent background jobs, newest first, optionally of one session or status"""
+    if job_manager is None:
+        raise HTTPException(status_code=500, detail="Job manager not initialized")
+    return {"jobs": await asyncio.to_thread(job_manager.list, session_id, status, min(limit, 500))}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get a background job: its status (queued, running, succeeded, failed,
+    cancelled or interrupted), latest progress, and result or error
+    """
+    return await asyncio.to_thread(get_job_or_404, job_id)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id: Optional[int] = Header(None)):
+    """
+    Follow a background job as Server-Sent Events
+
+    Streams "status" and "progress" events, then one of "succeeded",
+    "failed" or "cancelled" with the result or error. Events after the
+    Last-Event-ID header are replayed first. For a job that finished longer
+    than STREAM_RETENTION seconds ago, a single event with its final state is
+    sent.
+    """
+    job = await asyncio.to_thread(get_job_or_404, job_id)
+    stream = job_manager.stream(job_id)
+    if stream is None:
+        async def final_state():
+            yield format_sse(1, job["status"], job)
+        events = final_state()
+    else:
+        async def follow():
+            async for event_id, event, data in stream.follow(last_event_id or 0):
+                yield format_sse(event_id, event, data)
+        events = follow()
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running background job"""
+    await asyncio.to_thread(get_job_or_404, job_id)
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    return {"job_id": job_id, "cancelled": True}
+
 @app.get("/wallet/public_address")
 async def get_wallet_public_address():
     """
-    Read the wallets_data.txt file and return the default_address_id.
+    Return the wallet's default address.
+
+    Served from the wallet service's cache; the wallet file is read at most
+    once, and only until the wallet has been loaded.
     """
-    file_path = "./wallet_data.txt"
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Wallet file not found")
-    
     try:
-        # Read the file content (assuming it contains a single JSON object)
-        with open(file_path, "r") as f:
-            content = f.read().strip()
-        
-        wallet_data = json.loads(content)
-        default_address = wallet_data.get("default_address_id")
-        
-        if not default_address:
-            raise HTTPException(
-                status_code=404,
-                detail="default_address_id not found in wallet data"
-            )
-        
-        return {"public_address": default_address}
-    
+        default_address = wallet_service.cached_address or await asyncio.to_thread(wallet_service.address)
     except json.JSONDecodeError:
         raise HTTPException(
             status_code=500,
@@ -247,11 +724,44 @@ async def get_wallet_public_address():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if not default_address:
+        raise HTTPException(status_code=404, detail="Wallet address not found")
+    return {"public_address": default_address}
+
+@app.get("/wallet/balance")
+async def get_wallet_balance(asset_id: str = "eth"):
+    """
+    Return the wallet's balance of an asset (eth by default).
+
+    Balances are cached for WALLET_BALANCE_TTL seconds and refreshed after
+    the agent deploys or mints.
+    """
+    try:
+        balance = await asyncio.to_thread(wallet_service.balance, asset_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"asset_id": asset_id, "balance": str(balance)}
+
 @app.get("/health")
 async def health_check():
     """Check if the API and agent are healthy"""
     return {
         "status": "healthy",
         "agent_initialized": agent_instance is not None,
-        "config_loaded": agent_config is not None
+        "config_loaded": agent_config is not None,
+        "conversation": conversation_manager.stats() if conversation_manager else None,
+        "session_turns": session_locks.stats(),
+        "admission": admission.stats(),
+        "streaming": run_streams.stats(),
+        "websocket": dict(websocket_stats),
+        "cancellation": cancellation.stats(),
+        "single_flight": single_flight.stats(),
+        "http": http_client.stats(),
+        "providers": resilience.stats(),
+        "response_cache": response_cache.stats(),
+        "fixtures": http_fixtures.stats(),
+        "maintenance": maintenance.stats() if maintenance else None,
+        "wallet": wallet_service.stats(),
+        "jobs": job_manager.stats() if job_manager else None,
+        "startup": profile.report()
     }
@@ -0,0 +1,150 @@
+"""Benchmark data tool throughput and agent turn latency
+
+Meant to run against recorded fixtures, so the numbers do not depend on the
+network or the providers' quotas:
+
+    HTTP_FIXTURES=record python benchmark_tools.py --iterations 1   # once, online
+    HTTP_FIXTURES=replay python benchmark_tools.py --concurrency 8   # offline
+
+Each tool is called `--iterations` times, `--concurrency` calls at a time, both
+through its sync version in threads and its async version on one event loop.
+The response cache is off unless --cache is given, so calls reach the
+(replayed) provider; identical calls in flight at once still share one request,
+as they do in the server.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Sample calls of the agent's data tools, with a well-known wallet and token on mainnet
+WALLET = "0xd8dA6BF26964aF9D7eD9e10e5A1ABe2c91536EC5"
+TOKEN = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+
+SCENARIOS = {
+    "fetch_price": {"from_symbol": "ETH", "to_symbols": ["USD", "EUR"]},
+    "fetch_top_market_cap": {"limit": 10},
+    "fetch_news_tool": {"token": "ETH"},
+    "fetch_wallet_balance": {"address": WALLET},
+    "fetch_wallet_tokens": {"address": WALLET},
+    "fetch_token_price": {"token_address": TOKEN},
+    "fetch_defi_positions": {"address": WALLET},
+    "fetch_large_swaps": {},
+    "fetch_gas_fees": {},
+}
+
+
+def _summary(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "throughput": round(len(ordered) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def bench_sync(func, kwargs, iterations, concurrency):
+    def call():
+        started = time.perf_counter()
+        func(**kwargs)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: call(), range(iterations)))
+    return _summary(latencies, time.perf_counter() - started)
+
+
+async def bench_async(func, kwargs, iterations, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            started = time.perf_counter()
+            await func(**kwargs)
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(call() for _ in range(iterations)))
+    return _summary(latencies, time.perf_counter() - started)
+
+
+def bench_agent(prompt, turns):
+    """Latency of whole agent turns, each on a new thread so every turn sends the same requests"""
+    from langchain_core.messages import HumanMessage
+
+    from chatbot import initialize_agent
+
+    agent, _ = initialize_agent()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(turns):
+        config = {"configurable": {"thread_id": f"benchmark-{uuid.uuid4()}"}}
+        turn_started = time.perf_counter()
+        agent.invoke({"messages": [HumanMessage(content=prompt)]}, config)
+        latencies.append(time.perf_counter() - turn_started)
+    return _summary(latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", nargs="*", default=list(SCENARIOS), help="tools to benchmark")
+    parser.add_argument("--iterations", type=int, default=20, help="calls per tool")
+    parser.add_argument("--concurrency", type=int, default=4, help="calls in flight at once")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--agent", metavar="PROMPT", help="also time agent turns answering PROMPT")
+    parser.add_argument("--turns", type=int, default=3, help="agent turns to time")
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ["RESPONSE_CACHE"] = "false"
+
+    import tools
+    from tools import http_client, http_fixtures, resilience
+
+    for name in args.tools:
+        if name not in SCENARIOS:
+            print(f"Error: no sample call for {name}; choose from {', '.join(SCENARIOS)}")
+            sys.exit(1)
+
+    async def run_async():
+        # Every async benchmark on one event loop, so they share one pool
+        return {
+            name: await bench_async(getattr(tools, f"a{name}"), SCENARIOS[name], args.iterations, args.concurrency)
+            for name in args.tools
+        }
+
+    try:
+        results = {
+            name: {"sync": bench_sync(getattr(tools, name), SCENARIOS[name], args.iterations, args.concurrency)}
+            for name in args.tools
+        }
+        for name, summary in asyncio.run(run_async()).items():
+            results[name]["async"] = summary
+    except http_fixtures.FixtureNotFound as e:
+        print(f"Error benchmarking: {e}; record it first with HTTP_FIXTURES=record")
+        sys.exit(1)
+    for name in args.tools:
+        print(f"{name}: sync {results[name]['sync']}, async {results[name]['async']}")
+
+    if args.agent:
+        results["agent_turn"] = bench_agent(args.agent, args.turns)
+        print(f"agent turn: {results['agent_turn']}")
+
+    print(json.dumps({
+        "results": results,
+        "fixtures": http_fixtures.stats(),
+        "http": http_client.stats(),
+        "providers": resilience.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
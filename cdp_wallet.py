@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from cdp_langchain.utils import CdpAgentkitWrapper
+from pydantic import PrivateAttr
+
+from startup_profile import profile
+
+
+class LazyCdpAgentkitWrapper(CdpAgentkitWrapper):
+    """CdpAgentkitWrapper that configures CDP and loads the wallet on first use
+
+    Constructing the regular wrapper configures the SDK and fetches (or
+    creates) the wallet over the network, so every start paid for it even when
+    no onchain tool was called. This one is created empty by a WalletService,
+    which loads the wallet the first time an action needs it.
+    """
+
+    _service: Any = PrivateAttr(default=None)
+
+    @property
+    def loaded(self) -> bool:
+        return self.wallet is not None
+
+    def load(self):
+        return self._service.load()
+
+    def preload(self):
+        self._service.preload()
+
+    def export_wallet(self) -> str:
+        self.load()
+        return super().export_wallet()
+
+    def run_action(self, func, **kwargs) -> str:
+        self.load()
+        return super().run_action(func, **kwargs)
+
+
+class WalletService:
+    """The process-wide CDP wallet
+
+    Every CDP-backed tool and the API share the one wallet it holds. The
+    wallet is loaded once, on first use; the default address and balances are
+    cached (balances for `balance_ttl` seconds, or until `invalidate()` after a
+    transaction). Writes of the wallet file are serialized and atomic, and
+    skipped when the data did not change.
+    """
+
+    def __init__(self, wallet_data_file: str = "wallet_data.txt", balance_ttl: float = 30.0):
+        self.wallet_data_file = wallet_data_file
+        self.balance_ttl = balance_ttl
+        self.agentkit = LazyCdpAgentkitWrapper.model_construct()
+        self.agentkit._service = self
+
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._address: Optional[str] = None
+        self._balances: Dict[str, Tuple[Decimal, float]] = {}
+        # Bumped by invalidate(), so a fetch that raced a transaction is not cached
+        self._generation = 0
+
+        self.loads = 0
+        self.writes = 0
+        self.skipped_writes = 0
+        self.balance_hits = 0
+        self.balance_misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.agentkit.wallet is not None
+
+    @property
+    def wallet(self):
+        return self.load()
+
+    def load(self):
+        """Configure CDP and import (or create) the wallet, once"""
+        if self.agentkit.wallet is not None:
+            return self.agentkit.wallet
+        with self._load_lock:
+            if self.agentkit.wallet is None:
+                with profile.phase("wallet (deferred)"):
+                    self._load()
+        return self.agentkit.wallet
+
+    def preload(self):
+        """Load the wallet in a background thread, so the first action does not wait"""
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Error loading wallet: {e}")
+
+        threading.Thread(target=run, name="wallet-preload", daemon=True).start()
+
+    def _load(self):
+        wallet_data = self._read()
+        values = {}
+        if wallet_data is not None:
+            # If there is a persisted agentic wallet, load it and pass to the CDP Agentkit Wrapper.
+            values = {"cdp_wallet_data": wallet_data}
+        agentkit = CdpAgentkitWrapper(**values)
+        self.agentkit.cdp_api_key_name = agentkit.cdp_api_key_name
+        self.agentkit.cdp_api_key_private_key = agentkit.cdp_api_key_private_key
+        self.agentkit.network_id = agentkit.network_id
+        self.agentkit.wallet = agentkit.wallet
+        self.loads += 1
+        with self._cache_lock:
+            self._address = agentkit.wallet.default_address.address_id
+
+        # Persist the agent's CDP MPC Wallet Data.
+        self.persist()
+
+    def _read(self) -> Optional[str]:
+        if not os.path.exists(self.wallet_data_file):
+            return None
+        with open(self.wallet_data_file) as f:
+            return f.read()
+
+    def persist(self):
+        """Write the wallet data to the wallet file, if it changed"""
+        exported = self.agentkit.export_wallet()
+        with self._write_lock:
+            current = self._read()
+            try:
+                unchanged = current is not None and json.loads(current) == json.loads(exported)
+            except json.JSONDecodeError:
+                unchanged = False
+            if unchanged:
+                self.skipped_writes += 1
+                return
+            # Write to a temporary file first so readers never see a partial file
+            temporary = f"{self.wallet_data_file}.tmp"
+            with open(temporary, "w") as f:
+                f.write(exported)
+            os.replace(temporary, self.wallet_data_file)
+            self.writes += 1
+
+    @property
+    def cached_address(self) -> Optional[str]:
+        """The default address if it is already known, without any I/O"""
+        return self._address
+
+    def address(self) -> Optional[str]:
+        """The wallet's default address
+
+        Read from the wallet file while the wallet itself is not loaded, so
+        looking it up does not need a round trip to CDP.
+        """
+        with self._cache_lock:
+            if self._address is not None:
+                return self._address
+        wallet_data = self._read()
+        if wallet_data is None:
+            return None
+        address = json.loads(wallet_data).get("default_address_id")
+        with self._cache_lock:
+            if self._address is None:
+                self._address = address
+        return address
+
+    def balance(self, asset_id: str = "eth") -> Decimal:
+        """The wallet's balance of an asset, cached for balance_ttl seconds"""
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._balances.get(asset_id)
+            if cached is not None and now - cached[1] < self.balance_ttl:
+                self.balance_hits += 1
+                return cached[0]
+            self.balance_misses += 1
+            generation = self._generation
+        balance = self.wallet.balance(asset_id)
+        with self._cache_lock:
+            if generation == self._generation:
+                self._balances[asset_id] = (balance, time.monotonic())
+        return balance
+
+    def invalidate(self):
+        """Forget cached balances, e.g. after a transaction"""
+        with self._cache_lock:
+            self._generation += 1
+            self._balances.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._cache_lock:
+            return {
+                "loaded": self.loaded,
+                "address": self._address,
+                "loads": self.loads,
+                "writes": self.writes,
+                "skipped_writes": self.skipped_writes,
+                "balance_hits": self.balance_hits,
+                "balance_misses": self.balance_misses,
+                "cached_balances": len(self._balances),
+            }
+
+
+_service: Optional[WalletService] = None
+_service_lock = threading.Lock()
+
+
+def get_wallet_service() -> WalletService:
+    """The shared WalletService, created on first call"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WalletService(
+                os.getenv("WALLET_DATA_FILE", "wallet_data.txt"),
+                balance_ttl=float(os.getenv("WALLET_BALANCE_TTL", "30")),
+            )
+        return _service
@@ -1,129 +1,104 @@
 import os
 import sys
 import time
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
-
-# Import CDP Agentkit Langchain Extension.
-from cdp_langchain.agent_toolkits import CdpToolkit
-from cdp_langchain.utils import CdpAgentkitWrapper
-from cdp_langchain.tools import CdpTool
+from functools import partial
+
+from startup_profile import profile
+
+with profile.phase("import langchain"):
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_openai import ChatOpenAI
+    from langchain_core.tools import StructuredTool
+    from langgraph.prebuilt import create_react_agent
+
+with profile.phase("import cdp"):
+    # Import CDP Agentkit Langchain Extension.
+    from cdp_langchain.agent_toolkits import CdpToolkit
+    from cdp_langchain.tools import CdpTool
 from dotenv import load_dotenv
-from twitter_langchain import TwitterApiWrapper, TwitterToolkit
-from langchain_groq import ChatGroq
 load_dotenv()
 
-# Import tools
-from tools import (
-    # create an ERC-20 token
-    deploy_multi_token, DeployMultiTokenInput, DEPLOY_MULTITOKEN_PROMPT,
-
-    # DALLE tool
-    create_dalle_nft_tool, DalleNftInput, DALLE_NFT_PROMPT,
-
-    # IPFS upload tools
-    create_pinata_upload_tool, UploadImageToPinataInput, UPLOAD_IMAGE_TO_PINATA_PROMPT,
-    # create_erc721_metadata, UploadERC721MetadataInput, UPLOAD_ERC721_METADATA_PROMPT,  # Temporarily commented out
-
-    # crypto compare
-    fetch_news_tool, FetchNewsInput, FETCH_NEWS_PROMPT,
-    fetch_price, FetchPriceInput, FETCH_PRICE_PROMPT,
-    fetch_trading_signals, FetchTradingSignalsInput, FETCH_TRADING_SIGNALS_PROMPT,
-    fetch_top_market_cap, FetchTopMarketCapInput, FETCH_TOP_MARKET_CAP_PROMPT,
-    fetch_top_exchanges, FetchTopExchangesInput, FETCH_TOP_EXCHANGES_PROMPT,
-    fetch_top_volume, FetchTopVolumeInput, FETCH_TOP_VOLUME_PROMPT,
-
-    # Moralis
-    # Core wallet functions
-    fetch_wallet_history, WalletHistoryInput, WALLET_HISTORY_PROMPT,
-    fetch_wallet_balance, WalletBalanceInput, WALLET_BALANCE_PROMPT,
-    # NFT related functions
-    fetch_nft_transfers, NFTTransfersInput, NFT_TRANSFERS_PROMPT,
-    fetch_wallet_nft_trades, WalletNFTTradesInput, WALLET_NFT_TRADES_PROMPT,
-    # Token related functions
-    fetch_token_transfers, TokenTransfersInput, TOKEN_TRANSFERS_PROMPT,
-    fetch_wallet_tokens, WalletTokensInput, WALLET_TOKENS_PROMPT,
-    fetch_token_price, TokenPriceInput, TOKEN_PRICE_PROMPT,
-    fetch_batch_token_prices, BatchTokenPriceInput, BATCH_TOKEN_PRICES_PROMPT,
-    # DeFi related functions
-    fetch_defi_positions, DeFiPositionsInput, DEFI_POSITIONS_PROMPT,
-    # Trading data functions
-    fetch_pair_ohlcv, PairOHLCVInput, PAIR_OHLCV_PROMPT,
-
-   # Graph Protocol Tools
-   fetch_large_swaps, GraphLargeSwapsInput, GRAPH_LARGE_SWAPS_PROMPT,
-   fetch_new_high_tvl_pools, GraphNewHighTVLPoolsInput, GRAPH_NEW_HIGH_TVL_POOLS_PROMPT,
-   fetch_high_fee_pools, GraphHighFeePoolsInput, GRAPH_HIGH_FEE_POOLS_PROMPT,
-   fetch_undervalued_tokens, GraphUndervaluedTokensInput, GRAPH_UNDERVALUED_TOKENS_PROMPT,
-   fetch_whale_accumulation, GraphWhaleAccumulationInput, GRAPH_WHALE_ACCUMULATION_PROMPT,
-   fetch_swap_trends, GraphSwapTrendsInput, GRAPH_SWAP_TRENDS_PROMPT,
-   fetch_gas_fees, GraphGasFeesInput, GRAPH_GAS_FEES_PROMPT,
-   fetch_arbitrage_opportunities, GraphArbitrageInput, GRAPH_ARBITRAGE_PROMPT,
-
-    # Browser search
-    when_no_api_search_like_human,
-    web_search_tool, WebSearchInput, WEB_SEARCH_PROMPT,
-)
-
-# Configure a file to persist the agent's CDP MPC Wallet Data.
-wallet_data_file = "wallet_data.txt"
-
-def initialize_agent():
-    """Initialize the agent with CDP Agentkit."""
+from cdp_wallet import get_wallet_service
+from checkpointer import SqliteCheckpointSaver
+from history_window import HistoryWindow, count_tokens, split_summary, trim_to_budget
+
+# Tool modules are imported in initialize_agent, next to the tools built
+# from them, so importing this module does not load any of them
+with profile.phase("import tool helpers"):
+    from tools.jobs import background
+    from tools.http_fixtures import openai_http_clients
+
+def initialize_agent(prune_checkpoints: bool = True):
+    """Initialize the agent with CDP Agentkit.
+
+    With prune_checkpoints false the checkpointer does not prune on its own;
+    the caller's maintenance service owns it instead.
+    """
     # Get oai llm if inference is not set or set to normal
-    if os.environ["INFERENCE"] == "normal" or not os.environ["INFERENCE"]:
-        llm = ChatOpenAI(model="gpt-4o-mini")
-    if os.environ["INFERENCE"] == "fast":
-        # llm = ChatGroq(temperature=0, model_name="llama-3.1-8b-instant")
-        llm = ChatGroq(temperature=0, model_name="llama-3.3-70b-versatile")
-    wallet_data = None
-    if os.path.exists(wallet_data_file):
-
-        with open(wallet_data_file) as f:
-            wallet_data = f.read()
-
-    # Configure CDP Agentkit Langchain Extension.
-    values = {}
-    if wallet_data is not None:
-        # If there is a persisted agentic wallet, load it and pass to the CDP Agentkit Wrapper.
-        values = {"cdp_wallet_data": wallet_data}
-
-    agentkit = CdpAgentkitWrapper(**values)
-
-    # Persist the agent's CDP MPC Wallet Data.
-    wallet_data = agentkit.export_wallet()
-    with open(wallet_data_file, "w") as f:
-        f.write(wallet_data)
+    with profile.phase("llm"):
+        if os.environ["INFERENCE"] == "normal" or not os.environ["INFERENCE"]:
+            # With HTTP_FIXTURES set, model calls are recorded or replayed too
+            llm = ChatOpenAI(model="gpt-4o-mini", **openai_http_clients())
+        if os.environ["INFERENCE"] == "fast":
+            from langchain_groq import ChatGroq
+            # llm = ChatGroq(temperature=0, model_name="llama-3.1-8b-instant")
+            llm = ChatGroq(temperature=0, model_name="llama-3.3-70b-versatile")
+
+    # Configure CDP Agentkit Langchain Extension. All tools share the one
+    # wallet of the wallet service, which is loaded (and wallet_data.txt
+    # persisted) on first use, or in the background if WALLET_PRELOAD is on,
+    # instead of holding up startup.
+    wallet_service = get_wallet_service()
+    agentkit = wallet_service.agentkit
+    if os.getenv("WALLET_PRELOAD", "true").lower() in ("1", "true", "yes"):
+        wallet_service.preload()
 
     # Initialize CDP Agentkit Toolkit and get tools.
-    cdp_toolkit = CdpToolkit.from_cdp_agentkit_wrapper(agentkit)
-    cdp_tools = cdp_toolkit.get_tools()
-    twitter_api_wrapper = TwitterApiWrapper()
-    twitter_toolkit = TwitterToolkit.from_twitter_api_wrapper(twitter_api_wrapper)
-    twitter_tools = twitter_toolkit.get_tools()
+    with profile.phase("cdp toolkit"):
+        cdp_toolkit = CdpToolkit.from_cdp_agentkit_wrapper(agentkit)
+        cdp_tools = cdp_toolkit.get_tools()
+
+    # Twitter tools are only set up when Twitter credentials are configured
+    twitter_tools = []
+    if os.getenv("TWITTER_API_KEY"):
+        with profile.phase("twitter toolkit"):
+            from twitter_langchain import TwitterApiWrapper, TwitterToolkit
+            twitter_api_wrapper = TwitterApiWrapper()
+            twitter_toolkit = TwitterToolkit.from_twitter_api_wrapper(twitter_api_wrapper)
+            twitter_tools = twitter_toolkit.get_tools()
+
+    # Tool modules are imported below, so this phase includes their import time
+    tools_started = time.monotonic()
+    # Slow tools (NFT generation, contract deployment, browsing) run as
+    # background jobs and return a job id, so they do not hold up the turn
+    background_tools = os.getenv("BACKGROUND_TOOLS", "true").lower() in ("1", "true", "yes")
+
+    def maybe_background(kind, func):
+        return background(kind, func) if background_tools else func
 
     # Create Token 
+    from tools.token_tool import deploy_multi_token, DeployMultiTokenInput, DEPLOY_MULTITOKEN_PROMPT
     deployMultiTokenTool = CdpTool(
         name="deploy_multi_token",
         description=DEPLOY_MULTITOKEN_PROMPT,
         cdp_agentkit_wrapper=agentkit,
         args_schema=DeployMultiTokenInput,
-        func=deploy_multi_token,
+        func=maybe_background("deploy_multi_token", partial(deploy_multi_token, wallet_service=wallet_service)),
     )
 
     # DALLE NFT Generation
-    dalle_nft_tool = create_dalle_nft_tool()
+    from tools.dalle_nft_tool import create_dalle_nft_tool
+    dalle_nft_tool = create_dalle_nft_tool(wallet_service)
     dalleNFTTool = CdpTool(
         name="generate_nft",
         description=dalle_nft_tool["description"],
         cdp_agentkit_wrapper=agentkit,
         args_schema=dalle_nft_tool["args_schema"],
-        func=dalle_nft_tool["func"]
+        func=maybe_background("generate_nft", dalle_nft_tool["func"])
     )
 
     # IPFS Uploader Using
+    from tools.ipfs_upload_tool import create_pinata_upload_tool, UploadImageToPinataInput, UPLOAD_IMAGE_TO_PINATA_PROMPT
     ipfsUploadTool = CdpTool(
         name="ipsf_upload_tool",
         description=UPLOAD_IMAGE_TO_PINATA_PROMPT,
@@ -134,6 +109,7 @@ def initialize_agent():
 
     # IPFS ERC721 metadata upload tool
     # Temporarily commented out
+    # from tools.create_erc721_metadata_tool import create_erc721_metadata, UploadERC721MetadataInput, UPLOAD_ERC721_METADATA_PROMPT
     # ipfsMetadataERC721Upload = CdpTool(
     #     name="ipfs_metadata_erc721_upload",
     #     description=UPLOAD_ERC721_METADATA_PROMPT,
@@ -142,7 +118,18 @@ def initialize_agent():
     #     func=create_erc721_metadata,
     # )
 
+    # Background job status
+    from tools.job_status_tool import job_status, JobStatusInput, JOB_STATUS_PROMPT
+    jobStatusTool = CdpTool(
+        name="job_status",
+        description=JOB_STATUS_PROMPT,
+        cdp_agentkit_wrapper=agentkit,
+        args_schema=JobStatusInput,
+        func=job_status,
+    )
+
     # Web Search
+    from tools.web2_access_tool import web_search_tool, WebSearchInput, WEB_SEARCH_PROMPT
     webSearchTool = CdpTool(
         name="web_search",
         description=WEB_SEARCH_PROMPT,
@@ -151,174 +138,208 @@ def initialize_agent():
         func=web_search_tool,
     )
 
+    # The read-only data tools below are plain StructuredTools rather than
+    # CdpTools: they need no wallet, and CdpTool cannot take a coroutine. With
+    # one, the API's async agent runs several calls of them at once on the
+    # event loop instead of a thread each.
+
     # Crypto Compare
-    fetchNewsTool = CdpTool(
+    from tools.crypto_compare_tools import (
+        fetch_news_tool, afetch_news_tool, FetchNewsInput, FETCH_NEWS_PROMPT,
+        fetch_price, afetch_price, FetchPriceInput, FETCH_PRICE_PROMPT,
+        fetch_trading_signals, afetch_trading_signals, FetchTradingSignalsInput, FETCH_TRADING_SIGNALS_PROMPT,
+        fetch_top_market_cap, afetch_top_market_cap, FetchTopMarketCapInput, FETCH_TOP_MARKET_CAP_PROMPT,
+        fetch_top_exchanges, afetch_top_exchanges, FetchTopExchangesInput, FETCH_TOP_EXCHANGES_PROMPT,
+        fetch_top_volume, afetch_top_volume, FetchTopVolumeInput, FETCH_TOP_VOLUME_PROMPT,
+    )
+    fetchNewsTool = StructuredTool.from_function(
         name="fetch_news",
         description=FETCH_NEWS_PROMPT,
-        cdp_agentkit_wrapper=agentkit,
         args_schema=FetchNewsInput,
         func=fetch_news_tool,
+        coroutine=afetch_news_tool,
     )
-    fetchPriceTool = CdpTool(
+    fetchPriceTool = StructuredTool.from_function(
         name="fetch_price",
         description=FETCH_PRICE_PROMPT,
-        cdp_agentkit_wrapper=agentkit,
         args_schema=FetchPriceInput,
         func=fetch_price,
+        coroutine=afetch_price,
     )
-    fetchTradingSignalsTool = CdpTool(
+    fetchTradingSignalsTool = StructuredTool.from_function(
         name="fetch_trading_signals",
         description=FETCH_TRADING_SIGNALS_PROMPT,
-        cdp_agentkit_wrapper=agentkit,
         args_schema=FetchTradingSignalsInput,
         func=fetch_trading_signals,
+        coroutine=afetch_trading_signals,
     )
-    fetchTopMarketCapTool = CdpTool(
+    fetchTopMarketCapTool = StructuredTool.from_function(
         name="fetch_top_market_cap",
         description=FETCH_TOP_MARKET_CAP_PROMPT,
-        cdp_agentkit_wrapper=agentkit,
         args_schema=FetchTopMarketCapInput,
         func=fetch_top_market_cap,
+        coroutine=afetch_top_market_cap,
     )
-    fetchTopExchangesTool = CdpTool(
+    fetchTopExchangesTool = StructuredTool.from_function(
         name="fetch_top_exchanges",
         description=FETCH_TOP_EXCHANGES_PROMPT,
-        cdp_agentkit_wrapper=agentkit,
         args_schema=FetchTopExchangesInput,
         func=fetch_top_exchanges,
+        coroutine=afetch_top_exchanges,
     )
-    fetchTopVolumeTool = CdpTool(
+    fetchTopVolumeTool = StructuredTool.from_function(
         name="fetch_top_volume",
         description=FETCH_TOP_VOLUME_PROMPT,
-        cdp_agentkit_wrapper=agentkit,
         args_schema=FetchTopVolumeInput,
         func=fetch_top_volume,
+        coroutine=afetch_top_volume,
     )
 
     # Moralis API Tools
+    from tools.moralis_tools import (
+        fetch_wallet_history, afetch_wallet_history, WalletHistoryInput,
+        fetch_wallet_balance, afetch_wallet_balance, WalletBalanceInput,
+        fetch_nft_transfers, afetch_nft_transfers, NFTTransfersInput,
+        fetch_wallet_nft_trades, afetch_wallet_nft_trades, WalletNFTTradesInput,
+        fetch_token_transfers, afetch_token_transfers, TokenTransfersInput,
+        fetch_wallet_tokens, afetch_wallet_tokens, WalletTokensInput,
+        fetch_token_price, afetch_token_price, TokenPriceInput,
+        fetch_batch_token_prices, afetch_batch_token_prices, BatchTokenPriceInput,
+        fetch_defi_positions, afetch_defi_positions, DeFiPositionsInput,
+        fetch_pair_ohlcv, afetch_pair_ohlcv, PairOHLCVInput,
+    )
     moralisTools = [
-        CdpTool(
+        StructuredTool.from_function(
             name="wallet_history",
             description="Fetch transaction history for a wallet address",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=WalletHistoryInput,
             func=fetch_wallet_history,
+            coroutine=afetch_wallet_history,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="wallet_balance",
             description="Fetch balance for a wallet address",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=WalletBalanceInput,
             func=fetch_wallet_balance,
+            coroutine=afetch_wallet_balance,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="nft_transfers",
             description="Fetch NFT transfers for an address",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=NFTTransfersInput,
             func=fetch_nft_transfers,
+            coroutine=afetch_nft_transfers,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="token_transfers",
             description="Fetch token transfers for an address",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=TokenTransfersInput,
             func=fetch_token_transfers,
+            coroutine=afetch_token_transfers,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="wallet_nft_trades",
             description="Fetch NFT trades for a wallet",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=WalletNFTTradesInput,
             func=fetch_wallet_nft_trades,
+            coroutine=afetch_wallet_nft_trades,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="wallet_tokens",
             description="Fetch tokens owned by a wallet",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=WalletTokensInput,
             func=fetch_wallet_tokens,
+            coroutine=afetch_wallet_tokens,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="defi_positions",
             description="Fetch DeFi positions for a wallet",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=DeFiPositionsInput,
             func=fetch_defi_positions,
+            coroutine=afetch_defi_positions,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="token_price",
             description="Fetch price for a specific token",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=TokenPriceInput,
             func=fetch_token_price,
+            coroutine=afetch_token_price,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="batch_token_prices",
             description="Fetch prices for multiple tokens",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=BatchTokenPriceInput,
             func=fetch_batch_token_prices,
+            coroutine=afetch_batch_token_prices,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="pair_ohlcv",
             description="Fetch OHLCV data for a trading pair",
-            cdp_agentkit_wrapper=agentkit,
             args_schema=PairOHLCVInput,
             func=fetch_pair_ohlcv,
+            coroutine=afetch_pair_ohlcv,
         )
     ]
 
     # Graph Protocol Tools
+    from tools.the_graph_uniswap_base_tools import (
+        fetch_large_swaps, afetch_large_swaps, GraphLargeSwapsInput, GRAPH_LARGE_SWAPS_PROMPT,
+        fetch_new_high_tvl_pools, afetch_new_high_tvl_pools, GraphNewHighTVLPoolsInput, GRAPH_NEW_HIGH_TVL_POOLS_PROMPT,
+        fetch_high_fee_pools, afetch_high_fee_pools, GraphHighFeePoolsInput, GRAPH_HIGH_FEE_POOLS_PROMPT,
+        fetch_undervalued_tokens, afetch_undervalued_tokens, GraphUndervaluedTokensInput, GRAPH_UNDERVALUED_TOKENS_PROMPT,
+        fetch_whale_accumulation, afetch_whale_accumulation, GraphWhaleAccumulationInput, GRAPH_WHALE_ACCUMULATION_PROMPT,
+        fetch_swap_trends, afetch_swap_trends, GraphSwapTrendsInput, GRAPH_SWAP_TRENDS_PROMPT,
+        fetch_gas_fees, afetch_gas_fees, GraphGasFeesInput, GRAPH_GAS_FEES_PROMPT,
+    )
     theGraphUniswapV3Tools = [
-        CdpTool(
+        StructuredTool.from_function(
             name="large_swaps",
             description=GRAPH_LARGE_SWAPS_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphLargeSwapsInput,
             func=fetch_large_swaps,
+            coroutine=afetch_large_swaps,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="new_high_tvl_pools",
             description=GRAPH_NEW_HIGH_TVL_POOLS_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphNewHighTVLPoolsInput,
             func=fetch_new_high_tvl_pools,
+            coroutine=afetch_new_high_tvl_pools,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="high_fee_pools",
             description=GRAPH_HIGH_FEE_POOLS_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphHighFeePoolsInput,
             func=fetch_high_fee_pools,
+            coroutine=afetch_high_fee_pools,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="undervalued_tokens",
             description=GRAPH_UNDERVALUED_TOKENS_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphUndervaluedTokensInput,
             func=fetch_undervalued_tokens,
+            coroutine=afetch_undervalued_tokens,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="whale_accumulation",
             description=GRAPH_WHALE_ACCUMULATION_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphWhaleAccumulationInput,
             func=fetch_whale_accumulation,
+            coroutine=afetch_whale_accumulation,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="swap_trends",
             description=GRAPH_SWAP_TRENDS_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphSwapTrendsInput,
             func=fetch_swap_trends,
+            coroutine=afetch_swap_trends,
         ),
-        CdpTool(
+        StructuredTool.from_function(
             name="gas_fees",
             description=GRAPH_GAS_FEES_PROMPT,
-            cdp_agentkit_wrapper=agentkit,
             args_schema=GraphGasFeesInput,
             func=fetch_gas_fees,
+            coroutine=afetch_gas_fees,
         ),
         # CdpTool(
         #     name="fetch_arbitrage_opportunities",
@@ -335,6 +356,7 @@ def initialize_agent():
         *cdp_tools,
         *twitter_tools,
         webSearchTool,
+        jobStatusTool,
         deployMultiTokenTool,
         ipfsUploadTool,
         # ipfsMetadataERC721Upload,  # Temporarily commented out
@@ -348,10 +370,27 @@ def initialize_agent():
     tools.extend(moralisTools)
     tools.extend(theGraphUniswapV3Tools)
 
-    tools.append(when_no_api_search_like_human)
-
-    # Store buffered conversation history in memory.
-    memory = MemorySaver()
+    from tools.browser_tool import when_no_api_search_like_human
+    if background_tools:
+        tools.append(StructuredTool.from_function(
+            func=background("browser", when_no_api_search_like_human.func),
+            name=when_no_api_search_like_human.name,
+            description=when_no_api_search_like_human.description,
+            args_schema=when_no_api_search_like_human.args_schema,
+        ))
+    else:
+        tools.append(when_no_api_search_like_human)
+    profile.record("tools", time.monotonic() - tools_started)
+
+    # Persist checkpoints on disk, keeping only the latest few per thread.
+    max_age = os.getenv("CHECKPOINT_MAX_AGE")
+    with profile.phase("checkpointer"):
+        memory = SqliteCheckpointSaver(
+            os.getenv("CHECKPOINT_DB", "checkpoints.db"),
+            keep_per_thread=int(os.getenv("CHECKPOINT_KEEP", "2")),
+            max_thread_age=float(max_age) if max_age else None,
+            prune_interval=float(os.getenv("CHECKPOINT_PRUNE_INTERVAL", "300")) if prune_checkpoints else 0,
+        )
     config = {"configurable": {"thread_id": "CDP Agentkit Chatbot Example!"}}
 
     prompt = "You are a helpful agent that helps manage a user's wallet you are part of that wallet" 
@@ -365,19 +404,40 @@ def initialize_agent():
     "bear in mind this takes bit of time so be careful using this and use it when users asks you to do something you can't do with your currently available tools"
     "When minting an nft ensure that you use the base_uri only. do not append anything to it such as a number! "
     "Be concise and helpful with your responses. Refrain from restating your tools' descriptions unless it is explicitly requested."
+    # Old turns are folded out of the thread at the start of each turn (see
+    # HistoryWindow.fold_state); the trim only bounds a turn's own tool loop.
+    token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+
+    def state_modifier(state):
+        summary, messages = split_summary(state["messages"])
+        if summary is None:
+            return [SystemMessage(content=prompt), *trim_to_budget(messages, token_budget)]
+        budget = token_budget - count_tokens(str(summary.content))
+        return [SystemMessage(content=prompt), summary, *trim_to_budget(messages, budget)]
+
     # Create ReAct Agent using the LLM and CDP Agentkit tools.
-    return create_react_agent(
-        llm,
-        tools=tools,
-        checkpointer=memory,
-        state_modifier=prompt,
-    ), config
+    with profile.phase("agent graph"):
+        agent = create_react_agent(
+            llm,
+            tools=tools,
+            checkpointer=memory,
+            state_modifier=state_modifier,
+        )
+    return agent, config
+
+
+def turn_input(agent_executor, config, window, message):
+    """The graph input for a turn, folding turns that no longer fit out of the thread"""
+    messages = agent_executor.get_state(config).values.get("messages", [])
+    updates, _ = window.fold_state([*messages, message])
+    return {"messages": [*updates, message]}
 
 
 # Autonomous Mode
 def run_autonomous_mode(agent_executor, config, interval=10):
     """Run the agent autonomously with specified intervals."""
     print("Starting autonomous mode...")
+    window = HistoryWindow(token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "4000")))
     while True:
         try:
             # Provide instructions autonomously
@@ -397,7 +457,7 @@ def run_autonomous_mode(agent_executor, config, interval=10):
 
             # Run agent in autonomous mode
             for chunk in agent_executor.stream(
-                {"messages": [HumanMessage(content=thought)]}, config):
+                turn_input(agent_executor, config, window, HumanMessage(content=thought)), config):
                 if "agent" in chunk:
                     print(chunk["agent"]["messages"][0].content)
                 elif "tools" in chunk:
@@ -416,6 +476,7 @@ def run_autonomous_mode(agent_executor, config, interval=10):
 def run_chat_mode(agent_executor, config):
     """Run the agent interactively based on user input."""
     print("Starting chat mode... Type 'exit' to end.")
+    window = HistoryWindow(token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "4000")))
     while True:
         try:
             user_input = input("\nUser: ")
@@ -424,7 +485,7 @@ def run_chat_mode(agent_executor, config):
 
             # Run agent with the user's input in chat mode
             for chunk in agent_executor.stream(
-                {"messages": [HumanMessage(content=user_input)]}, config):
+                turn_input(agent_executor, config, window, HumanMessage(content=user_input)), config):
                 if "agent" in chunk:
                     print(chunk["agent"]["messages"][0].content)
                 elif "tools" in chunk:
@@ -456,6 +517,8 @@ def choose_mode():
 def main():
     """Start the chatbot agent."""
     agent_executor, config = initialize_agent()
+    profile.ready()
+    print(profile.format())
 
     mode = choose_mode()
     if mode == "chat":
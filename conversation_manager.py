@@ -1,55 +1,47 @@
-import json
 import os
-from typing import Dict, List
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+import time
+from typing import Dict, List, Optional
+from langchain_core.messages import BaseMessage
+
+from storage import open_store, message_to_record, record_to_message, import_json_histories, SessionCache
+from history_window import HistoryWindow
+from session_locks import SessionLocks
 
 class ConversationManager:
-    def __init__(self, storage_file: str = "conversation_histories.json"):
-        self.storage_file = storage_file
-        self.histories: Dict[str, List[dict]] = self._load_histories()
-    
-    def _load_histories(self) -> Dict[str, List[dict]]:
-        """Load conversation histories from file"""
-        if not os.path.exists(self.storage_file):
-            return {}
-        
-        try:
-            with open(self.storage_file, 'r') as f:
-                # Load raw histories
-                raw_histories = json.load(f)
-                
-                # Convert raw messages back to LangChain messages
-                histories = {}
-                for session_id, messages in raw_histories.items():
-                    histories[session_id] = []
-                    for msg in messages:
-                        if msg['type'] == 'human':
-                            histories[session_id].append(HumanMessage(content=msg['content']))
-                        elif msg['type'] == 'ai':
-                            histories[session_id].append(AIMessage(content=msg['content']))
-                return histories
-        except Exception as e:
-            print(f"Error loading histories: {e}")
-            return {}
-    
-    def _save_histories(self):
-        """Save conversation histories to file"""
-        try:
-            # Convert LangChain messages to serializable format
-            serializable_histories = {}
-            for session_id, messages in self.histories.items():
-                serializable_histories[session_id] = []
-                for msg in messages:
-                    msg_type = 'human' if isinstance(msg, HumanMessage) else 'ai'
-                    serializable_histories[session_id].append({
-                        'type': msg_type,
-                        'content': msg.content
-                    })
-            
-            with open(self.storage_file, 'w') as f:
-                json.dump(serializable_histories, f, indent=2)
-        except Exception as e:
-            print(f"Error saving histories: {e}")
+    """Thread-safe access to conversation histories
+
+    Every operation on a session runs under that session's lock, so concurrent
+    requests for one session cannot interleave a store read with an append
+    (and leave a stale tail in the cache) or fold its summary twice. Different
+    sessions never wait on each other.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        legacy_file: str = "conversation_histories.json",
+        cache: Optional[SessionCache] = None,
+        window: Optional[HistoryWindow] = None,
+    ):
+        """
+        Args:
+            store: Storage backend for histories, defaults to the one selected by CONVERSATION_STORE
+            legacy_file: Old single-file JSON histories, imported once into an empty store
+            cache: LRU tier for hot sessions, sized by CONVERSATION_CACHE_SESSIONS/CONVERSATION_CACHE_BYTES
+            window: Token-budgeted history selector, budget from HISTORY_TOKEN_BUDGET
+        """
+        self.store = store if store is not None else open_store()
+        self.cache = cache if cache is not None else SessionCache(
+            max_sessions=int(os.getenv("CONVERSATION_CACHE_SESSIONS", "1000")),
+            max_bytes=int(os.getenv("CONVERSATION_CACHE_BYTES", str(64 * 1024 * 1024))),
+        )
+        self.window = window if window is not None else HistoryWindow(
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "4000")),
+        )
+        self.locks = SessionLocks()
+        if legacy_file and os.path.exists(legacy_file) and self.store.is_empty():
+            imported = import_json_histories(legacy_file, self.store)
+            print(f"Imported {imported} messages from {legacy_file}")
     
     def get_history(self, session_id: str, limit: int = 10) -> List[BaseMessage]:
         """Get conversation history for a session
@@ -58,24 +50,99 @@ class ConversationManager:
             session_id: The session ID
             limit: Number of most recent messages to return, defaults to 10
         """
-        history = self.histories.get(session_id, [])
-        return history[-limit:]
+        with self.locks.hold(session_id):
+            cached = self.cache.get(session_id, limit)
+            if cached is not None:
+                return cached
+
+            # On a miss, load at least the cache's tail so the next turns are hits
+            load = max(limit, self.cache.tail)
+            try:
+                records = self.store.read(session_id, load)
+            except Exception as e:
+                print(f"Error loading history: {e}")
+                return []
+            messages = [record_to_message(record) for record in records]
+            messages = [message for message in messages if message is not None]
+            self.cache.put(session_id, messages, complete=len(records) < load)
+            return messages[-limit:] if limit > 0 else []
+    
+    def get_context(self, session_id: str, token_budget: Optional[int] = None) -> List[BaseMessage]:
+        """Get the history to send to the agent, packed into a token budget
+
+        Recent messages are kept verbatim up to the budget; older ones are
+        represented by a cached rolling summary.
+
+        Args:
+            session_id: The session ID
+            token_budget: Overrides HISTORY_TOKEN_BUDGET for this call
+        """
+        with self.locks.hold(session_id):
+            messages = self.get_history(session_id, limit=self.cache.tail)
+            try:
+                start = self.store.count(session_id) - len(messages)
+            except Exception as e:
+                print(f"Error counting history: {e}")
+                start = 0
+            selected, _ = self.window.select(session_id, messages, max(start, 0), token_budget)
+            return selected
     
     def add_message(self, session_id: str, message: BaseMessage):
         """Add a message to a session's history"""
-        if session_id not in self.histories:
-            self.histories[session_id] = []
-        self.histories[session_id].append(message)
-        self._save_histories()
+        with self.locks.hold(session_id):
+            try:
+                self.store.append(session_id, message_to_record(message))
+            except Exception as e:
+                print(f"Error saving message: {e}")
+            self.cache.append(session_id, message)
     
     def create_session(self, session_id: str):
         """Create a new session"""
-        if session_id not in self.histories:
-            self.histories[session_id] = []
-            self._save_histories()
+        with self.locks.hold(session_id):
+            self.store.create_session(session_id)
     
     def delete_session(self, session_id: str):
         """Delete a session's history"""
-        if session_id in self.histories:
-            del self.histories[session_id]
-            self._save_histories()
+        with self.locks.hold(session_id):
+            self.cache.invalidate(session_id)
+            self.window.forget(session_id)
+            self.store.delete_session(session_id)
+
+    def expire_idle(self, ttl: float) -> List[str]:
+        """Delete every session with no new messages in the last `ttl` seconds
+
+        Each candidate is checked again under its lock, so a session that
+        became active while we were scanning is kept.
+
+        Returns:
+            The IDs of the expired sessions
+        """
+        expired = []
+        for session_id in self.store.idle_sessions(ttl):
+            with self.locks.hold(session_id):
+                last_active = self.store.last_active(session_id)
+                if last_active is None or time.time() - last_active < ttl:
+                    continue
+                self.delete_session(session_id)
+            expired.append(session_id)
+        return expired
+
+    def compact(self) -> int:
+        """Compact the storage backend
+
+        Returns:
+            The number of bytes reclaimed
+        """
+        return self.store.compact()
+
+    def stats(self) -> Dict[str, object]:
+        """Hot-session cache counters, history window token savings and lock contention"""
+        return {"cache": self.cache.stats(), "window": self.window.stats(), "locks": self.locks.stats()}
+
+    def flush(self):
+        """Write out any messages still queued for persistence"""
+        self.store.flush()
+
+    def close(self):
+        """Release the storage backend"""
+        self.store.close()
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+def format_sse(event_id: int, event: str, data: dict) -> str:
+    """Frame one Server-Sent Event"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class RunStream:
+    """Buffered, numbered events of one agent run
+
+    The run appends events as it goes; any number of readers can follow it and
+    a reader that reconnects continues after the last id it saw, so a dropped
+    connection does not lose tokens.
+    """
+
+    def __init__(self, run_id: str, session_id: str):
+        self.run_id = run_id
+        self.session_id = session_id
+        self.events: List[Tuple[int, str, dict]] = []
+        self.done = False
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.ttft: Optional[float] = None
+        # The task producing the events, set by the caller
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, event: str, data: dict):
+        self.events.append((len(self.events) + 1, event, data))
+        self._changed.set()
+
+    def close(self):
+        self.done = True
+        self.finished = time.monotonic()
+        self._changed.set()
+
+    async def follow(self, last_event_id: int = 0) -> AsyncIterator[Tuple[int, str, dict]]:
+        """Yield events after `last_event_id` until the run is finished"""
+        position = max(last_event_id, 0)
+        self.subscribers += 1
+        try:
+            while True:
+                while position < len(self.events):
+                    yield self.events[position]
+                    position += 1
+                if self.done:
+                    return
+                self._changed.clear()
+                # Re-check after clearing so an event published in between is not missed
+                if position < len(self.events) or self.done:
+                    continue
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+
+
+class RunStreams:
+    """Registry of recent run streams, with time-to-first-token stats
+
+    Finished runs stay available for `retention` seconds so clients can resume.
+    """
+
+    def __init__(self, retention: float = 60.0, ttft_window: int = 1000):
+        self.retention = retention
+        self._runs: Dict[str, RunStream] = {}
+        self._ttfts = deque(maxlen=ttft_window)
+        self.runs = 0
+
+    def create(self, session_id: str) -> RunStream:
+        self._expire()
+        stream = RunStream(str(uuid.uuid4()), session_id)
+        self._runs[stream.run_id] = stream
+        self.runs += 1
+        return stream
+
+    def get(self, run_id: str) -> Optional[RunStream]:
+        self._expire()
+        return self._runs.get(run_id)
+
+    def first_token(self, stream: RunStream):
+        """Record time-to-first-token for a run, once"""
+        if stream.ttft is None:
+            stream.ttft = time.monotonic() - stream.started
+            self._ttfts.append(stream.ttft)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.retention
+        for run_id in [r for r, s in self._runs.items() if s.done and s.finished < cutoff]:
+            del self._runs[run_id]
+
+    def stats(self) -> Dict[str, object]:
+        ttfts = sorted(self._ttfts)
+        return {
+            "runs": self.runs,
+            "active": sum(1 for stream in self._runs.values() if not stream.done),
+            "ttft_avg": sum(ttfts) / len(ttfts) if ttfts else None,
+            "ttft_p50": ttfts[len(ttfts) // 2] if ttfts else None,
+            "ttft_p95": ttfts[min(int(len(ttfts) * 0.95), len(ttfts) - 1)] if ttfts else None,
+        }
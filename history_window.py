@@ -0,0 +1,286 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken is optional; fall back to the usual ~4 characters per token
+    _encoding = None
+
+# (previous summary, newly folded messages) -> new summary
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+# The summary is stored in a thread's graph state under this message ID
+SUMMARY_ID = "history-summary"
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def count_tokens(text: str) -> int:
+    """Count (or estimate) the tokens in a string"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: BaseMessage) -> int:
+    # A few tokens of per-message framing on top of the content
+    return count_tokens(str(message.content)) + 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a string down to roughly max_tokens, marking the cut"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        text = _encoding.decode(_encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        text = text[:max_tokens * 4]
+    return text + " ...[truncated]"
+
+
+def extractive_summarizer(max_tokens: int = 500, snippet_tokens: int = 60) -> Summarizer:
+    """Summarizer that keeps the opening of each folded message, no LLM call
+
+    The summary is a list of "User:/Assistant:" snippets; once it exceeds
+    max_tokens the oldest snippets are dropped.
+    """
+    def summarize(previous: str, messages: List[BaseMessage]) -> str:
+        lines = previous.splitlines() if previous else []
+        for message in messages:
+            role = "User" if isinstance(message, HumanMessage) else "Assistant"
+            snippet = truncate_to_tokens(" ".join(str(message.content).split()), snippet_tokens)
+            lines.append(f"{role}: {snippet}")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    return summarize
+
+
+def llm_summarizer(llm, max_tokens: int = 500) -> Summarizer:
+    """Summarizer that asks a chat model to fold messages into the summary"""
+    def summarize(previous: str, messages: List[BaseMessage]) -> str:
+        transcript = "\n".join(
+            f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {m.content}" for m in messages
+        )
+        prompt = (
+            f"Update the running summary of a conversation in at most {max_tokens} tokens. "
+            "Keep wallet addresses, token symbols, contract addresses, amounts and decisions.\n\n"
+            f"Current summary:\n{previous or '(empty)'}\n\nNew messages:\n{transcript}"
+        )
+        return str(llm.invoke([HumanMessage(content=prompt)]).content)
+
+    return summarize
+
+
+def trim_to_budget(messages: List[BaseMessage], token_budget: int) -> List[BaseMessage]:
+    """Keep the most recent whole turns of a graph state within a token budget
+
+    The cut always lands on a HumanMessage, so tool calls are never separated
+    from their results. The latest turn is kept even if it alone is over budget.
+    """
+    start = len(messages)
+    remaining = token_budget
+    for i in range(len(messages) - 1, -1, -1):
+        remaining -= message_tokens(messages[i])
+        if remaining < 0 and start < len(messages):
+            break
+        if isinstance(messages[i], HumanMessage):
+            start = i
+    return messages[start:]
+
+
+def summary_message(text: str) -> SystemMessage:
+    return SystemMessage(content=SUMMARY_PREFIX + text, id=SUMMARY_ID)
+
+
+def split_summary(messages: List[BaseMessage]) -> Tuple[Optional[BaseMessage], List[BaseMessage]]:
+    """Separate the stored summary (if any) from the rest of a graph state"""
+    summary = next((message for message in messages if message.id == SUMMARY_ID), None)
+    return summary, [message for message in messages if message.id != SUMMARY_ID]
+
+
+class SessionSummary:
+    __slots__ = ("boundary", "text")
+
+    def __init__(self):
+        # Absolute index of the first message not folded into the summary
+        self.boundary = 0
+        self.text = ""
+
+
+class HistoryWindow:
+    """Select the history sent to the agent under a token budget
+
+    Messages are packed newest-first until the budget is used up. Anything that
+    falls out of the window is folded into a per-session rolling summary, which
+    is cached and only updated when new messages push content out. Individual
+    messages larger than `max_message_tokens` (e.g. raw Moralis or Graph JSON)
+    are truncated so one tool dump cannot crowd out the rest of the window.
+
+    Savings are reported against the previous behaviour of sending the last
+    `baseline_messages` messages unchanged.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 4000,
+        max_message_tokens: int = 1500,
+        summarizer: Optional[Summarizer] = None,
+        max_sessions: int = 1000,
+        baseline_messages: int = 10,
+    ):
+        self.token_budget = token_budget
+        self.max_message_tokens = max_message_tokens
+        # Keep the default summary to a quarter of the budget
+        self.summarizer = summarizer or extractive_summarizer(max_tokens=token_budget // 4)
+        self.max_sessions = max_sessions
+        # Savings are measured against sending the last N raw messages
+        self.baseline_messages = baseline_messages
+        self._summaries: "OrderedDict[str, SessionSummary]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.tokens_saved = 0
+        self.summary_updates = 0
+        self.last_turn: Dict[str, int] = {}
+
+    def _summary(self, session_id: str) -> SessionSummary:
+        with self._lock:
+            summary = self._summaries.get(session_id)
+            if summary is None:
+                summary = SessionSummary()
+                self._summaries[session_id] = summary
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+            return summary
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._summaries.pop(session_id, None)
+
+    def select(
+        self,
+        session_id: str,
+        messages: List[BaseMessage],
+        start: int,
+        token_budget: Optional[int] = None,
+    ) -> Tuple[List[BaseMessage], Dict[str, int]]:
+        """Pick the messages to send for this turn
+
+        Args:
+            session_id: The session ID
+            messages: The most recent messages of the session, oldest first
+            start: Absolute index of messages[0] within the whole session
+            token_budget: Overrides the default budget for this call
+
+        Returns:
+            The messages to send (a summary SystemMessage first, if any) and
+            token stats for the turn
+        """
+        budget = token_budget or self.token_budget
+        summary = self._summary(session_id)
+
+        # Never resend raw what the summary already covers
+        first = max(summary.boundary - start, 0)
+        candidates = [
+            self._clip(message) for message in messages[first:]
+        ]
+
+        # Reserve room for the summary we already have
+        remaining = budget - (count_tokens(summary.text) if summary.text else 0)
+        window: List[BaseMessage] = []
+        for message in reversed(candidates):
+            tokens = message_tokens(message)
+            if window and tokens > remaining:
+                break
+            window.append(message)
+            remaining -= tokens
+        window.reverse()
+
+        # Fold whatever fell out of the window into the summary
+        window_start = start + first + (len(candidates) - len(window))
+        if window_start > summary.boundary:
+            folded = messages[max(summary.boundary - start, 0):window_start - start]
+            if folded:
+                summary.text = self.summarizer(summary.text, folded)
+                self.summary_updates += 1
+            summary.boundary = window_start
+
+        selected = list(window)
+        if summary.text:
+            selected.insert(0, summary_message(summary.text))
+        return selected, self._record(messages, selected)
+
+    def fold_state(
+        self,
+        messages: List[BaseMessage],
+        token_budget: Optional[int] = None,
+    ) -> Tuple[List[BaseMessage], Dict[str, int]]:
+        """Keep a checkpointed thread within the token budget
+
+        The same window as `select`, applied to the graph state of a resumed
+        thread: whole turns that no longer fit are folded into the summary
+        stored in the state, and removed from it, so the checkpoint stays
+        bounded and the summary survives. Oversized messages that stay are
+        replaced by their truncated copies.
+
+        Args:
+            messages: The thread's messages, ending with the new turn's input
+            token_budget: Overrides the default budget for this call
+
+        Returns:
+            Updates for the graph state (RemoveMessage for every folded message,
+            then any replaced messages) and token stats for the turn
+        """
+        budget = token_budget or self.token_budget
+        summary, rest = split_summary(messages)
+        text = summary.content[len(SUMMARY_PREFIX):] if summary is not None else ""
+
+        clipped = [self._clip(message) for message in rest]
+        kept = trim_to_budget(clipped, budget - (count_tokens(text) if text else 0))
+        cut = len(rest) - len(kept)
+
+        updates: List[BaseMessage] = []
+        if cut:
+            text = self.summarizer(text, rest[:cut])
+            updates.extend(RemoveMessage(id=message.id) for message in rest[:cut])
+            updates.append(summary_message(text))
+            with self._lock:
+                self.summary_updates += 1
+        # Messages without an ID are not in the state yet
+        updates.extend(
+            new for new, old in zip(kept, rest[cut:]) if new is not old and old.id is not None
+        )
+
+        selected = [summary_message(text), *kept] if text else kept
+        return updates, self._record(rest, selected)
+
+    def _record(self, messages: List[BaseMessage], selected: List[BaseMessage]) -> Dict[str, int]:
+        full = sum(message_tokens(message) for message in messages[-self.baseline_messages:])
+        sent = sum(message_tokens(message) for message in selected)
+        turn = {"tokens_full": full, "tokens_sent": sent, "tokens_saved": max(full - sent, 0)}
+        with self._lock:
+            self.turns += 1
+            self.tokens_saved += turn["tokens_saved"]
+            self.last_turn = turn
+        return turn
+
+    def _clip(self, message: BaseMessage) -> BaseMessage:
+        if not isinstance(message.content, str) or message_tokens(message) <= self.max_message_tokens:
+            return message
+        return message.model_copy(update={"content": truncate_to_tokens(message.content, self.max_message_tokens)})
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "tokens_saved": self.tokens_saved,
+                "tokens_saved_per_turn": self.tokens_saved / self.turns if self.turns else 0.0,
+                "summary_updates": self.summary_updates,
+                "cached_summaries": len(self._summaries),
+                "last_turn": dict(self.last_turn),
+            }
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class MaintenanceService:
+    """Background housekeeping for conversation and checkpoint storage
+
+    Every `interval` seconds it expires sessions idle for longer than
+    `session_ttl` (history, cached tail, summary and agent checkpoints),
+    prunes old checkpoints, deletes background jobs that finished more than
+    `job_retention` seconds ago and compacts the stores. The blocking work
+    runs in a worker thread so requests are never held up by it. Give it a
+    checkpointer created without its own pruning thread (prune_interval=0),
+    so checkpoints have one pruner and `pruned_checkpoints` counts them all.
+    """
+
+    def __init__(
+        self,
+        conversation_manager,
+        checkpointer=None,
+        session_ttl: Optional[float] = None,
+        interval: float = 300.0,
+        job_manager=None,
+        job_retention: Optional[float] = None,
+    ):
+        self.conversation_manager = conversation_manager
+        self.checkpointer = checkpointer
+        self.job_manager = job_manager
+        self.job_retention = job_retention
+        self.session_ttl = session_ttl
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.expired_sessions = 0
+        self.pruned_checkpoints = 0
+        self.pruned_jobs = 0
+        self.reclaimed_bytes = 0
+        self.last_run: Dict[str, float] = {}
+
+    def run_once(self) -> Dict[str, float]:
+        """Run one maintenance pass synchronously and return its results"""
+        started = time.monotonic()
+        expired = []
+        if self.session_ttl:
+            expired = self.conversation_manager.expire_idle(self.session_ttl)
+            if self.checkpointer is not None:
+                for session_id in expired:
+                    self.checkpointer.delete_thread(session_id)
+
+        pruned = 0
+        reclaimed = {"conversations": self.conversation_manager.compact(), "checkpoints": 0}
+        if self.checkpointer is not None:
+            pruned = self.checkpointer.prune()
+            reclaimed["checkpoints"] = self.checkpointer.compact()
+
+        pruned_jobs = 0
+        if self.job_manager is not None and self.job_retention:
+            pruned_jobs = self.job_manager.prune(self.job_retention)
+
+        result = {
+            "expired_sessions": len(expired),
+            "pruned_checkpoints": pruned,
+            "pruned_jobs": pruned_jobs,
+            "reclaimed_bytes": sum(reclaimed.values()),
+            "reclaimed_conversation_bytes": reclaimed["conversations"],
+            "reclaimed_checkpoint_bytes": reclaimed["checkpoints"],
+            "duration": time.monotonic() - started,
+            "finished_at": time.time(),
+        }
+        self.runs += 1
+        self.expired_sessions += len(expired)
+        self.pruned_checkpoints += pruned
+        self.pruned_jobs += pruned_jobs
+        self.reclaimed_bytes += result["reclaimed_bytes"]
+        self.last_run = result
+        return result
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                print(f"Error running storage maintenance: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "session_ttl": self.session_ttl,
+            "runs": self.runs,
+            "expired_sessions": self.expired_sessions,
+            "pruned_checkpoints": self.pruned_checkpoints,
+            "pruned_jobs": self.pruned_jobs,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_run": dict(self.last_run),
+        }
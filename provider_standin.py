@@ -0,0 +1,547 @@
+"""A local stand-in for the provider APIs the data tools call
+
+Serves the Moralis v2.2, The Graph gateway, CryptoCompare min-api and Pinata
+pinFileToIPFS endpoints the tools use, with synthetic data in the shape the
+real APIs return, so the real tool code can be load-tested without spending
+quota. Point the tools at it with:
+
+    MORALIS_BASE_URL=http://localhost:8900/moralis/api/v2.2
+    THE_GRAPH_GATEWAY_URL=http://localhost:8900/graph
+    CRYPTO_COMPARE_BASE_URL=http://localhost:8900/cryptocompare
+    PINATA_API_URL=http://localhost:8900/pinata
+
+Data is generated from the request path and a seed, so the same request gets
+the same response. Lists have --items entries unless the request asks for
+fewer (limit, first). --latency, --jitter and --error-rate make it behave like
+a slow or flaky provider.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Settings come from the environment so that every uvicorn worker sees them
+ITEMS = int(os.getenv("STANDIN_ITEMS", "10"))
+LATENCY = float(os.getenv("STANDIN_LATENCY", "0"))
+JITTER = float(os.getenv("STANDIN_JITTER", "0"))
+ERROR_RATE = float(os.getenv("STANDIN_ERROR_RATE", "0"))
+ERROR_STATUS = int(os.getenv("STANDIN_ERROR_STATUS", "503"))
+SEED = os.getenv("STANDIN_SEED", "standin")
+
+SYMBOLS = ["ETH", "BTC", "USDC", "USDT", "DAI", "WBTC", "LINK", "UNI", "AAVE", "ARB", "OP", "MKR", "LDO", "SOL", "PEPE"]
+
+app = FastAPI(title="Provider stand-in")
+
+stats = {"requests": 0, "errors_injected": 0, "providers": {}}
+
+
+class Synth:
+    """Deterministic synthetic values for one request"""
+
+    def __init__(self, key: str):
+        self.random = random.Random(f"{SEED}:{key}")
+
+    def hex(self, length: int = 40) -> str:
+        return "0x" + "".join(self.random.choice("0123456789abcdef") for _ in range(length))
+
+    def address(self) -> str:
+        return self.hex(40)
+
+    def tx_hash(self) -> str:
+        return self.hex(64)
+
+    def symbol(self) -> str:
+        return self.random.choice(SYMBOLS)
+
+    def amount(self, low: float = 1, high: float = 1_000_000) -> float:
+        return round(self.random.uniform(low, high), 6)
+
+    def integer(self, low: int = 0, high: int = 10**6) -> int:
+        return self.random.randint(low, high)
+
+    def wei(self) -> str:
+        return str(self.random.randint(10**15, 10**21))
+
+    def timestamp(self) -> int:
+        return int(time.time()) - self.random.randint(0, 86400 * 7)
+
+    def iso(self) -> str:
+        return datetime.fromtimestamp(self.timestamp(), timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def cid(self) -> str:
+        return "bafybei" + "".join(self.random.choice("abcdefghijklmnopqrstuvwxyz234567") for _ in range(52))
+
+
+def _count(limit: Optional[Any]) -> int:
+    """List length: the requested limit if it is smaller than --items"""
+    try:
+        return max(min(int(limit), ITEMS), 0) if limit is not None else ITEMS
+    except (TypeError, ValueError):
+        return ITEMS
+
+
+###############################################
+# Moralis v2.2
+###############################################
+
+def _moralis_page(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"cursor": None, "page": 0, "page_size": len(items), "result": items}
+
+
+def _moralis_transaction(s: Synth, address: str) -> Dict[str, Any]:
+    return {
+        "hash": s.tx_hash(),
+        "from_address": address,
+        "to_address": s.address(),
+        "value": s.wei(),
+        "gas_price": str(s.integer(10**9, 10**11)),
+        "receipt_gas_used": str(s.integer(21000, 500000)),
+        "block_number": str(s.integer(18_000_000, 21_000_000)),
+        "block_timestamp": s.iso(),
+        "category": s.random.choice(["send", "receive", "token swap", "approve", "contract interaction"]),
+        "summary": f"Sent {s.amount(0, 10)} ETH",
+        "possible_spam": False,
+    }
+
+
+def _moralis_token(s: Synth) -> Dict[str, Any]:
+    symbol = s.symbol()
+    balance = s.amount(0, 10000)
+    price = s.amount(0.01, 5000)
+    return {
+        "token_address": s.address(),
+        "symbol": symbol,
+        "name": f"{symbol} Token",
+        "decimals": 18,
+        "balance": str(int(balance * 10**18)),
+        "balance_formatted": str(balance),
+        "usd_price": price,
+        "usd_value": round(balance * price, 2),
+        "usd_price_24hr_percent_change": s.amount(-20, 20),
+        "portfolio_percentage": s.amount(0, 100),
+        "native_token": symbol == "ETH",
+        "possible_spam": False,
+        "verified_contract": True,
+    }
+
+
+def _moralis_transfer(s: Synth, address: str, nft: bool) -> Dict[str, Any]:
+    transfer = {
+        "transaction_hash": s.tx_hash(),
+        "from_address": address,
+        "to_address": s.address(),
+        "block_number": str(s.integer(18_000_000, 21_000_000)),
+        "block_timestamp": s.iso(),
+        "log_index": s.integer(0, 300),
+    }
+    if nft:
+        transfer.update({"token_address": s.address(), "token_id": str(s.integer()), "contract_type": "ERC721", "amount": "1"})
+    else:
+        symbol = s.symbol()
+        value = s.amount(0, 10000)
+        transfer.update({
+            "address": s.address(),
+            "token_symbol": symbol,
+            "token_name": f"{symbol} Token",
+            "token_decimals": "18",
+            "value": str(int(value * 10**18)),
+            "value_decimal": str(value),
+        })
+    return transfer
+
+
+def _moralis_price(s: Synth, token_address: str) -> Dict[str, Any]:
+    symbol = s.symbol()
+    price = s.amount(0.01, 5000)
+    return {
+        "tokenName": f"{symbol} Token",
+        "tokenSymbol": symbol,
+        "tokenDecimals": "18",
+        "tokenAddress": token_address,
+        "nativePrice": {"value": s.wei(), "decimals": 18, "name": "Ether", "symbol": "ETH", "address": s.address()},
+        "usdPrice": price,
+        "usdPriceFormatted": str(price),
+        "24hrPercentChange": str(s.amount(-20, 20)),
+        "exchangeName": "Uniswap v3",
+        "exchangeAddress": s.address(),
+    }
+
+
+def _moralis(path: str, params: Dict[str, str], body: Optional[Dict[str, Any]]) -> Any:
+    """The response for a Moralis path (after /api/v2.2), or None if it is not one the tools call"""
+    s = Synth(path)
+    parts = path.strip("/").split("/")
+    if parts[0] == "wallets" and len(parts) >= 3:
+        address, rest = parts[1], "/".join(parts[2:])
+        if rest == "history":
+            return _moralis_page([_moralis_transaction(s, address) for _ in range(ITEMS)])
+        if rest == "nfts/trades":
+            return _moralis_page([
+                {**_moralis_transfer(s, address, nft=True), "price": s.wei(), "price_formatted": str(s.amount(0, 50)), "marketplace": "opensea"}
+                for _ in range(ITEMS)
+            ])
+        if rest == "tokens":
+            return _moralis_page([_moralis_token(s) for _ in range(ITEMS)])
+        if rest == "defi/positions":
+            return [
+                {
+                    "protocol_name": s.random.choice(["Uniswap v3", "Aave v3", "Lido", "Curve"]),
+                    "protocol_id": s.random.choice(["uniswap-v3", "aave-v3", "lido", "curve"]),
+                    "protocol_url": "https://example.org",
+                    "position": {
+                        "label": s.random.choice(["liquidity", "supplied", "staked"]),
+                        "tokens": [_moralis_token(s) for _ in range(2)],
+                        "balance_usd": s.amount(),
+                    },
+                }
+                for _ in range(ITEMS)
+            ]
+        if rest == "net-worth":
+            chains = [
+                {
+                    "chain": chain,
+                    "native_balance": s.wei(),
+                    "native_balance_formatted": str(s.amount(0, 100)),
+                    "native_balance_usd": str(s.amount()),
+                    "token_balance_usd": str(s.amount()),
+                    "networth_usd": str(s.amount()),
+                }
+                for chain in ("eth", "polygon", "base")
+            ]
+            return {"total_networth_usd": str(round(sum(float(c["networth_usd"]) for c in chains), 2)), "chains": chains}
+        if rest == "stats":
+            return {
+                "nfts": str(s.integer(0, 500)),
+                "collections": str(s.integer(0, 50)),
+                "transactions": {"total": str(s.integer())},
+                "nft_transfers": {"total": str(s.integer())},
+                "token_transfers": {"total": str(s.integer())},
+            }
+        return None
+    if parts[0] == "erc20" and len(parts) == 3 and parts[2] == "price":
+        return _moralis_price(s, parts[1])
+    if parts == ["erc20", "prices"]:
+        return [_moralis_price(s, token.get("token_address", s.address())) for token in (body or {}).get("tokens", [])]
+    if parts[0] == "pairs" and len(parts) == 3 and parts[2] == "ohlcv":
+        candles = []
+        for _ in range(ITEMS):
+            open_ = s.amount(1, 5000)
+            close = open_ * s.random.uniform(0.95, 1.05)
+            candles.append({
+                "timestamp": s.iso(),
+                "open": open_,
+                "high": max(open_, close) * 1.01,
+                "low": min(open_, close) * 0.99,
+                "close": close,
+                "volume": s.amount(),
+                "trades": s.integer(1, 5000),
+            })
+        return {"cursor": None, "page": 0, "pairAddress": parts[1], "tokenAddress": s.address(),
+                "timeframe": params.get("timeframe", "1h"), "currency": params.get("currency", "usd"), "result": candles}
+    if parts[0] == "resolve" and len(parts) == 3 and parts[1] == "ens":
+        return {"address": s.address()}
+    if parts[0] == "resolve" and len(parts) == 3 and parts[2] == "reverse":
+        return {"name": f"standin{s.integer(0, 9999)}.eth"}
+    if len(parts) == 2 and parts[1] == "balance":
+        return {"balance": s.wei()}
+    if len(parts) == 3 and parts[1:] == ["nft", "transfers"]:
+        return {"total": ITEMS, **_moralis_page([_moralis_transfer(s, parts[0], nft=True) for _ in range(ITEMS)])}
+    if len(parts) == 3 and parts[1:] == ["erc20", "transfers"]:
+        return _moralis_page([_moralis_transfer(s, parts[0], nft=False) for _ in range(ITEMS)])
+    return None
+
+
+###############################################
+# The Graph gateway
+###############################################
+
+_GRAPHQL_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[A-Za-z_][A-Za-z0-9_]*|-?\d+(?:\.\d+)?|[{}():,\[\]]|\S')
+
+
+def _selection(tokens: List[str], i: int) -> Tuple[List[Tuple[str, Dict[str, str], Any]], int]:
+    """Parse a selection set starting after "{"; (name, arguments, sub-selection) per field"""
+    fields = []
+    while i < len(tokens) and tokens[i] != "}":
+        name = tokens[i]
+        i += 1
+        arguments: Dict[str, str] = {}
+        if i < len(tokens) and tokens[i] == "(":
+            depth = 0
+            key = None
+            while i < len(tokens):
+                token = tokens[i]
+                if token in "({[":
+                    depth += 1
+                elif token in ")}]":
+                    depth -= 1
+                    if depth == 0:
+                        i += 1
+                        break
+                elif depth == 1 and i + 1 < len(tokens) and tokens[i + 1] == ":":
+                    key = token
+                elif depth == 1 and key is not None and token not in (":", ","):
+                    arguments[key] = token.strip('"')
+                    key = None
+                i += 1
+        children = None
+        if i < len(tokens) and tokens[i] == "{":
+            children, i = _selection(tokens, i + 1)
+            i += 1
+        fields.append((name, arguments, children))
+    return fields, i
+
+
+def _graph_leaf(s: Synth, name: str) -> Any:
+    """A value of a Uniswap subgraph scalar, as the gateway returns it (BigInt and BigDecimal as strings)"""
+    if name == "id":
+        return s.address()
+    if name == "symbol":
+        return s.symbol()
+    if name in ("sender", "recipient", "origin"):
+        return s.address()
+    if name in ("timestamp", "date"):
+        return str(s.timestamp()) if name == "timestamp" else s.timestamp() // 86400 * 86400
+    if name in ("sqrtPrice", "sqrtPriceX96"):
+        return str(int(s.random.uniform(0.5, 2) * 2**96 * s.random.uniform(1, 50)))
+    if name in ("feeTier", "fee"):
+        return str(s.random.choice([100, 500, 3000, 10000]))
+    if name in ("gasUsed", "gasPrice", "liquidity"):
+        return str(s.integer(21000, 10**12))
+    if name == "derivedETH":
+        return str(s.amount(0, 2))
+    return str(s.amount())
+
+
+def _graph_fields(s: Synth, fields) -> Dict[str, Any]:
+    result = {}
+    for name, arguments, children in fields:
+        if children is None:
+            result[name] = _graph_leaf(s, name)
+        elif name.endswith("s"):
+            # Entity collections (swaps, pools, tokenDayDatas) are lists; pool, token0 are objects
+            result[name] = [_graph_fields(s, children) for _ in range(_count(arguments.get("first", ITEMS)))]
+        else:
+            result[name] = _graph_fields(s, children)
+    return result
+
+
+def _graph(query: str) -> Dict[str, Any]:
+    tokens = _GRAPHQL_TOKEN.findall(query)
+    start = tokens.index("{") if "{" in tokens else len(tokens)
+    fields, _ = _selection(tokens, start + 1)
+    return {"data": _graph_fields(Synth(query), fields)}
+
+
+###############################################
+# CryptoCompare min-api
+###############################################
+
+def _cc_coin(s: Synth, tsym: str) -> Dict[str, Any]:
+    symbol = s.symbol()
+    price = s.amount(0.01, 70000)
+    raw = {
+        "TYPE": "5",
+        "MARKET": "CCCAGG",
+        "FROMSYMBOL": symbol,
+        "TOSYMBOL": tsym,
+        "PRICE": price,
+        "LASTUPDATE": int(time.time()),
+        "VOLUME24HOUR": s.amount(),
+        "VOLUME24HOURTO": s.amount(10**6, 10**10),
+        "OPEN24HOUR": price * 0.98,
+        "HIGH24HOUR": price * 1.03,
+        "LOW24HOUR": price * 0.96,
+        "CHANGE24HOUR": price * 0.02,
+        "CHANGEPCT24HOUR": s.amount(-10, 10),
+        "SUPPLY": s.amount(10**6, 10**9),
+        "MKTCAP": s.amount(10**8, 10**12),
+        "TOTALVOLUME24H": s.amount(),
+        "TOTALVOLUME24HTO": s.amount(10**6, 10**10),
+    }
+    return {
+        "CoinInfo": {
+            "Id": str(s.integer(1000, 999999)),
+            "Name": symbol,
+            "FullName": f"{symbol} Coin",
+            "Internal": symbol,
+            "ImageUrl": f"/media/{s.integer()}/{symbol.lower()}.png",
+            "Algorithm": "N/A",
+            "ProofType": "N/A",
+            "Rating": {"Weiss": {"Rating": "", "TechnologyAdoptionRating": "", "MarketPerformanceRating": ""}},
+            "Type": 1,
+            "DocumentType": "Webpagecoinp",
+        },
+        "RAW": {tsym: raw},
+        "DISPLAY": {tsym: {key: str(value) for key, value in raw.items()}},
+    }
+
+
+def _cc_signal(s: Synth) -> Dict[str, Any]:
+    return {
+        "category": "on_chain",
+        "sentiment": s.random.choice(["bullish", "neutral", "bearish"]),
+        "value": s.amount(-1, 1),
+        "score": s.amount(0, 1),
+        "score_threshold_bearish": 0.25,
+        "score_threshold_bullish": 0.75,
+    }
+
+
+def _cryptocompare(path: str, params: Dict[str, str]) -> Any:
+    s = Synth(f"{path}?{sorted(params.items())}")
+    tsym = params.get("tsym", "USD").upper()
+    if path == "/data/price":
+        return {symbol: s.amount(0.01, 70000) for symbol in params.get("tsyms", "USD").split(",") if symbol}
+    if path == "/data/tradingsignals/intotheblock/latest":
+        return {
+            "Response": "Success",
+            "Message": "",
+            "HasWarning": False,
+            "Type": 100,
+            "RateLimit": {},
+            "Data": {
+                "id": s.integer(1, 10000),
+                "time": int(time.time()),
+                "symbol": params.get("fsym", "BTC"),
+                "partner_symbol": params.get("fsym", "BTC"),
+                "inOutVar": _cc_signal(s),
+                "largetxsVar": _cc_signal(s),
+                "addressesNetGrowth": _cc_signal(s),
+                "concentrationVar": _cc_signal(s),
+            },
+        }
+    if path in ("/data/top/mktcapfull", "/data/top/totalvolfull"):
+        coins = [_cc_coin(s, tsym) for _ in range(_count(params.get("limit")))]
+        return {"Message": "Success", "Type": 100, "MetaData": {"Count": len(coins) * 100}, "SponsoredData": [], "Data": coins, "RateLimit": {}, "HasWarning": False}
+    if path == "/data/top/exchanges":
+        return {
+            "Response": "Success",
+            "Data": [
+                {
+                    "exchange": s.random.choice(["Binance", "Coinbase", "Kraken", "OKX", "Bybit", "Bitstamp"]),
+                    "fromSymbol": params.get("fsym", "BTC"),
+                    "toSymbol": tsym,
+                    "volume24h": s.amount(),
+                    "volume24hTo": s.amount(10**6, 10**10),
+                }
+                for _ in range(ITEMS)
+            ],
+        }
+    if path in ("/data/v2/news", "/data/v2/news/"):
+        categories = params.get("categories", "BTC")
+        published = int(params.get("lTs", time.time()))
+        return {
+            "Type": 100,
+            "Message": "News list successfully returned",
+            "Promoted": [],
+            "Data": [
+                {
+                    "id": str(s.integer(10**6, 10**8)),
+                    "guid": f"https://example.org/news/{s.integer()}",
+                    "published_on": published - s.integer(0, 86400),
+                    "imageurl": "https://example.org/news.png",
+                    "title": f"{categories} {s.random.choice(['rallies', 'slips', 'holds steady', 'breaks out'])} as markets move",
+                    "url": f"https://example.org/news/{s.integer()}",
+                    "body": " ".join(s.random.choice(["market", "traders", categories, "volume", "price", "on-chain", "liquidity"]) for _ in range(60)),
+                    "tags": categories,
+                    "lang": "EN",
+                    "upvotes": "0",
+                    "downvotes": "0",
+                    "categories": categories,
+                    "source_info": {"name": "Stand-in News", "img": "https://example.org/logo.png", "lang": "EN"},
+                    "source": "standin",
+                }
+                for _ in range(ITEMS)
+            ],
+            "RateLimit": {},
+            "HasWarning": False,
+        }
+    return None
+
+
+###############################################
+# Routes
+###############################################
+
+async def _respond(provider: str, produce) -> JSONResponse:
+    stats["requests"] += 1
+    stats["providers"][provider] = stats["providers"].get(provider, 0) + 1
+    delay = max(LATENCY + random.uniform(-JITTER, JITTER), 0.0)
+    if delay:
+        await asyncio.sleep(delay)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        stats["errors_injected"] += 1
+        headers = {"Retry-After": "1"} if ERROR_STATUS == 429 else None
+        return JSONResponse({"message": "Injected error from the provider stand-in"}, status_code=ERROR_STATUS, headers=headers)
+    body = produce()
+    if body is None:
+        return JSONResponse({"message": "Not an endpoint the stand-in serves"}, status_code=404)
+    return JSONResponse(body)
+
+
+@app.api_route("/moralis/api/v2.2/{path:path}", methods=["GET", "POST"])
+async def moralis(path: str, request: Request):
+    body = await request.json() if request.method == "POST" else None
+    return await _respond("moralis", lambda: _moralis(path, dict(request.query_params), body))
+
+
+@app.post("/graph/api/{api_key}/subgraphs/id/{subgraph_id}")
+async def graph(api_key: str, subgraph_id: str, request: Request):
+    payload = await request.json()
+    return await _respond("graph", lambda: _graph(payload.get("query", "")))
+
+
+@app.get("/cryptocompare/{path:path}")
+async def cryptocompare(path: str, request: Request):
+    return await _respond("crypto_compare", lambda: _cryptocompare(f"/{path}", dict(request.query_params)))
+
+
+@app.post("/pinata/pinning/pinFileToIPFS")
+async def pinata(request: Request):
+    # The multipart body is not parsed; its size and hash make the pin
+    upload = await request.body()
+    s = Synth(hashlib.sha256(upload).hexdigest())
+    return await _respond("pinata", lambda: {"IpfsHash": s.cid(), "PinSize": len(upload), "Timestamp": s.iso()})
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "items": ITEMS, "latency": LATENCY, "jitter": JITTER, "error_rate": ERROR_RATE, "error_status": ERROR_STATUS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--workers", type=int, default=1, help="server processes; use several for thousands of requests per second")
+    parser.add_argument("--items", type=int, default=ITEMS, help="entries per list in responses")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=JITTER, help="up to this many seconds more or less latency")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=ERROR_STATUS, help="status of failed requests; 429 comes with Retry-After")
+    parser.add_argument("--seed", default=SEED, help="seed of the synthetic data")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    os.environ.update({
+        "STANDIN_ITEMS": str(args.items),
+        "STANDIN_LATENCY": str(args.latency),
+        "STANDIN_JITTER": str(args.jitter),
+        "STANDIN_ERROR_RATE": str(args.error_rate),
+        "STANDIN_ERROR_STATUS": str(args.error_status),
+        "STANDIN_SEED": args.seed,
+    })
+    uvicorn.run("provider_standin:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
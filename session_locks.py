@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List
+
+
+class SessionLocks:
+    """One re-entrant lock per session ID, for worker threads
+
+    Locks only exist while someone holds or waits for them, so the table stays
+    as small as the number of sessions currently in use. Different sessions
+    never contend with each other.
+    """
+
+    def __init__(self):
+        # session_id -> [lock, holders and waiters]
+        self._locks: Dict[str, List] = {}
+        self._guard = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+
+    @contextmanager
+    def hold(self, session_id: str):
+        with self._guard:
+            entry = self._locks.get(session_id)
+            if entry is None:
+                entry = self._locks[session_id] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            lock = entry[0]
+            contended = not lock.acquire(blocking=False)
+            if contended:
+                lock.acquire()
+            with self._guard:
+                self.acquisitions += 1
+                self.contended += contended
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[session_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._guard:
+            active = len(self._locks)
+        return {"active": active, "acquisitions": self.acquisitions, "contended": self.contended}
+
+
+class AsyncSessionLocks:
+    """One asyncio lock per session ID, so turns of a session run in order
+
+    Requests for the same session queue up in arrival order while other
+    sessions proceed in parallel.
+    """
+
+    def __init__(self):
+        # session_id -> [lock, holders and waiters]
+        self._locks: Dict[str, List] = {}
+        self.acquisitions = 0
+        self.contended = 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            lock = entry[0]
+            if lock.locked():
+                self.contended += 1
+            async with lock:
+                self.acquisitions += 1
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[session_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": len(self._locks), "acquisitions": self.acquisitions, "contended": self.contended}
@@ -0,0 +1,72 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class StartupProfile:
+    """Wall-clock time spent in each phase of starting the agent
+
+    Phases are recorded in the order they finish. `ready()` marks the end of
+    startup; work deferred to first use (such as loading the wallet) is
+    recorded whenever it happens and reported separately, so the report shows
+    what startup paid for and what was left for later. Startup is measured
+    from the first import of this module.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases: List[Tuple[str, float]] = []
+        # Wall-clock startup time and number of phases it covers, once ready
+        self.startup: Optional[float] = None
+        self._startup_phases = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    def ready(self):
+        """Mark the end of startup; later phases are reported as deferred"""
+        with self._lock:
+            self.startup = time.monotonic() - self.started
+            self._startup_phases = len(self.phases)
+
+    def report(self) -> Dict[str, object]:
+        with self._lock:
+            phases = list(self.phases)
+            startup_phases = self._startup_phases if self.startup is not None else len(phases)
+        return {
+            "startup": self.startup,
+            "phases": [
+                {"phase": name, "seconds": round(duration, 4), "deferred": index >= startup_phases}
+                for index, (name, duration) in enumerate(phases)
+            ],
+        }
+
+    def format(self) -> str:
+        report = self.report()
+        measured = sum(phase["seconds"] for phase in report["phases"] if not phase["deferred"])
+        total = report["startup"] or measured
+        lines = ["Startup profile:"]
+        for phase in report["phases"]:
+            if phase["deferred"]:
+                lines.append(f"  {phase['phase']:<24} {phase['seconds']:8.3f}s  (deferred)")
+            else:
+                share = 100 * phase["seconds"] / total if total else 0.0
+                lines.append(f"  {phase['phase']:<24} {phase['seconds']:8.3f}s {share:5.1f}%")
+        lines.append(f"  {'other':<24} {max(total - measured, 0.0):8.3f}s")
+        lines.append(f"  {'total':<24} {total:8.3f}s")
+        return "\n".join(lines)
+
+
+# Shared by every module that takes part in startup
+profile = StartupProfile()
@@ -0,0 +1,18 @@
+from .records import message_to_record, record_to_message, load_json_histories, import_json_histories
+from .log_store import LogStore
+from .sqlite_store import SqliteStore
+from .write_behind import WriteBehindStore
+from .factory import open_store
+from .session_cache import SessionCache
+
+__all__ = [
+    'message_to_record',
+    'record_to_message',
+    'load_json_histories',
+    'import_json_histories',
+    'LogStore',
+    'SqliteStore',
+    'WriteBehindStore',
+    'open_store',
+    'SessionCache',
+]
@@ -0,0 +1,36 @@
+import os
+from typing import Optional
+
+from .log_store import LogStore
+from .sqlite_store import SqliteStore
+from .write_behind import WriteBehindStore
+
+
+def open_store(backend: Optional[str] = None):
+    """Open the conversation store selected by CONVERSATION_STORE
+
+    Unless CONVERSATION_WRITE_BEHIND=0, the store is wrapped in a group-commit
+    write-behind queue so appends never block the request path.
+
+    Args:
+        backend: "log" (default) or "sqlite", overrides the environment
+    """
+    store = _open_backend(backend or os.getenv("CONVERSATION_STORE", "log"))
+    if os.getenv("CONVERSATION_WRITE_BEHIND", "1") == "0":
+        return store
+    return WriteBehindStore(
+        store,
+        batch_size=int(os.getenv("CONVERSATION_FLUSH_BATCH", "256")),
+        max_delay=float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "0.2")),
+    )
+
+
+def _open_backend(backend: str):
+    if backend == "log":
+        return LogStore(
+            os.getenv("CONVERSATION_LOG_DIR", "conversation_log"),
+            num_shards=int(os.getenv("CONVERSATION_LOG_SHARDS", "64")),
+        )
+    if backend == "sqlite":
+        return SqliteStore(os.getenv("CONVERSATION_DB", "conversations.db"))
+    raise ValueError(f"Unknown conversation store backend: {backend}")
@@ -0,0 +1,715 @@
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# (segment id, byte offset, record length)
+IndexEntry = Tuple[int, int, int]
+
+SEGMENT_SUFFIX = ".log"
+# Per-shard file with a lower bound on its sessions' last write times
+MANIFEST = "manifest.json"
+
+
+def _segment_ids(directory: str) -> List[int]:
+    ids = []
+    for name in os.listdir(directory):
+        if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+            ids.append(int(name[:-len(SEGMENT_SUFFIX)]))
+    return sorted(ids)
+
+
+def _segment_path(directory: str, segment_id: int) -> str:
+    return os.path.join(directory, f"{segment_id:08d}{SEGMENT_SUFFIX}")
+
+
+def _read_header(path: str) -> Optional[dict]:
+    with open(path, "rb") as f:
+        line = f.readline()
+    try:
+        return json.loads(line) if line else None
+    except json.JSONDecodeError:
+        return None
+
+
+def scan_activity(directory: str) -> Tuple[Dict[str, float], Optional[str]]:
+    """Last write time of every live session of a shard, without building its index
+
+    Read-only: a torn tail is left for the shard to truncate when it loads.
+
+    Returns:
+        The last write time per session, and the path of the last segment if
+        it ends on a whole record (so a record can be appended to it), else None
+    """
+    segment_ids = _segment_ids(directory)
+    for segment_id in reversed(segment_ids):
+        header = _read_header(_segment_path(directory, segment_id))
+        if header and header.get("op") == "compact":
+            segment_ids = [i for i in segment_ids if i >= segment_id]
+            break
+
+    activity: Dict[str, float] = {}
+    clean = True
+    for segment_id in segment_ids:
+        path = _segment_path(directory, segment_id)
+        mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except json.JSONDecodeError:
+                    record = None
+                if record is None:
+                    break
+                offset += len(line)
+                session_id = record.get("sid")
+                if session_id is None:
+                    continue
+                if record.get("op") == "delete":
+                    activity.pop(session_id, None)
+                else:
+                    activity[session_id] = max(activity.get(session_id, 0.0), record.get("ts", mtime))
+        clean = offset == os.path.getsize(path)
+    last = _segment_path(directory, segment_ids[-1]) if segment_ids and clean else None
+    return activity, last
+
+
+class LogShard:
+    """One append-only segment log holding a subset of the sessions
+
+    Every message is appended as one JSON line to the active segment file, so a
+    write costs O(1) regardless of how much history is stored. An in-memory
+    offset index maps each session to the location of its records, and sealed
+    segments can be compacted to drop the records of deleted sessions.
+
+    Record lines look like:
+        {"sid": "...", "ts": 1.0, "type": "human", "content": "..."}   a message
+        {"sid": "...", "ts": 1.0, "op": "create"}                      an empty session
+        {"sid": "...", "op": "delete"}                                 a tombstone
+        {"op": "compact", "base": 3}                                   compaction header
+
+    `ts` is the write time, used to find idle sessions; records written before
+    it existed fall back to the modification time of their segment.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int, fsync: bool = False):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, List[IndexEntry]] = {}
+        self._markers: Dict[str, Tuple[int, int]] = {}
+        self._last_active: Dict[str, float] = {}
+        self._segment_bytes: Dict[int, int] = {}
+        self._live_bytes: Dict[int, int] = {}
+        self._active_id = 0
+        self._active_file = None
+        self._load()
+
+    # Segment helpers
+
+    def _segment_path(self, segment_id: int) -> str:
+        return _segment_path(self.directory, segment_id)
+
+    def _segment_ids(self) -> List[int]:
+        return _segment_ids(self.directory)
+
+    def _load(self):
+        """Rebuild the offset index by scanning all segments"""
+        segment_ids = self._segment_ids()
+
+        # A compacted segment supersedes every segment numbered below it. If we
+        # crashed before those were removed, finish the job now.
+        for segment_id in reversed(segment_ids):
+            header = self._read_header(segment_id)
+            if header and header.get("op") == "compact":
+                for old_id in [i for i in segment_ids if i < segment_id]:
+                    os.remove(self._segment_path(old_id))
+                segment_ids = [i for i in segment_ids if i >= segment_id]
+                break
+
+        for segment_id in segment_ids:
+            self._scan_segment(segment_id)
+
+        self._active_id = segment_ids[-1] if segment_ids else 1
+        self._open_active()
+
+    def _read_header(self, segment_id: int) -> Optional[dict]:
+        return _read_header(self._segment_path(segment_id))
+
+    def _scan_segment(self, segment_id: int):
+        self._segment_bytes[segment_id] = 0
+        self._live_bytes[segment_id] = 0
+        mtime = os.path.getmtime(self._segment_path(segment_id))
+        with open(self._segment_path(segment_id), "rb") as f:
+            offset = 0
+            for line in f:
+                length = len(line)
+                if not line.endswith(b"\n"):
+                    # Torn write from a crash; truncate it away
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                record.setdefault("ts", mtime)
+                self._apply(record, segment_id, offset, length)
+                offset += length
+            self._segment_bytes[segment_id] = offset
+        if offset != os.path.getsize(self._segment_path(segment_id)):
+            with open(self._segment_path(segment_id), "r+b") as f:
+                f.truncate(offset)
+
+    def _apply(self, record: dict, segment_id: int, offset: int, length: int):
+        """Apply a single log record to the in-memory index"""
+        session_id = record.get("sid")
+        op = record.get("op")
+        if session_id is None:
+            if op == "compact":
+                # The header stays as long as its segment, like a live record
+                self._live_bytes[segment_id] = self._live_bytes.get(segment_id, 0) + length
+            return
+        if op == "delete":
+            self._drop(session_id)
+            return
+        self._last_active[session_id] = max(self._last_active.get(session_id, 0.0), record.get("ts", 0.0))
+        if op == "create":
+            if session_id not in self._index:
+                self._index[session_id] = []
+                self._markers[session_id] = (segment_id, length)
+                self._live_bytes[segment_id] = self._live_bytes.get(segment_id, 0) + length
+        else:
+            self._index.setdefault(session_id, []).append((segment_id, offset, length))
+            self._live_bytes[segment_id] = self._live_bytes.get(segment_id, 0) + length
+
+    def _drop(self, session_id: str):
+        for segment_id, _, length in self._index.pop(session_id, []):
+            self._live_bytes[segment_id] -= length
+        marker = self._markers.pop(session_id, None)
+        if marker is not None:
+            self._live_bytes[marker[0]] -= marker[1]
+        self._last_active.pop(session_id, None)
+
+    def _open_active(self):
+        if self._active_file is not None:
+            self._active_file.close()
+        self._active_file = open(self._segment_path(self._active_id), "ab")
+        self._segment_bytes.setdefault(self._active_id, 0)
+        self._live_bytes.setdefault(self._active_id, 0)
+
+    def _write(self, record: dict, sync: bool = True) -> Tuple[int, int, int]:
+        """Append a record to the active segment, rolling it when full
+
+        With sync=False the line is left in the file buffer; the caller is
+        responsible for calling sync() before releasing the lock.
+        """
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        if self._segment_bytes[self._active_id] + len(line) > self.max_segment_bytes \
+                and self._segment_bytes[self._active_id] > 0:
+            self._active_id += 1
+            self._open_active()
+        offset = self._segment_bytes[self._active_id]
+        self._active_file.write(line)
+        if sync:
+            self._active_file.flush()
+            if self.fsync:
+                os.fsync(self._active_file.fileno())
+        self._segment_bytes[self._active_id] += len(line)
+        return self._active_id, offset, len(line)
+
+    # Shard interface
+
+    def append(self, session_id: str, record: dict):
+        """Append one message record to a session"""
+        line_record = {"sid": session_id, "ts": round(time.time(), 3), **record}
+        with self._lock:
+            self._apply(line_record, *self._write(line_record))
+
+    def append_batch(self, items: List[Tuple[str, dict]]):
+        """Append many (session_id, record) pairs with a single fsync"""
+        now = round(time.time(), 3)
+        with self._lock:
+            for session_id, record in items:
+                line_record = {"sid": session_id, "ts": now, **record}
+                self._apply(line_record, *self._write(line_record, sync=False))
+            self.sync()
+
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        """Read a session's records, optionally only the most recent `limit`"""
+        records = []
+        handles = {}
+        with self._lock:
+            entries = self._index.get(session_id, [])
+            if limit is not None:
+                entries = entries[-limit:] if limit > 0 else []
+            try:
+                for segment_id, offset, length in entries:
+                    if segment_id not in handles:
+                        handles[segment_id] = open(self._segment_path(segment_id), "rb")
+                    f = handles[segment_id]
+                    f.seek(offset)
+                    record = json.loads(f.read(length))
+                    record.pop("sid", None)
+                    record.pop("ts", None)
+                    records.append(record)
+            finally:
+                for f in handles.values():
+                    f.close()
+        return records
+
+    def sessions(self) -> List[str]:
+        """List all live session IDs"""
+        with self._lock:
+            return list(self._index.keys())
+
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for a session"""
+        with self._lock:
+            return len(self._index.get(session_id, []))
+
+    def has_session(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._index
+
+    def create_session(self, session_id: str):
+        """Persist an empty session so it survives restarts"""
+        with self._lock:
+            if session_id not in self._index:
+                record = {"sid": session_id, "ts": round(time.time(), 3), "op": "create"}
+                self._apply(record, *self._write(record))
+
+    def delete_session(self, session_id: str):
+        """Write a tombstone for a session and drop it from the index"""
+        with self._lock:
+            if session_id in self._index:
+                self._write({"sid": session_id, "op": "delete"})
+                self._drop(session_id)
+
+    def last_active(self, session_id: str) -> Optional[float]:
+        """Time of the session's latest write, or None if it does not exist"""
+        with self._lock:
+            return self._last_active.get(session_id) if session_id in self._index else None
+
+    def idle_sessions(self, max_idle: float) -> List[str]:
+        """Sessions with no writes in the last `max_idle` seconds"""
+        cutoff = time.time() - max_idle
+        with self._lock:
+            return [sid for sid in self._index if self._last_active.get(sid, 0.0) < cutoff]
+
+    def import_histories(self, histories: Dict[str, List[dict]]) -> int:
+        """Bulk-load raw histories
+
+        Returns:
+            The number of messages imported
+        """
+        imported = 0
+        with self._lock:
+            for session_id, records in histories.items():
+                self.create_session(session_id)
+                for record in records:
+                    self.append(session_id, {"type": record["type"], "content": record["content"]})
+                    imported += 1
+        return imported
+
+    # Compaction
+
+    def dead_ratio(self) -> float:
+        """Fraction of bytes in sealed segments that are no longer live"""
+        with self._lock:
+            sealed = [i for i in self._segment_bytes if i != self._active_id]
+            total = sum(self._segment_bytes[i] for i in sealed)
+            live = sum(self._live_bytes.get(i, 0) for i in sealed)
+        return (total - live) / total if total else 0.0
+
+    def compact(self) -> int:
+        """Rewrite the live records of all sealed segments into one segment
+
+        The compacted segment takes the id of the newest sealed segment and
+        starts with a header that marks every older segment as superseded, so a
+        crash part-way through never duplicates or loses records.
+
+        Returns:
+            The number of bytes reclaimed
+        """
+        with self._lock:
+            sealed = sorted(i for i in self._segment_bytes if i != self._active_id)
+            if not sealed:
+                return 0
+            before = sum(self._segment_bytes[i] for i in sealed)
+            if before == sum(self._live_bytes.get(i, 0) for i in sealed):
+                # Nothing dead to reclaim
+                return 0
+            target_id = sealed[-1]
+            sealed_set = set(sealed)
+
+            tmp_path = self._segment_path(target_id) + ".compact"
+            new_index: Dict[str, List[IndexEntry]] = {}
+            new_markers: Dict[str, Tuple[int, int]] = {}
+            with open(tmp_path, "wb") as out:
+                header = (json.dumps({"op": "compact", "base": sealed[0]}) + "\n").encode("utf-8")
+                out.write(header)
+                offset = len(header)
+                live = len(header)
+                handles = {}
+                try:
+                    for session_id, entries in self._index.items():
+                        old = [e for e in entries if e[0] in sealed_set]
+                        kept = [e for e in entries if e[0] not in sealed_set]
+                        moved = []
+                        marker = self._markers.get(session_id)
+                        if marker is not None and marker[0] not in sealed_set:
+                            new_markers[session_id] = marker
+                        elif not old:
+                            marker_record = {"sid": session_id, "ts": self._last_active.get(session_id, 0.0), "op": "create"}
+                            line = (json.dumps(marker_record) + "\n").encode("utf-8")
+                            out.write(line)
+                            new_markers[session_id] = (target_id, len(line))
+                            offset += len(line)
+                            live += len(line)
+                        for segment_id, entry_offset, length in old:
+                            if segment_id not in handles:
+                                handles[segment_id] = open(self._segment_path(segment_id), "rb")
+                            handles[segment_id].seek(entry_offset)
+                            out.write(handles[segment_id].read(length))
+                            moved.append((target_id, offset, length))
+                            offset += length
+                            live += length
+                        new_index[session_id] = moved + kept
+                finally:
+                    for f in handles.values():
+                        f.close()
+                out.flush()
+                os.fsync(out.fileno())
+
+            os.replace(tmp_path, self._segment_path(target_id))
+            for segment_id in sealed[:-1]:
+                os.remove(self._segment_path(segment_id))
+                del self._segment_bytes[segment_id]
+                self._live_bytes.pop(segment_id, None)
+
+            self._index = new_index
+            self._markers = new_markers
+            self._segment_bytes[target_id] = offset
+            self._live_bytes[target_id] = live
+            return max(before - offset, 0)
+
+    def sync(self):
+        """Force the active segment to disk"""
+        with self._lock:
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+
+    def close(self):
+        """Close the active segment"""
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.close()
+                self._active_file = None
+
+
+class _SweptShard:
+    """What the last idle sweep found in a shard that is not loaded"""
+    __slots__ = ("idle", "oldest_active", "segment")
+
+    def __init__(self, idle: Dict[str, float], oldest_active: float, segment: str):
+        # Idle sessions not deleted yet, with their last write times
+        self.idle = idle
+        # Oldest last write among the shard's other sessions
+        self.oldest_active = oldest_active
+        # Segment that tombstones are appended to
+        self.segment = segment
+
+
+class LogStore:
+    """Append-only, log-structured conversation store sharded by session ID
+
+    Sessions are spread over `num_shards` independent segment logs by a stable
+    hash of their ID. A shard's offset index is built only when one of its
+    sessions is first touched, so opening the store is constant-time and only
+    the shards of active sessions take memory. A background thread compacts
+    loaded shards once enough of their sealed bytes belong to deleted sessions.
+
+    Maintenance sweeps (`idle_sessions`, `sessions`) never load a shard. They
+    scan the segments of shards that are not loaded without indexing them,
+    and skip a shard entirely while its manifest shows that none of its
+    sessions can be idle yet. Idle sessions found that way are deleted by
+    appending their tombstones, still without loading the shard.
+    """
+
+    def __init__(
+        self,
+        directory: str = "conversation_log",
+        num_shards: int = 64,
+        max_segment_bytes: int = 16 * 1024 * 1024,
+        compaction_ratio: float = 0.5,
+        compaction_interval: float = 60.0,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.num_shards = num_shards
+        self.max_segment_bytes = max_segment_bytes
+        self.compaction_ratio = compaction_ratio
+        self.fsync = fsync
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._shards: Dict[int, LogShard] = {}
+        self._swept: Dict[int, _SweptShard] = {}
+        self._reshard_flat_layout()
+
+        self._stop = threading.Event()
+        self._compactor = None
+        if compaction_interval:
+            self._compactor = threading.Thread(
+                target=self._compaction_loop,
+                args=(compaction_interval,),
+                name="log-store-compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+
+    def _shard_path(self, shard_id: int) -> str:
+        return os.path.join(self.directory, f"shard-{shard_id:03d}")
+
+    def shard_for(self, session_id: str) -> int:
+        """Stable shard number for a session ID"""
+        return zlib.crc32(session_id.encode("utf-8")) % self.num_shards
+
+    def _shard(self, session_id: str) -> LogShard:
+        return self._open_shard(self.shard_for(session_id))
+
+    def _open_shard(self, shard_id: int) -> LogShard:
+        """Return a shard, scanning its segments on first access"""
+        with self._lock:
+            shard = self._shards.get(shard_id)
+            if shard is None:
+                shard = LogShard(self._shard_path(shard_id), self.max_segment_bytes, self.fsync)
+                self._shards[shard_id] = shard
+                # From now on the shard's index is the truth
+                self._swept.pop(shard_id, None)
+            return shard
+
+    def _loaded(self, shard_id: int) -> Optional[LogShard]:
+        with self._lock:
+            return self._shards.get(shard_id)
+
+    def _manifest_path(self, shard_id: int) -> str:
+        return os.path.join(self._shard_path(shard_id), MANIFEST)
+
+    def _read_manifest(self, shard_id: int) -> Optional[float]:
+        """The shard's recorded oldest last write, or None if unknown
+
+        Writes and deletes only ever move a shard's oldest last write forward,
+        so a recorded value stays a valid lower bound without being updated.
+        """
+        try:
+            with open(self._manifest_path(shard_id)) as f:
+                return float(json.load(f)["oldest_active"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_manifest(self, shard_id: int, oldest_active: float):
+        path = self._manifest_path(shard_id)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"oldest_active": oldest_active}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _existing_shard_ids(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.directory):
+            if name.startswith("shard-") and name[len("shard-"):].isdigit():
+                ids.append(int(name[len("shard-"):]))
+        return sorted(ids)
+
+    def _reshard_flat_layout(self):
+        """Move an unsharded log (segments directly in the directory) into shards"""
+        flat = [
+            name for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        ]
+        if not flat:
+            return
+        legacy = LogShard(self.directory, self.max_segment_bytes)
+        for session_id in list(legacy._index):
+            shard = self._shard(session_id)
+            shard.create_session(session_id)
+            for record in legacy.read(session_id):
+                shard.append(session_id, record)
+        legacy.close()
+        for shard in self._shards.values():
+            shard.sync()
+        for name in flat:
+            os.remove(os.path.join(self.directory, name))
+
+    # Store interface
+
+    def append(self, session_id: str, record: dict):
+        """Append one message record to a session"""
+        self._shard(session_id).append(session_id, record)
+
+    def append_batch(self, items: List[Tuple[str, dict]]):
+        """Append many (session_id, record) pairs, one fsync per touched shard"""
+        by_shard: Dict[int, List[Tuple[str, dict]]] = {}
+        for session_id, record in items:
+            by_shard.setdefault(self.shard_for(session_id), []).append((session_id, record))
+        for shard_id, shard_items in by_shard.items():
+            self._open_shard(shard_id).append_batch(shard_items)
+
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        """Read a session's records, optionally only the most recent `limit`"""
+        return self._shard(session_id).read(session_id, limit)
+
+    def sessions(self) -> List[str]:
+        """List all live session IDs
+
+        This scans every shard that is not loaded, so it is meant for
+        maintenance, not the request path.
+        """
+        session_ids = []
+        for shard_id in self._existing_shard_ids():
+            shard = self._loaded(shard_id)
+            if shard is not None:
+                session_ids.extend(shard.sessions())
+            else:
+                session_ids.extend(scan_activity(self._shard_path(shard_id))[0])
+        return session_ids
+
+    def is_empty(self) -> bool:
+        """Whether nothing has ever been written, without loading any shard"""
+        for shard_id in self._existing_shard_ids():
+            path = self._shard_path(shard_id)
+            if any(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)):
+                return False
+        return True
+
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for a session"""
+        return self._shard(session_id).count(session_id)
+
+    def has_session(self, session_id: str) -> bool:
+        return self._shard(session_id).has_session(session_id)
+
+    def create_session(self, session_id: str):
+        """Persist an empty session so it survives restarts"""
+        self._shard(session_id).create_session(session_id)
+
+    def delete_session(self, session_id: str):
+        """Write a tombstone for a session and drop it from the index"""
+        shard_id = self.shard_for(session_id)
+        with self._lock:
+            swept = self._swept.get(shard_id)
+            if swept is not None and session_id in swept.idle:
+                # Found idle by the last sweep and the shard is still not
+                # loaded, so the tombstone is all there is to write
+                line = (json.dumps({"sid": session_id, "op": "delete"}, separators=(",", ":")) + "\n").encode("utf-8")
+                with open(swept.segment, "ab") as f:
+                    f.write(line)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                del swept.idle[session_id]
+                if not swept.idle:
+                    del self._swept[shard_id]
+                    self._write_manifest(shard_id, swept.oldest_active)
+                return
+        self._open_shard(shard_id).delete_session(session_id)
+
+    def last_active(self, session_id: str) -> Optional[float]:
+        """Time of the session's latest write, or None if it does not exist"""
+        shard_id = self.shard_for(session_id)
+        with self._lock:
+            swept = self._swept.get(shard_id)
+            if swept is not None and session_id in swept.idle:
+                return swept.idle[session_id]
+        return self._open_shard(shard_id).last_active(session_id)
+
+    def idle_sessions(self, max_idle: float) -> List[str]:
+        """Sessions with no writes in the last `max_idle` seconds
+
+        Loads no shard: shards that are not loaded are skipped when their
+        manifest rules out idle sessions and scanned otherwise.
+        """
+        now = time.time()
+        cutoff = now - max_idle
+        session_ids = []
+        for shard_id in self._existing_shard_ids():
+            shard = self._loaded(shard_id)
+            if shard is not None:
+                session_ids.extend(shard.idle_sessions(max_idle))
+                continue
+            oldest_active = self._read_manifest(shard_id)
+            if oldest_active is not None and oldest_active >= cutoff:
+                continue
+
+            activity, segment = scan_activity(self._shard_path(shard_id))
+            idle = {sid: ts for sid, ts in activity.items() if ts < cutoff}
+            # An empty shard records now: any session created later is newer
+            self._write_manifest(shard_id, min(activity.values(), default=now))
+            rest = min((ts for ts in activity.values() if ts >= cutoff), default=now)
+            with self._lock:
+                if idle and segment is not None and shard_id not in self._shards:
+                    self._swept[shard_id] = _SweptShard(idle, rest, segment)
+            session_ids.extend(idle)
+        return session_ids
+
+    def import_histories(self, histories: Dict[str, List[dict]]) -> int:
+        """Bulk-load raw histories
+
+        Returns:
+            The number of messages imported
+        """
+        imported = 0
+        for session_id, records in histories.items():
+            shard = self._shard(session_id)
+            imported += shard.import_histories({session_id: records})
+        return imported
+
+    def flush(self):
+        """Force every loaded shard to disk"""
+        with self._lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.sync()
+
+    def loaded_shards(self) -> int:
+        """Number of shards whose index is currently in memory"""
+        with self._lock:
+            return len(self._shards)
+
+    # Compaction
+
+    def compact(self) -> int:
+        """Compact every loaded shard
+
+        Returns:
+            The number of bytes reclaimed
+        """
+        with self._lock:
+            shards = list(self._shards.values())
+        return sum(shard.compact() for shard in shards)
+
+    def _compaction_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            with self._lock:
+                shards = list(self._shards.values())
+            for shard in shards:
+                try:
+                    if shard.dead_ratio() >= self.compaction_ratio:
+                        shard.compact()
+                except Exception as e:
+                    print(f"Error compacting conversation log {shard.directory}: {e}")
+
+    def close(self):
+        """Stop background compaction and close all loaded shards"""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            for shard in self._shards.values():
+                shard.close()
+            self._shards = {}
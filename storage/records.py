@@ -0,0 +1,36 @@
+import json
+import os
+from typing import Dict, List, Optional
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+
+
+def message_to_record(message: BaseMessage) -> dict:
+    """Convert a LangChain message to the serializable record format"""
+    msg_type = 'human' if isinstance(message, HumanMessage) else 'ai'
+    return {'type': msg_type, 'content': message.content}
+
+
+def record_to_message(record: dict) -> Optional[BaseMessage]:
+    """Convert a stored record back to a LangChain message"""
+    if record.get('type') == 'human':
+        return HumanMessage(content=record['content'])
+    if record.get('type') == 'ai':
+        return AIMessage(content=record['content'])
+    return None
+
+
+def load_json_histories(path: str) -> Dict[str, List[dict]]:
+    """Read the legacy conversation_histories.json file as raw records"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def import_json_histories(path: str, store) -> int:
+    """Copy every session from the legacy JSON file into a store
+
+    Returns:
+        The number of messages imported
+    """
+    return store.import_histories(load_json_histories(path))
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from langchain_core.messages import BaseMessage
+
+# Rough per-message overhead of the LangChain object on top of its content
+MESSAGE_OVERHEAD_BYTES = 256
+
+
+def estimate_bytes(messages: List[BaseMessage]) -> int:
+    """Approximate the memory footprint of a list of messages"""
+    return sum(len(str(message.content)) + MESSAGE_OVERHEAD_BYTES for message in messages)
+
+
+class CachedSession:
+    """The most recent messages of one session held in memory"""
+
+    __slots__ = ("messages", "complete", "size")
+
+    def __init__(self, messages: List[BaseMessage], complete: bool):
+        self.messages = messages
+        # True when `messages` is the whole history, not just its tail
+        self.complete = complete
+        self.size = estimate_bytes(messages)
+
+
+class SessionCache:
+    """Memory-bounded LRU tier of hot sessions
+
+    Holds up to `tail` recent messages per session. When either the session
+    count or the byte budget is exceeded, the least recently used sessions are
+    evicted; the store already has their messages, so they are simply reloaded
+    on the next access.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024, tail: int = 50):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.tail = tail
+        self._entries: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str, limit: int) -> Optional[List[BaseMessage]]:
+        """Return the last `limit` messages if the cache can answer, else None"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or (limit > len(entry.messages) and not entry.complete):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry.messages[-limit:] if limit > 0 else []
+
+    def put(self, session_id: str, messages: List[BaseMessage], complete: bool):
+        """Cache the tail of a session loaded from the store"""
+        entry = CachedSession(messages[-self.tail:], complete and len(messages) <= self.tail)
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[session_id] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def append(self, session_id: str, message: BaseMessage):
+        """Append a new message to a cached session, if it is cached"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            entry.messages.append(message)
+            added = estimate_bytes([message])
+            entry.size += added
+            self._bytes += added
+            if len(entry.messages) > self.tail:
+                dropped = entry.messages[:-self.tail]
+                entry.messages = entry.messages[-self.tail:]
+                entry.complete = False
+                removed = estimate_bytes(dropped)
+                entry.size -= removed
+                self._bytes -= removed
+            self._entries.move_to_end(session_id)
+            self._evict()
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def _evict(self):
+        # Never evict the most recently used entry, even if it alone is over budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+            }
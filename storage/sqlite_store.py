@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .records import load_json_histories
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteStore:
+    """Conversation store backed by an embedded SQLite database in WAL mode
+
+    Messages are keyed on (session_id, seq), so reading the last N messages of a
+    session is a single indexed range scan. Each thread gets its own connection;
+    in WAL mode readers never block the writer and vice versa. Writes are
+    serialized through one lock, mirroring SQLite's single-writer model.
+    """
+
+    def __init__(self, path: str = "conversations.db"):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._conn()
+        # Only takes effect on a new database; lets compact() return freed pages
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _touch(self, conn: sqlite3.Connection, session_id: str, now: float):
+        conn.execute(
+            "INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, now, now),
+        )
+
+    def append(self, session_id: str, record: dict):
+        """Append one message record to a session"""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._touch(conn, session_id, time.time())
+                conn.execute(
+                    "INSERT INTO messages (session_id, seq, type, content) VALUES "
+                    "(?, COALESCE((SELECT MAX(seq) FROM messages WHERE session_id = ?), 0) + 1, ?, ?)",
+                    (session_id, session_id, record["type"], record["content"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def append_batch(self, items: List[Tuple[str, dict]]):
+        """Append many (session_id, record) pairs in a single transaction"""
+        now = time.time()
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for session_id in dict.fromkeys(session_id for session_id, _ in items):
+                    self._touch(conn, session_id, now)
+                conn.executemany(
+                    "INSERT INTO messages (session_id, seq, type, content) VALUES "
+                    "(?, COALESCE((SELECT MAX(seq) FROM messages WHERE session_id = ?), 0) + 1, ?, ?)",
+                    [
+                        (session_id, session_id, record["type"], record["content"])
+                        for session_id, record in items
+                    ],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        """Read a session's records, optionally only the most recent `limit`"""
+        if limit is not None and limit <= 0:
+            return []
+        rows = self._conn().execute(
+            "SELECT type, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, -1 if limit is None else limit),
+        ).fetchall()
+        return [{"type": row[0], "content": row[1]} for row in reversed(rows)]
+
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for a session"""
+        # seq is contiguous from 1, so the max is the count
+        return self._conn().execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+    def sessions(self) -> List[str]:
+        """List all session IDs"""
+        return [row[0] for row in self._conn().execute("SELECT session_id FROM sessions")]
+
+    def is_empty(self) -> bool:
+        """Whether the store holds no sessions"""
+        return self._conn().execute("SELECT 1 FROM sessions LIMIT 1").fetchone() is None
+
+    def has_session(self, session_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row is not None
+
+    def last_active(self, session_id: str) -> Optional[float]:
+        """Time of the session's latest write, or None if it does not exist"""
+        row = self._conn().execute(
+            "SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def idle_sessions(self, max_idle: float) -> List[str]:
+        """Sessions with no writes in the last `max_idle` seconds"""
+        return [
+            row[0] for row in self._conn().execute(
+                "SELECT session_id FROM sessions WHERE updated_at < ?", (time.time() - max_idle,)
+            )
+        ]
+
+    def create_session(self, session_id: str):
+        """Create an empty session if it does not exist yet"""
+        now = time.time()
+        with self._write_lock:
+            self._conn().execute(
+                "INSERT OR IGNORE INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)",
+                (session_id, now, now),
+            )
+
+    def delete_session(self, session_id: str):
+        """Delete a session and all of its messages"""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def import_histories(self, histories: Dict[str, List[dict]]) -> int:
+        """Bulk-load raw histories in a single transaction
+
+        Returns:
+            The number of messages imported
+        """
+        now = time.time()
+        imported = 0
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for session_id, records in histories.items():
+                    self._touch(conn, session_id, now)
+                    start = conn.execute(
+                        "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?",
+                        (session_id,),
+                    ).fetchone()[0]
+                    conn.executemany(
+                        "INSERT INTO messages (session_id, seq, type, content) VALUES (?, ?, ?, ?)",
+                        [
+                            (session_id, start + i + 1, record["type"], record["content"])
+                            for i, record in enumerate(records)
+                        ],
+                    )
+                    imported += len(records)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return imported
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """One-shot migration from the legacy conversation_histories.json format
+
+        The migration is recorded in the meta table, so running it again is a
+        no-op.
+
+        Returns:
+            The number of messages imported
+        """
+        key = f"migrated:{os.path.abspath(json_path)}"
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        imported = self.import_histories(load_json_histories(json_path))
+        with self._write_lock:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+        return imported
+
+    def flush(self):
+        """Nothing to do: every write is committed before it returns"""
+
+    def _disk_bytes(self) -> int:
+        return sum(
+            os.path.getsize(path) for path in (self.path, self.path + "-wal") if os.path.exists(path)
+        )
+
+    def compact(self) -> int:
+        """Release free pages left by deleted sessions and truncate the WAL
+
+        Returns:
+            The number of bytes reclaimed on disk
+        """
+        before = self._disk_bytes()
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return max(before - self._disk_bytes(), 0)
+
+    def close(self):
+        """Close every connection opened by this store"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+if __name__ == "__main__":
+    # Usage: python -m storage.sqlite_store conversation_histories.json conversations.db
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "conversation_histories.json"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "conversations.db"
+    store = SqliteStore(db_path)
+    print(f"Migrated {store.migrate_from_json(json_path)} messages from {json_path} to {db_path}")
+    store.close()
@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class WriteBehindStore:
+    """Group-commit persistence stage in front of another store
+
+    `append` only queues the record in memory and returns immediately, so the
+    request path (including the async streaming generator) never waits on disk.
+    A background thread drains the queue into the wrapped store's
+    `append_batch`, which costs one fsync per batch, as soon as `batch_size`
+    records are pending or the oldest one has waited `max_delay` seconds. At
+    most `max_delay` seconds of acknowledged messages can be lost on a crash;
+    `flush()` on clean shutdown loses nothing.
+
+    Reads merge queued records so callers always see their own writes.
+    """
+
+    def __init__(self, store, batch_size: int = 256, max_delay: float = 0.2, max_pending: int = 10000):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+
+        self._pending: List[Tuple[str, dict]] = []
+        self._pending_by_session: Dict[str, List[dict]] = {}
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        # Held while a batch moves from the queue to the store. Always taken
+        # before _cond, never while holding it.
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.records = 0
+
+        self._writer = threading.Thread(target=self._writer_loop, name="conversation-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, session_id: str, record: dict):
+        """Queue one message record for the next batch"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Store is closed")
+            # Backpressure: never hold more than max_pending unwritten records
+            while len(self._pending) >= self.max_pending:
+                self._cond.notify_all()
+                self._cond.wait(self.max_delay)
+            self._pending.append((session_id, record))
+            self._pending_by_session.setdefault(session_id, []).append(record)
+            if self._oldest is None:
+                # Wake the writer so it starts the max_delay timer for this batch
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _take_batch(self) -> List[Tuple[str, dict]]:
+        batch = self._pending
+        self._pending = []
+        self._oldest = None
+        return batch
+
+    def _write_batch(self, batch: List[Tuple[str, dict]]):
+        """Write a batch to the store; the caller must hold the flush lock"""
+        if not batch:
+            return
+        try:
+            self.store.append_batch(batch)
+        except Exception:
+            # Put the batch back in front so it is retried after max_delay
+            with self._cond:
+                self._pending = batch + self._pending
+                self._oldest = time.monotonic()
+            raise
+        self.batches += 1
+        self.records += len(batch)
+        # Drop the merged view only once the records are readable from the store
+        with self._cond:
+            for session_id, record in batch:
+                queued = self._pending_by_session[session_id]
+                queued.pop(0)
+                if not queued:
+                    del self._pending_by_session[session_id]
+            self._cond.notify_all()
+
+    def _ready(self) -> bool:
+        return self._oldest is not None and (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._oldest >= self.max_delay
+        )
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._ready():
+                    timeout = None if self._oldest is None else self.max_delay - (time.monotonic() - self._oldest)
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing conversation batch: {e}")
+
+    def flush(self):
+        """Synchronously write everything queued so far"""
+        with self._flush_lock:
+            with self._cond:
+                batch = self._take_batch()
+            self._write_batch(batch)
+
+    # Store interface
+
+    def read(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        """Read a session's records, including ones not yet written"""
+        # Holding the flush lock keeps a batch from moving between the queue
+        # and the store while we look at both
+        with self._flush_lock:
+            with self._cond:
+                queued = list(self._pending_by_session.get(session_id, []))
+            if limit is not None and len(queued) >= limit:
+                return queued[-limit:] if limit > 0 else []
+            stored = self.store.read(session_id, None if limit is None else limit - len(queued))
+        return stored + queued
+
+    def count(self, session_id: str) -> int:
+        """Number of messages for a session, including ones not yet written"""
+        with self._flush_lock:
+            with self._cond:
+                queued = len(self._pending_by_session.get(session_id, []))
+            return self.store.count(session_id) + queued
+
+    def sessions(self) -> List[str]:
+        self.flush()
+        return self.store.sessions()
+
+    def is_empty(self) -> bool:
+        with self._cond:
+            if self._pending:
+                return False
+        return self.store.is_empty()
+
+    def has_session(self, session_id: str) -> bool:
+        with self._cond:
+            if session_id in self._pending_by_session:
+                return True
+        return self.store.has_session(session_id)
+
+    def last_active(self, session_id: str) -> Optional[float]:
+        with self._cond:
+            if session_id in self._pending_by_session:
+                return time.time()
+        return self.store.last_active(session_id)
+
+    def idle_sessions(self, max_idle: float) -> List[str]:
+        self.flush()
+        return self.store.idle_sessions(max_idle)
+
+    def create_session(self, session_id: str):
+        self.store.create_session(session_id)
+
+    def delete_session(self, session_id: str):
+        # Queued appends must land before the delete, or they would resurrect it
+        self.flush()
+        self.store.delete_session(session_id)
+
+    def import_histories(self, histories: Dict[str, List[dict]]) -> int:
+        self.flush()
+        return self.store.import_histories(histories)
+
+    def compact(self) -> int:
+        return self.store.compact()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            pending = len(self._pending)
+        return {"pending": pending, "batches": self.batches, "records": self.records}
+
+    def close(self):
+        """Flush everything still queued, stop the writer and close the store"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self.flush()
+        self.store.close()
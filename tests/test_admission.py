@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+
+from admission import PRIORITY_BATCH, PRIORITY_INTERACTIVE, AdmissionController, AdmissionRejected
+
+
+class OrderingTest(unittest.IsolatedAsyncioTestCase):
+    """Queued runs start by priority, then in arrival order"""
+
+    async def test_interactive_runs_go_before_batch_runs(self):
+        admission = AdmissionController(max_concurrent=1, max_queue=10, per_client=10)
+        started = []
+        release = asyncio.Event()
+
+        async def run(name: str, priority: int):
+            async with admission.slot(priority):
+                started.append(name)
+                if name == "first":
+                    await release.wait()
+
+        tasks = [asyncio.create_task(run("first", PRIORITY_INTERACTIVE))]
+        await asyncio.sleep(0)
+        for name, priority in [("batch 1", PRIORITY_BATCH), ("chat 1", PRIORITY_INTERACTIVE),
+                               ("batch 2", PRIORITY_BATCH), ("chat 2", PRIORITY_INTERACTIVE)]:
+            tasks.append(asyncio.create_task(run(name, priority)))
+            await asyncio.sleep(0)
+        self.assertEqual(admission.stats()["queue_depth"], 4)
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(started, ["first", "chat 1", "chat 2", "batch 1", "batch 2"])
+        self.assertEqual(admission.stats()["running"], 0)
+
+    async def test_full_queue_is_refused(self):
+        admission = AdmissionController(max_concurrent=1, max_queue=1, per_client=10)
+        release = asyncio.Event()
+
+        async def run(client_id: str):
+            async with admission.client(client_id), admission.slot():
+                await release.wait()
+
+        tasks = [asyncio.create_task(run("a")), asyncio.create_task(run("b"))]
+        await asyncio.sleep(0)
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await run("c")
+        self.assertEqual(rejected.exception.status_code, 503)
+        release.set()
+        await asyncio.gather(*tasks)
+
+
+class PerClientTest(unittest.IsolatedAsyncioTestCase):
+    """A client may hold at most per_client runs, waiting ones included"""
+
+    async def test_client_over_its_limit_is_refused(self):
+        admission = AdmissionController(max_concurrent=1, max_queue=10, per_client=2)
+        release = asyncio.Event()
+
+        async def run(client_id: str):
+            async with admission.client(client_id), admission.slot():
+                await release.wait()
+
+        # One running and one queued: both count against the client
+        tasks = [asyncio.create_task(run("a")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await run("a")
+        self.assertEqual(rejected.exception.status_code, 429)
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        # Other clients still get in
+        tasks.append(asyncio.create_task(run("b")))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(admission.stats()["rejected_client"], 1)
+        self.assertEqual(admission.stats()["completed"], 3)
+
+    async def test_waiting_turn_takes_the_next_free_place(self):
+        admission = AdmissionController(max_concurrent=4, max_queue=10, per_client=1, queue_timeout=5)
+        started = []
+        release = asyncio.Event()
+
+        async def run(name: str, wait: bool):
+            async with admission.client("a", wait), admission.slot():
+                started.append(name)
+                if name == "first":
+                    await release.wait()
+
+        first = asyncio.create_task(run("first", False))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(run("waiting", True))
+        await asyncio.sleep(0)
+        self.assertEqual(started, ["first"])
+        release.set()
+        await asyncio.gather(first, waiting)
+        self.assertEqual(started, ["first", "waiting"])
+
+    async def test_waiting_turn_times_out(self):
+        admission = AdmissionController(max_concurrent=4, max_queue=10, per_client=1, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.client("a"):
+                await release.wait()
+
+        task = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with self.assertRaises(AdmissionRejected) as rejected:
+            async with admission.client("a", wait=True):
+                pass
+        self.assertEqual(rejected.exception.status_code, 429)
+        release.set()
+        await task
+        async with admission.client("a"):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph.message import add_messages
+
+from history_window import SUMMARY_ID, HistoryWindow, split_summary
+
+
+def _turn(i: int):
+    return [HumanMessage(content=f"question {i} " + "q " * 100), AIMessage(content=f"answer {i} " + "a " * 100)]
+
+
+class FoldStateTest(unittest.TestCase):
+    """A resumed thread's state stays bounded and keeps its summary"""
+
+    def test_state_is_bounded_and_keeps_the_summary(self):
+        window = HistoryWindow(token_budget=600)
+        state = []
+        for i in range(30):
+            question, answer = _turn(i)
+            updates, _ = window.fold_state([*state, question])
+            state = add_messages(state, [*updates, question, answer])
+
+        summary, rest = split_summary(state)
+        self.assertIsNotNone(summary)
+        self.assertLess(len(state), 10)
+        self.assertEqual(rest[-1].content, _turn(29)[1].content)
+        self.assertGreater(window.stats()["summary_updates"], 0)
+        self.assertEqual(window.stats()["turns"], 30)
+
+    def test_seeded_summary_is_recognised(self):
+        window = HistoryWindow(token_budget=600)
+        history = [message for i in range(10) for message in _turn(i)]
+        selected, _ = window.select("session", history, 0)
+        self.assertEqual(selected[0].id, SUMMARY_ID)
+
+        state = add_messages([], selected)
+        updates, _ = window.fold_state([*state, HumanMessage(content="next")])
+        state = add_messages(state, updates)
+        self.assertEqual(sum(message.id == SUMMARY_ID for message in state), 1)
+
+    def test_small_thread_is_left_alone(self):
+        window = HistoryWindow(token_budget=4000)
+        state = add_messages([], _turn(0))
+        updates, _ = window.fold_state([*state, HumanMessage(content="next")])
+        self.assertEqual(updates, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from storage import log_store
+from storage.log_store import LogShard, LogStore
+
+
+def _message(text: str) -> dict:
+    return {"type": "human", "content": text}
+
+
+class IdleSweepTest(unittest.TestCase):
+    """Finding and deleting idle sessions does not load shards"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _open(self) -> LogStore:
+        store = LogStore(self.directory, num_shards=8, compaction_interval=0)
+        self.addCleanup(store.close)
+        return store
+
+    def test_sweep_and_delete_without_loading(self):
+        store = self._open()
+        for i in range(20):
+            store.append(f"session-{i}", _message(f"hello {i}"))
+        store.close()
+
+        store = self._open()
+        idle = store.idle_sessions(-1)
+        self.assertEqual(sorted(idle), sorted(f"session-{i}" for i in range(20)))
+        self.assertIsNotNone(store.last_active("session-3"))
+        for session_id in idle:
+            store.delete_session(session_id)
+        self.assertEqual(store.loaded_shards(), 0)
+        store.close()
+
+        store = self._open()
+        self.assertEqual(store.sessions(), [])
+        self.assertEqual(store.read("session-3"), [])
+
+    def test_manifest_skips_shards_without_idle_sessions(self):
+        store = self._open()
+        store.append("session", _message("hello"))
+        store.close()
+
+        store = self._open()
+        self.assertEqual(store.idle_sessions(3600), [])
+        with mock.patch.object(log_store, "scan_activity", side_effect=AssertionError("scanned")):
+            self.assertEqual(store.idle_sessions(3600), [])
+        self.assertEqual(store.loaded_shards(), 0)
+
+    def test_write_after_sweep_keeps_the_session(self):
+        store = self._open()
+        store.append("session", _message("hello"))
+        store.close()
+
+        store = self._open()
+        self.assertEqual(store.idle_sessions(-1), ["session"])
+        # The shard loads for the write, so the sweep's findings no longer apply
+        store.append("session", _message("again"))
+        store.delete_session("other")
+        self.assertEqual(len(store.read("session")), 2)
+
+    def test_torn_tail_is_not_appended_to(self):
+        store = self._open()
+        store.append("session", _message("hello"))
+        store.close()
+        shard = os.path.join(self.directory, f"shard-{store.shard_for('session'):03d}")
+        segment = os.path.join(shard, sorted(os.listdir(shard))[0])
+        with open(segment, "ab") as f:
+            f.write(b'{"sid": "session", "ty')
+
+        store = self._open()
+        self.assertEqual(store.idle_sessions(-1), ["session"])
+        store.delete_session("session")
+        # The shard had to load (and truncate the torn write) to delete
+        self.assertEqual(store.loaded_shards(), 1)
+        self.assertFalse(store.has_session("session"))
+
+
+class LogShardTest(unittest.TestCase):
+    """Recovery from torn writes, and compaction of deleted sessions"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _open(self, max_segment_bytes: int = 1 << 20) -> LogShard:
+        shard = LogShard(self.directory, max_segment_bytes)
+        self.addCleanup(shard.close)
+        return shard
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(log_store.SEGMENT_SUFFIX))
+
+    def test_torn_write_is_truncated_on_load(self):
+        shard = self._open()
+        shard.append("session", _message("hello"))
+        shard.close()
+        segment = os.path.join(self.directory, self._segments()[-1])
+        size = os.path.getsize(segment)
+        with open(segment, "ab") as f:
+            f.write(b'{"sid": "session", "type": "ai", "con')
+
+        shard = self._open()
+        self.assertEqual(os.path.getsize(segment), size)
+        self.assertEqual(shard.read("session"), [_message("hello")])
+        # New records land after the last whole one
+        shard.append("session", _message("again"))
+        shard.close()
+        self.assertEqual(self._open().read("session"), [_message("hello"), _message("again")])
+
+    def test_compaction_drops_deleted_sessions(self):
+        shard = self._open(max_segment_bytes=256)
+        for i in range(20):
+            shard.append("kept", _message(f"kept {i}"))
+            shard.append("deleted", _message(f"deleted {i}"))
+        shard.create_session("empty")
+        shard.delete_session("deleted")
+        self.assertGreater(len(self._segments()), 2)
+        self.assertGreater(shard.dead_ratio(), 0)
+
+        self.assertGreater(shard.compact(), 0)
+        self.assertEqual(shard.dead_ratio(), 0)
+        # The sealed segments became one compacted segment, plus the active one
+        self.assertEqual(len(self._segments()), 2)
+        self.assertEqual(shard.compact(), 0)
+        expected = [_message(f"kept {i}") for i in range(20)]
+        self.assertEqual(shard.read("kept"), expected)
+        shard.close()
+
+        shard = self._open(max_segment_bytes=256)
+        self.assertEqual(sorted(shard.sessions()), ["empty", "kept"])
+        self.assertEqual(shard.read("kept"), expected)
+        self.assertEqual(shard.read("deleted"), [])
+
+    def test_compacted_segment_supersedes_older_ones_left_by_a_crash(self):
+        shard = self._open(max_segment_bytes=256)
+        for i in range(20):
+            shard.append("session", _message(f"message {i}"))
+        shard.delete_session("session")
+        shard.append("other", _message("hello"))
+        sealed = self._segments()[:-1]
+        with open(os.path.join(self.directory, sealed[0]), "rb") as f:
+            old_segment = f.read()
+        shard.compact()
+        shard.close()
+        # As if the process died before removing the superseded segments
+        with open(os.path.join(self.directory, sealed[0]), "wb") as f:
+            f.write(old_segment)
+
+        shard = self._open(max_segment_bytes=256)
+        self.assertNotIn(sealed[0], self._segments())
+        self.assertEqual(shard.sessions(), ["other"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from tools.resilience import CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    """The breaker opens on failures and lets one probe through when half-open"""
+
+    def _open_breaker(self, reset_timeout: float) -> CircuitBreaker:
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=reset_timeout)
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.failure()
+        return breaker
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        breaker.failure()
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        self.assertEqual(breaker.state, "closed")
+
+        breaker = self._open_breaker(reset_timeout=60)
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertGreater(breaker.retry_after(), 0)
+        self.assertEqual(breaker.rejected, 1)
+
+    def test_half_open_allows_a_single_probe(self):
+        breaker = self._open_breaker(reset_timeout=0)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, "half_open")
+        self.assertFalse(breaker.allow())
+        breaker.success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_opens_again(self):
+        breaker = self._open_breaker(reset_timeout=0)
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(breaker.opened, 2)
+        breaker.reset_timeout = 60
+        self.assertFalse(breaker.allow())
+
+    def test_released_probe_frees_the_slot(self):
+        breaker = self._open_breaker(reset_timeout=0)
+        self.assertTrue(breaker.allow())
+        breaker.release()
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
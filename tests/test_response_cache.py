@@ -0,0 +1,52 @@
+import unittest
+
+import httpx
+
+from tools import crypto_compare_tools, the_graph_uniswap_base_tools
+from tools.response_cache import _cacheable, cached, get_cache
+
+
+def _response(body) -> httpx.Response:
+    return httpx.Response(200, json=body, request=httpx.Request("GET", "https://example.org"))
+
+
+class ErrorResultsTest(unittest.TestCase):
+    """Provider errors sent with status 200 must not be cached"""
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_error_bodies_are_not_cacheable(self):
+        self.assertFalse(_cacheable({"Response": "Error", "Message": "You are over your rate limit"}))
+        self.assertFalse(_cacheable({"data": None, "errors": [{"message": "indexing_error"}]}))
+        self.assertFalse(_cacheable("Error: API returned status code 500"))
+        self.assertTrue(_cacheable({"USD": 2500.0}))
+        self.assertTrue(_cacheable({"data": {"pools": []}}))
+
+    def test_cached_tool_calls_the_provider_again_after_an_error(self):
+        calls = []
+
+        @cached("fetch_price")
+        def fetch_price(from_symbol, to_symbols):
+            calls.append(from_symbol)
+            return {"Response": "Error", "Message": "rate limit"} if len(calls) == 1 else {"USD": 2500.0}
+
+        self.assertEqual(fetch_price("ETH", ["USD"])["Response"], "Error")
+        self.assertEqual(fetch_price("ETH", ["USD"]), {"USD": 2500.0})
+        self.assertEqual(fetch_price("ETH", ["USD"]), {"USD": 2500.0})
+        self.assertEqual(len(calls), 2)
+
+    def test_crypto_compare_error_body_is_an_error_message(self):
+        result = crypto_compare_tools._result(_response({"Response": "Error", "Message": "rate limit"}))
+        self.assertEqual(result, "Error: rate limit")
+        self.assertEqual(crypto_compare_tools._result(_response({"USD": 1.0})), {"USD": 1.0})
+
+    def test_graph_errors_are_an_error_message(self):
+        result = the_graph_uniswap_base_tools._graph_result(_response({"errors": [{"message": "indexing_error"}]}))
+        self.assertEqual(result, "Error: The Graph returned errors: indexing_error")
+        body = {"data": {"pools": []}}
+        self.assertEqual(the_graph_uniswap_base_tools._graph_result(_response(body)), body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from storage.sqlite_store import SqliteStore
+
+
+class MigrationTest(unittest.TestCase):
+    """The legacy JSON histories are imported once"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.json_path = os.path.join(self.directory, "conversation_histories.json")
+        self.db_path = os.path.join(self.directory, "conversations.db")
+        self.histories = {
+            "first": [{"type": "human", "content": "hello"}, {"type": "ai", "content": "hi"}],
+            "second": [{"type": "human", "content": "gm"}],
+        }
+        with open(self.json_path, "w") as f:
+            json.dump(self.histories, f)
+
+    def _open(self) -> SqliteStore:
+        store = SqliteStore(self.db_path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_histories_are_imported_in_order(self):
+        store = self._open()
+        self.assertEqual(store.migrate_from_json(self.json_path), 3)
+        self.assertEqual(sorted(store.sessions()), ["first", "second"])
+        self.assertEqual(store.read("first"), self.histories["first"])
+        self.assertEqual(store.read("first", limit=1), self.histories["first"][-1:])
+        self.assertEqual(store.count("first"), 2)
+
+    def test_migration_runs_once(self):
+        store = self._open()
+        store.migrate_from_json(self.json_path)
+        store.append("first", {"type": "human", "content": "again"})
+        store.close()
+
+        store = self._open()
+        self.assertEqual(store.migrate_from_json(self.json_path), 0)
+        self.assertEqual(store.count("first"), 3)
+        self.assertEqual(store.read("first", limit=1), [{"type": "human", "content": "again"}])
+
+    def test_missing_file_imports_nothing(self):
+        store = self._open()
+        self.assertEqual(store.migrate_from_json(os.path.join(self.directory, "missing.json")), 0)
+        self.assertTrue(store.is_empty())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import unittest
+
+from storage.log_store import LogStore
+from storage.write_behind import WriteBehindStore
+
+
+def _message(text: str) -> dict:
+    return {"type": "human", "content": text}
+
+
+class FlushOnCloseTest(unittest.TestCase):
+    """Queued records are readable at once and written by close()"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _open(self) -> LogStore:
+        return LogStore(self.directory, num_shards=4, compaction_interval=0)
+
+    def test_close_writes_queued_records(self):
+        # Neither the batch size nor the delay is reached before close()
+        store = WriteBehindStore(self._open(), batch_size=1000, max_delay=3600)
+        for i in range(10):
+            store.append("session", _message(f"message {i}"))
+        self.assertEqual(store.stats()["pending"], 10)
+        self.assertEqual(store.count("session"), 10)
+        self.assertEqual(store.read("session", limit=2), [_message("message 8"), _message("message 9")])
+        store.close()
+        self.assertEqual(store.stats(), {"pending": 0, "batches": 1, "records": 10})
+
+        reopened = self._open()
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.read("session"), [_message(f"message {i}") for i in range(10)])
+
+    def test_reads_merge_stored_and_queued_records(self):
+        store = WriteBehindStore(self._open(), batch_size=1000, max_delay=3600)
+        self.addCleanup(store.close)
+        store.append("session", _message("stored"))
+        store.flush()
+        store.append("session", _message("queued"))
+        self.assertEqual(store.read("session"), [_message("stored"), _message("queued")])
+        self.assertEqual(store.read("session", limit=1), [_message("queued")])
+
+    def test_append_after_close_is_refused(self):
+        store = WriteBehindStore(self._open())
+        store.close()
+        with self.assertRaises(RuntimeError):
+            store.append("session", _message("late"))
+
+
+if __name__ == "__main__":
+    unittest.main()
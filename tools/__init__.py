@@ -1,110 +1,71 @@
-from .token_tool import deploy_multi_token, DeployMultiTokenInput, DEPLOY_MULTITOKEN_PROMPT
-from .browser_tool import when_no_api_search_like_human
-from .dalle_nft_tool import create_dalle_nft_tool, DalleNftInput, DALLE_NFT_PROMPT
-from .ipfs_upload_tool import create_pinata_upload_tool, UploadImageToPinataInput, UPLOAD_IMAGE_TO_PINATA_PROMPT 
-from .create_erc721_metadata_tool import create_erc721_metadata, UploadERC721MetadataInput, UPLOAD_ERC721_METADATA_PROMPT
-from .crypto_compare_tools import (
-    fetch_news_tool, FetchNewsInput, FETCH_NEWS_PROMPT,
-    fetch_price, FetchPriceInput, FETCH_PRICE_PROMPT,
-    fetch_trading_signals, FetchTradingSignalsInput, FETCH_TRADING_SIGNALS_PROMPT,
-    fetch_top_market_cap, FetchTopMarketCapInput, FETCH_TOP_MARKET_CAP_PROMPT,
-    fetch_top_exchanges, FetchTopExchangesInput, FETCH_TOP_EXCHANGES_PROMPT,
-    fetch_top_volume, FetchTopVolumeInput, FETCH_TOP_VOLUME_PROMPT,
-)
-from .moralis_tools import (
-    # Core wallet functions
-    fetch_wallet_history, WalletHistoryInput, WALLET_HISTORY_PROMPT,
-    fetch_wallet_balance, WalletBalanceInput, WALLET_BALANCE_PROMPT,
-    
-    # NFT related functions
-    fetch_nft_transfers, NFTTransfersInput, NFT_TRANSFERS_PROMPT,
-    fetch_wallet_nft_trades, WalletNFTTradesInput, WALLET_NFT_TRADES_PROMPT,
-    
-    # Token related functions
-    fetch_token_transfers, TokenTransfersInput, TOKEN_TRANSFERS_PROMPT,
-    fetch_wallet_tokens, WalletTokensInput, WALLET_TOKENS_PROMPT,
-    fetch_token_price, TokenPriceInput, TOKEN_PRICE_PROMPT,
-    fetch_batch_token_prices, BatchTokenPriceInput, BATCH_TOKEN_PRICES_PROMPT,
-    
-    # DeFi related functions
-    fetch_defi_positions, DeFiPositionsInput, DEFI_POSITIONS_PROMPT,
-    
-    # Trading data functions
-    fetch_pair_ohlcv, PairOHLCVInput, PAIR_OHLCV_PROMPT,
-)
-from .the_graph_uniswap_base_tools import (
-    fetch_large_swaps, GraphLargeSwapsInput, GRAPH_LARGE_SWAPS_PROMPT,
-    fetch_new_high_tvl_pools, GraphNewHighTVLPoolsInput, GRAPH_NEW_HIGH_TVL_POOLS_PROMPT,
-    fetch_high_fee_pools, GraphHighFeePoolsInput, GRAPH_HIGH_FEE_POOLS_PROMPT,
-    fetch_undervalued_tokens, GraphUndervaluedTokensInput, GRAPH_UNDERVALUED_TOKENS_PROMPT,
-    fetch_whale_accumulation, GraphWhaleAccumulationInput, GRAPH_WHALE_ACCUMULATION_PROMPT,
-    fetch_swap_trends, GraphSwapTrendsInput, GRAPH_SWAP_TRENDS_PROMPT,
-    fetch_gas_fees, GraphGasFeesInput, GRAPH_GAS_FEES_PROMPT,
-    fetch_arbitrage_opportunities, GraphArbitrageInput, GRAPH_ARBITRAGE_PROMPT,
-)
-from .web2_access_tool import web_search_tool, WebSearchInput, WEB_SEARCH_PROMPT
-from .dalle_nft_tool import (
-    create_dalle_nft_tool,
-    DalleNftInput,
-    DALLE_NFT_PROMPT,
-)
+import importlib
 
-__all__ = [
-    # Token tools
-    'deploy_multi_token',
-    'DeployMultiTokenInput',
-    'DEPLOY_MULTITOKEN_PROMPT',
-    
-    # Browser tools
-    'when_no_api_search_like_human',
-    
-    # DALLE tools
-    'create_dalle_nft_tool', 'DalleNftInput', 'DALLE_NFT_PROMPT',
-    
-    # IPFS upload tools
-    "create_pinata_upload_tool", "UploadImageToPinataInput", "UPLOAD_IMAGE_TO_PINATA_PROMPT" 
-    
-    # Web Search tools
-    'web_search_tool',
-    'WebSearchInput',
-    'WEB_SEARCH_PROMPT',
-    
-    # Crypto Compare tools
-    "fetch_news_tool", "FetchNewsInput", "FETCH_NEWS_PROMPT",
-    "fetch_price", "FetchPriceInput", "FETCH_PRICE_PROMPT",
-    "fetch_trading_signals", "FetchTradingSignalsInput", "FETCH_TRADING_SIGNALS_PROMPT",
-    "fetch_top_market_cap", "FetchTopMarketCapInput", "FETCH_TOP_MARKET_CAP_PROMPT",
-    "fetch_top_exchanges", "FetchTopExchangesInput", "FETCH_TOP_EXCHANGES_PROMPT",
-    "fetch_top_volume", "FetchTopVolumeInput", "FETCH_TOP_VOLUME_PROMPT",
+# Tool modules are imported on first access (PEP 562), so importing one tool
+# does not pull in the dependencies of all the others.
+_EXPORTS = {
+    ".token_tool": ("deploy_multi_token", "DeployMultiTokenInput", "DEPLOY_MULTITOKEN_PROMPT"),
+    ".browser_tool": ("when_no_api_search_like_human",),
+    ".dalle_nft_tool": ("create_dalle_nft_tool", "DalleNftInput", "DALLE_NFT_PROMPT"),
+    ".ipfs_upload_tool": ("create_pinata_upload_tool", "UploadImageToPinataInput", "UPLOAD_IMAGE_TO_PINATA_PROMPT"),
+    ".create_erc721_metadata_tool": ("create_erc721_metadata", "UploadERC721MetadataInput", "UPLOAD_ERC721_METADATA_PROMPT"),
+    ".crypto_compare_tools": (
+        "fetch_news_tool", "afetch_news_tool", "FetchNewsInput", "FETCH_NEWS_PROMPT",
+        "fetch_price", "afetch_price", "FetchPriceInput", "FETCH_PRICE_PROMPT",
+        "fetch_trading_signals", "afetch_trading_signals", "FetchTradingSignalsInput", "FETCH_TRADING_SIGNALS_PROMPT",
+        "fetch_top_market_cap", "afetch_top_market_cap", "FetchTopMarketCapInput", "FETCH_TOP_MARKET_CAP_PROMPT",
+        "fetch_top_exchanges", "afetch_top_exchanges", "FetchTopExchangesInput", "FETCH_TOP_EXCHANGES_PROMPT",
+        "fetch_top_volume", "afetch_top_volume", "FetchTopVolumeInput", "FETCH_TOP_VOLUME_PROMPT",
+    ),
+    ".moralis_tools": (
+        # Core wallet functions
+        "fetch_wallet_history", "afetch_wallet_history", "WalletHistoryInput", "WALLET_HISTORY_PROMPT",
+        "fetch_wallet_balance", "afetch_wallet_balance", "WalletBalanceInput", "WALLET_BALANCE_PROMPT",
 
-    # Moralis Core Wallet Tools
-    "fetch_wallet_history", "WalletHistoryInput", "WALLET_HISTORY_PROMPT",
-    "fetch_wallet_balance", "WalletBalanceInput", "WALLET_BALANCE_PROMPT",
-    
-    # Moralis NFT Tools
-    "fetch_nft_transfers", "NFTTransfersInput", "NFT_TRANSFERS_PROMPT",
-    "fetch_wallet_nft_trades", "WalletNFTTradesInput", "WALLET_NFT_TRADES_PROMPT",
-    
-    # Moralis Token Tools
-    "fetch_token_transfers", "TokenTransfersInput", "TOKEN_TRANSFERS_PROMPT",
-    "fetch_wallet_tokens", "WalletTokensInput", "WALLET_TOKENS_PROMPT",
-    "fetch_token_price", "TokenPriceInput", "TOKEN_PRICE_PROMPT",
-    "fetch_batch_token_prices", "BatchTokenPriceInput", "BATCH_TOKEN_PRICES_PROMPT",
-    
-    # Moralis DeFi Tools
-    "fetch_defi_positions", "DeFiPositionsInput", "DEFI_POSITIONS_PROMPT",
-    
-    # Moralis Trading Data Tools
-    "fetch_pair_ohlcv", "PairOHLCVInput", "PAIR_OHLCV_PROMPT",
-    
-    # Graph Protocol Tools
-    "fetch_large_swaps", "GraphLargeSwapsInput", "GRAPH_LARGE_SWAPS_PROMPT",
-    "fetch_new_high_tvl_pools", "GraphNewHighTVLPoolsInput", "GRAPH_NEW_HIGH_TVL_POOLS_PROMPT",
-    "fetch_high_fee_pools", "GraphHighFeePoolsInput", "GRAPH_HIGH_FEE_POOLS_PROMPT",
-    "fetch_undervalued_tokens", "GraphUndervaluedTokensInput", "GRAPH_UNDERVALUED_TOKENS_PROMPT",
-    "fetch_whale_accumulation", "GraphWhaleAccumulationInput", "GRAPH_WHALE_ACCUMULATION_PROMPT",
-    "fetch_swap_trends", "GraphSwapTrendsInput", "GRAPH_SWAP_TRENDS_PROMPT",
-    "fetch_gas_fees", "GraphGasFeesInput", "GRAPH_GAS_FEES_PROMPT",
-    "fetch_arbitrage_opportunities", "GraphArbitrageInput", "GRAPH_ARBITRAGE_PROMPT",
-    "create_erc721_metadata", "UploadERC721MetadataInput", "UPLOAD_ERC721_METADATA_PROMPT" 
-]
+        # NFT related functions
+        "fetch_nft_transfers", "afetch_nft_transfers", "NFTTransfersInput", "NFT_TRANSFERS_PROMPT",
+        "fetch_wallet_nft_trades", "afetch_wallet_nft_trades", "WalletNFTTradesInput", "WALLET_NFT_TRADES_PROMPT",
+
+        # Token related functions
+        "fetch_token_transfers", "afetch_token_transfers", "TokenTransfersInput", "TOKEN_TRANSFERS_PROMPT",
+        "fetch_wallet_tokens", "afetch_wallet_tokens", "WalletTokensInput", "WALLET_TOKENS_PROMPT",
+        "fetch_token_price", "afetch_token_price", "TokenPriceInput", "TOKEN_PRICE_PROMPT",
+        "fetch_batch_token_prices", "afetch_batch_token_prices", "BatchTokenPriceInput", "BATCH_TOKEN_PRICES_PROMPT",
+
+        # DeFi related functions
+        "fetch_defi_positions", "afetch_defi_positions", "DeFiPositionsInput", "DEFI_POSITIONS_PROMPT",
+
+        # Trading data functions
+        "fetch_pair_ohlcv", "afetch_pair_ohlcv", "PairOHLCVInput", "PAIR_OHLCV_PROMPT",
+    ),
+    ".the_graph_uniswap_base_tools": (
+        "fetch_large_swaps", "afetch_large_swaps", "GraphLargeSwapsInput", "GRAPH_LARGE_SWAPS_PROMPT",
+        "fetch_new_high_tvl_pools", "afetch_new_high_tvl_pools", "GraphNewHighTVLPoolsInput", "GRAPH_NEW_HIGH_TVL_POOLS_PROMPT",
+        "fetch_high_fee_pools", "afetch_high_fee_pools", "GraphHighFeePoolsInput", "GRAPH_HIGH_FEE_POOLS_PROMPT",
+        "fetch_undervalued_tokens", "afetch_undervalued_tokens", "GraphUndervaluedTokensInput", "GRAPH_UNDERVALUED_TOKENS_PROMPT",
+        "fetch_whale_accumulation", "afetch_whale_accumulation", "GraphWhaleAccumulationInput", "GRAPH_WHALE_ACCUMULATION_PROMPT",
+        "fetch_swap_trends", "afetch_swap_trends", "GraphSwapTrendsInput", "GRAPH_SWAP_TRENDS_PROMPT",
+        "fetch_gas_fees", "afetch_gas_fees", "GraphGasFeesInput", "GRAPH_GAS_FEES_PROMPT",
+        # fetch_arbitrage_opportunities has no coroutine version and is not
+        # given to the agent; import it from the module if needed
+    ),
+    ".web2_access_tool": ("web_search_tool", "WebSearchInput", "WEB_SEARCH_PROMPT"),
+    ".job_status_tool": ("job_status", "JobStatusInput", "JOB_STATUS_PROMPT"),
+}
+_LOCATIONS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name):
+    module = _LOCATIONS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    # Cache it so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LOCATIONS))
+
+
+__all__ = list(_LOCATIONS)
@@ -1,13 +1,9 @@
 import asyncio
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
-from browser_use import Agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from browser_use.browser.browser import Browser, BrowserConfig
-from browser_use.browser.context import BrowserContextConfig
-from dotenv import load_dotenv
-from pydantic import SecretStr
 import os
+
+from .cancellation import on_cancel
+from .jobs import report_progress
 # load_dotenv()
 # api_key = os.getenv('GEMINI_API_KEY')
 # if not api_key:
@@ -23,6 +19,12 @@ def when_no_api_search_like_human(message: str):
     Great for when you want to find something but there is no API for it.
     Also great for when user doesn't know something but you can teach them how to do it visually.
     """
+    # browser_use (and playwright) take a while to import, so load them on first use
+    from langchain_openai import ChatOpenAI
+    from browser_use import Agent
+    from browser_use.browser.browser import Browser, BrowserConfig
+    from browser_use.browser.context import BrowserContextConfig
+
     async def async_tool_logic():
         llm = ChatOpenAI(model="gpt-4o-mini")
         browser = Browser(
@@ -39,7 +41,15 @@ def when_no_api_search_like_human(message: str):
             browser=browser
         )
         
-        result = await browse_agent.run()
+        # Stop browsing as soon as the agent run is cancelled
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        unregister = on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+        try:
+            report_progress(f"Browsing: {message}")
+            result = await browse_agent.run()
+        finally:
+            unregister()
         return result
 
     # Run the async logic in a synchronous context
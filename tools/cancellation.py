@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+
+class RunCancelled(Exception):
+    """The agent run this tool call belongs to was cancelled"""
+
+
+class CancelScope:
+    """Cancellation shared by everything one agent run starts
+
+    The API opens a scope per run. Tools run in worker threads that inherit it
+    through the context, so they can stop between steps, and in-flight HTTP
+    requests made through `http_request` are aborted when it is cancelled.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error running cancel callback: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run `callback` on cancellation; returns a function that unregisters it"""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self._cancelled.is_set():
+            raise RunCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Block for up to timeout seconds; True if cancelled meanwhile"""
+        return self._cancelled.wait(timeout)
+
+
+_current_scope: ContextVar[Optional[CancelScope]] = ContextVar("cancel_scope", default=None)
+
+_stats_lock = threading.Lock()
+_stats = {"cancelled_runs": 0, "aborted_requests": 0}
+
+
+def open_scope() -> CancelScope:
+    """Start a new scope for the current context (and the tasks and threads it starts)"""
+    scope = CancelScope()
+    _current_scope.set(scope)
+    return scope
+
+
+def current_scope() -> Optional[CancelScope]:
+    return _current_scope.get()
+
+
+def raise_if_cancelled():
+    """Stop a tool between steps if its run was cancelled"""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.raise_if_cancelled()
+
+
+def sleep(seconds: float):
+    """time.sleep that wakes up and raises RunCancelled if the run is cancelled"""
+    scope = _current_scope.get()
+    if scope is None:
+        time.sleep(seconds)
+    elif scope.wait(seconds):
+        raise RunCancelled(scope.reason)
+
+
+async def asleep(seconds: float):
+    """Coroutine version of `sleep`; the task itself can be cancelled as usual"""
+    scope = _current_scope.get()
+    if scope is None:
+        await asyncio.sleep(seconds)
+        return
+    loop = asyncio.get_running_loop()
+    woken = loop.create_future()
+    unregister = scope.on_cancel(lambda: loop.call_soon_threadsafe(_wake, woken))
+    try:
+        await asyncio.wait_for(woken, seconds)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        unregister()
+    scope.raise_if_cancelled()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def on_cancel(callback: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback on the current scope, if any"""
+    scope = _current_scope.get()
+    if scope is None:
+        return lambda: None
+    return scope.on_cancel(callback)
+
+
+def record_cancelled_run():
+    with _stats_lock:
+        _stats["cancelled_runs"] += 1
+
+
+def record_aborted_request():
+    with _stats_lock:
+        _stats["aborted_requests"] += 1
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
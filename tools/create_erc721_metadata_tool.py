@@ -1,6 +1,7 @@
 # DEPRECATED by dalle_nft_tool.py
 import os
-import requests
+from .ipfs_upload_tool import PINATA_API_URL
+from .resilience import provider_request
 import json
 import io
 from typing import List, Optional
@@ -85,14 +86,14 @@ def create_erc721_metadata(
             }), "application/json")
         }
 
-        url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+        url = f"{PINATA_API_URL}/pinning/pinFileToIPFS"
         headers = {
-            # Do not manually set Content-Type; let requests handle the multipart boundary.
+            # Do not manually set Content-Type; let the HTTP client handle the multipart boundary.
             "Authorization": f"Bearer {jwt_token}"
         }
 
         # Upload the file and related metadata/options to Pinata
-        response = requests.post(url, files=files, headers=headers)
+        response = provider_request("pinata", "POST", url, files=files, headers=headers)
         response.raise_for_status()
 
         # Parse Pinata response
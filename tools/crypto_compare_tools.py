@@ -2,10 +2,11 @@ from typing import List
 import os
 import time
 import json
-import requests
+from .provider_tool import request_tool
+from .resilience import async_provider_request, provider_request
 from pydantic import BaseModel, Field
 
-CRYPTO_COMPARE_BASE_URL = "https://min-api.cryptocompare.com"
+CRYPTO_COMPARE_BASE_URL = os.getenv("CRYPTO_COMPARE_BASE_URL", "https://min-api.cryptocompare.com")
 CRYPTO_COMPARE_API_KEY = os.getenv("CRYPTO_COMPARE_API_KEY")
 
 class FetchNewsInput(BaseModel):
@@ -69,7 +70,54 @@ class FetchTopVolumeInput(BaseModel):
     )
 
 
-def fetch_price(from_symbol: str, to_symbols: List[str]) -> dict:
+def _headers() -> dict:
+    return {
+        "Accept": "application/json",
+        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
+    }
+
+
+def _result(response):
+    if response.status_code != 200:
+        return f"Error: API returned status code {response.status_code}"
+    result = response.json()
+    # Errors, rate limits included, come back with status 200
+    if isinstance(result, dict) and result.get("Response") == "Error":
+        return f"Error: {result.get('Message') or 'API returned an error'}"
+    return result
+
+
+def _get(path: str, params: dict = None):
+    """GET a min-api path; the JSON response, or an error message."""
+    response = provider_request("crypto_compare", "GET", f"{CRYPTO_COMPARE_BASE_URL}{path}", params=params, headers=_headers())
+    return _result(response)
+
+
+async def _aget(path: str, params: dict = None):
+    """Coroutine version of _get."""
+    response = await async_provider_request("crypto_compare", "GET", f"{CRYPTO_COMPARE_BASE_URL}{path}", params=params, headers=_headers())
+    return _result(response)
+
+
+def _news(token: str, timestamp: int = None):
+    """Fetch news articles for a token at a specific timestamp."""
+    # Use current time if no timestamp provided
+    if timestamp is None:
+        timestamp = int(time.time())
+
+    print(f"Fetching news for timestamp: {timestamp}")
+    return (f"/data/v2/news/?lang=EN&lTs={timestamp}&categories={token}&sign=true",)
+
+
+def _news_text(path: str):
+    return json.dumps(_get(path), indent=2)
+
+
+async def _anews_text(path: str):
+    return json.dumps(await _aget(path), indent=2)
+
+
+def _price(from_symbol: str, to_symbols: List[str]):
     """
     Fetch current price for a cryptocurrency in multiple currencies.
     
@@ -77,41 +125,25 @@ def fetch_price(from_symbol: str, to_symbols: List[str]) -> dict:
         from_symbol: Base currency symbol (e.g., 'BTC')
         to_symbols: List of quote currency symbols (e.g., ['USD', 'EUR', 'JPY'])
     """
-    url = f"{CRYPTO_COMPARE_BASE_URL}/data/price"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
-    }
     params = {
         "fsym": from_symbol.upper(),
         "tsyms": ",".join(to_symbols)
     }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code != 200:
-        return f"Error: API returned status code {response.status_code}"
-    return response.json()
+    return "/data/price", params
 
-def fetch_trading_signals(from_symbol: str) -> dict:
+def _trading_signals(from_symbol: str):
     """
     Fetch latest trading signals from IntoTheBlock.
     
     Args:
         from_symbol: Cryptocurrency symbol (e.g., 'BTC')
     """
-    url = f"{CRYPTO_COMPARE_BASE_URL}/data/tradingsignals/intotheblock/latest"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
-    }
     params = {
         "fsym": from_symbol.upper()
     }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code != 200:
-        return f"Error: API returned status code {response.status_code}"
-    return response.json()
+    return "/data/tradingsignals/intotheblock/latest", params
 
-def fetch_top_market_cap(limit: int = 10, to_symbol: str = "USD") -> dict:
+def _top_market_cap(limit: int = 10, to_symbol: str = "USD"):
     """
     Fetch top cryptocurrencies by market cap.
     
@@ -119,21 +151,13 @@ def fetch_top_market_cap(limit: int = 10, to_symbol: str = "USD") -> dict:
         limit: Number of results to return
         to_symbol: Quote currency symbol
     """
-    url = f"{CRYPTO_COMPARE_BASE_URL}/data/top/mktcapfull"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
-    }
     params = {
         "limit": limit,
         "tsym": to_symbol.upper()
     }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code != 200:
-        return f"Error: API returned status code {response.status_code}"
-    return response.json()
+    return "/data/top/mktcapfull", params
 
-def fetch_top_exchanges(from_symbol: str, to_symbol: str = "USD") -> dict:
+def _top_exchanges(from_symbol: str, to_symbol: str = "USD"):
     """
     Fetch top exchanges for a cryptocurrency pair.
     
@@ -141,21 +165,13 @@ def fetch_top_exchanges(from_symbol: str, to_symbol: str = "USD") -> dict:
         from_symbol: Base currency symbol
         to_symbol: Quote currency symbol
     """
-    url = f"{CRYPTO_COMPARE_BASE_URL}/data/top/exchanges"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
-    }
     params = {
         "fsym": from_symbol.upper(),
         "tsym": to_symbol.upper()
     }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code != 200:
-        return f"Error: API returned status code {response.status_code}"
-    return response.json()
+    return "/data/top/exchanges", params
 
-def fetch_top_volume(limit: int = 10, to_symbol: str = "USD") -> dict:
+def _top_volume(limit: int = 10, to_symbol: str = "USD"):
     """
     Fetch top cryptocurrencies by total volume.
     
@@ -163,45 +179,21 @@ def fetch_top_volume(limit: int = 10, to_symbol: str = "USD") -> dict:
         limit: Number of results to return
         to_symbol: Quote currency symbol
     """
-    url = f"{CRYPTO_COMPARE_BASE_URL}/data/top/totalvolfull"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
-    }
     params = {
         "limit": limit,
         "tsym": to_symbol.upper()
     }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code != 200:
-        return f"Error: API returned status code {response.status_code}"
-    return response.json()
-
-
-def fetch_news(token: str, timestamp: int = None):
-    """Fetches news for a specific token and timestamp."""
-    # Use current time if no timestamp provided
-    if timestamp is None:
-        timestamp = int(time.time())
-
-    print(f"Fetching news for timestamp: {timestamp}")
-    url = f"{CRYPTO_COMPARE_BASE_URL}/data/v2/news/?lang=EN&lTs={timestamp}&categories={token}&sign=true"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CRYPTO_COMPARE_API_KEY}"
-    }
-
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        return f"Error: API returned status code {response.status_code}"
+    return "/data/top/totalvolfull", params
 
-    return response.json()
 
-
-def fetch_news_tool(token: str, timestamp: int = None):
-    """Fetch news articles for a token at a specific timestamp."""
-    news_data = fetch_news(token, timestamp)
-    return json.dumps(news_data, indent=2)
+# Each builder above returns the _get arguments; request_tool turns it into
+# the tool and the coroutine twin used when the agent runs tool calls concurrently
+fetch_price, afetch_price = request_tool("fetch_price", _price, _get, _aget, cache=True)
+fetch_trading_signals, afetch_trading_signals = request_tool("fetch_trading_signals", _trading_signals, _get, _aget)
+fetch_top_market_cap, afetch_top_market_cap = request_tool("fetch_top_market_cap", _top_market_cap, _get, _aget, cache=True)
+fetch_top_exchanges, afetch_top_exchanges = request_tool("fetch_top_exchanges", _top_exchanges, _get, _aget, cache=True)
+fetch_top_volume, afetch_top_volume = request_tool("fetch_top_volume", _top_volume, _get, _aget, cache=True)
+fetch_news_tool, afetch_news_tool = request_tool("fetch_news_tool", _news, _news_text, _anews_text)
 
 
 FETCH_NEWS_PROMPT = """
@@ -1,43 +1,28 @@
 import os
-import requests
+from .cancellation import raise_if_cancelled
+from .http_client import http_request
+from .http_fixtures import openai_http_clients
+from .ipfs_upload_tool import PINATA_API_URL
+from .resilience import provider_request
+from .jobs import report_progress
 from openai import OpenAI
 from cdp import Wallet
 from typing import Optional
 from dotenv import load_dotenv
-from cdp_langchain.utils import CdpAgentkitWrapper
 import json
 import io
 
 load_dotenv()
 
-# Configure a file to persist the agent's CDP MPC Wallet Data.
-wallet_data_file = "wallet_data.txt"
-
 def initialize_wallet():
-    """Initialize the wallet with CDP Agentkit."""
-    wallet_data = None
-    if os.path.exists(wallet_data_file):
-        with open(wallet_data_file) as f:
-            wallet_data = f.read()
-
-    # Configure CDP Agentkit Langchain Extension.
-    values = {}
-    if wallet_data is not None:
-        # If there is a persisted agentic wallet, load it and pass to the CDP Agentkit Wrapper.
-        values = {"cdp_wallet_data": wallet_data}
-
-    agentkit = CdpAgentkitWrapper(**values)
+    """Get the wallet shared by every CDP-backed tool, loading it if needed."""
+    from cdp_wallet import get_wallet_service
 
-    # Persist the agent's CDP MPC Wallet Data.
-    wallet_data = agentkit.export_wallet()
-    with open(wallet_data_file, "w") as f:
-        f.write(wallet_data)
-
-    return agentkit.wallet
+    return get_wallet_service().load()
 
 def get_openai_client() -> OpenAI:
     """Get OpenAI client instance."""
-    return OpenAI()
+    return OpenAI(http_client=openai_http_clients().get("http_client"))
 
 def generate_dalle_image(prompt: str, client: OpenAI | None = None) -> str:
     """Generate an image using DALL-E-3."""
@@ -62,7 +47,7 @@ def upload_to_ipfs(image_url: str) -> tuple[str, str]:
         raise Exception("PINATA_JWT environment variable not found")
     try:
         # Download image from DALL-E
-        response = requests.get(image_url)
+        response = http_request("GET", image_url)
         response.raise_for_status()
         image_data = response.content
 
@@ -75,8 +60,10 @@ def upload_to_ipfs(image_url: str) -> tuple[str, str]:
         }
 
         # Upload to Pinata
-        pinata_response = requests.post(
-            'https://api.pinata.cloud/pinning/pinFileToIPFS',
+        pinata_response = provider_request(
+            "pinata",
+            "POST",
+            f'{PINATA_API_URL}/pinning/pinFileToIPFS',
             files=files,
             headers=headers
         )
@@ -126,14 +113,14 @@ def create_and_upload_metadata(prompt: str, image_ipfs_url: str) -> str:
         }), "application/json")
     }
 
-    url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+    url = f"{PINATA_API_URL}/pinning/pinFileToIPFS"
     headers = {
         "Authorization": f"Bearer {pinata_jwt}"
     }
 
     try:
         # Upload the file and related metadata/options to Pinata
-        response = requests.post(url, files=files, headers=headers)
+        response = provider_request("pinata", "POST", url, files=files, headers=headers)
         response.raise_for_status()
 
         # Parse Pinata response
@@ -152,6 +139,7 @@ def dalle_nft(
     contract_address: Optional[str] = None,
     collection_name: Optional[str] = None,
     collection_symbol: Optional[str] = None,
+    wallet_service=None,
 ) -> str:
     """Generate DALL-E image and mint it as NFT.
 
@@ -162,6 +150,7 @@ def dalle_nft(
         contract_address (str | None): Optional existing NFT contract address
         collection_name (str | None): Required if contract_address not provided: Name of the NFT collection
         collection_symbol (str | None): Required if contract_address not provided: Symbol of the NFT collection
+        wallet_service (WalletService | None): Shared wallet service; its cached balances are invalidated after minting
 
     Returns:
         str: A message containing the operation details
@@ -173,34 +162,46 @@ def dalle_nft(
 
     try:
         print("🎨 Generating image with DALL-E...")
+        report_progress("Generating image with DALL-E")
         image_url = generate_dalle_image(prompt)
 
         print("📤 Uploading image to IPFS...")
+        report_progress("Uploading image to IPFS")
         ipfs_url, gateway_url = upload_to_ipfs(image_url)
 
         print("📝 Creating NFT metadata...")
+        report_progress("Creating NFT metadata")
         metadata_uri = create_and_upload_metadata(prompt, ipfs_url)
         base_uri = metadata_uri.rsplit('/', 1)[0] + '/'
 
+        # Last chance to stop before anything is written onchain
+        raise_if_cancelled()
+
         if not contract_address:
             print("📝 Deploying new NFT contract...")
+            report_progress("Deploying new NFT contract")
             deploy_result = wallet.deploy_nft(
                 name=collection_name,
                 symbol=collection_symbol,
                 base_uri=base_uri
             ).wait()
             contract_address = deploy_result.contract_address
+            if wallet_service is not None:
+                wallet_service.invalidate()
             deploy_tx = f"Deploy Transaction: {deploy_result.transaction.transaction_link}\n"
         else:
             deploy_tx = ""
 
         print("🎯 Minting NFT...")
+        report_progress("Minting NFT")
         mint_args = {"to": destination, "quantity": "1"}
         mint_result = wallet.invoke_contract(
             contract_address=contract_address,
             method="mint",
             args=mint_args
         ).wait()
+        if wallet_service is not None:
+            wallet_service.invalidate()
 
         print("✨ Success! NFT minted!")
         
@@ -220,6 +221,7 @@ def dalle_nft(
     except Exception as e:
         if isinstance(e, ValueError):
             raise
+        raise_if_cancelled()
         return f"Error in DALL-E NFT process: {e}"
 
 if __name__ == "__main__":
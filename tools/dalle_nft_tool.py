@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional
-from tools.dalle_nft import dalle_nft, initialize_wallet
+from cdp import Wallet
+from tools.dalle_nft import dalle_nft
 
 class DalleNftInput(BaseModel):
     """Input schema for DALL-E NFT generation."""
@@ -36,20 +37,25 @@ Required environment variables:
 The NFT will be viewable on OpenSea's testnet.
 """
 
-def create_dalle_nft_tool():
-    """Create a DALL-E NFT generation tool."""
-    wallet = initialize_wallet()
-    
-    def _run(prompt: str, collection_name: Optional[str] = None, 
+def create_dalle_nft_tool(wallet_service=None):
+    """Create a DALL-E NFT generation tool.
+
+    The wallet is passed in by the CdpTool's agentkit wrapper when the tool
+    runs, so the tool shares the agent's wallet instead of loading its own.
+    With a wallet service, the cached address is used as the destination and
+    cached balances are invalidated after minting.
+    """
+    def _run(wallet: Wallet, prompt: str, collection_name: Optional[str] = None, 
              collection_symbol: Optional[str] = None, 
              contract_address: Optional[str] = None) -> str:
         return dalle_nft(
             wallet=wallet,
             prompt=prompt,
-            destination=wallet.default_address.address_id,
+            destination=wallet_service.address() if wallet_service else wallet.default_address.address_id,
             collection_name=collection_name,
             collection_symbol=collection_symbol,
-            contract_address=contract_address
+            contract_address=contract_address,
+            wallet_service=wallet_service
         )
 
     return {
@@ -0,0 +1,508 @@
+import asyncio
+import enum
+import os
+import socket
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from . import http_fixtures
+from .cancellation import RunCancelled, current_scope, on_cancel, raise_if_cancelled, record_aborted_request
+
+
+def _param(value: Any) -> Any:
+    """A query parameter value as requests would send it; enums by their value"""
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.seconds = 0.0
+
+
+class _AbortableStream(httpcore.NetworkStream):
+    """A connection whose blocking reads and writes stop when their run is cancelled
+
+    While a read or write is in progress it is registered with the cancel scope
+    of the calling thread, which is the run that is using the connection at
+    that moment, and cancelling the scope shuts the socket down. Connections
+    are HTTP/1.1, so that request is the only one on the socket. The pool then
+    drops the broken connection instead of reusing it.
+    """
+
+    def __init__(self, stream: httpcore.NetworkStream):
+        self._stream = stream
+
+    def _abort(self):
+        sock = self._stream.get_extra_info("socket")
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        unregister = on_cancel(self._abort)
+        try:
+            return self._stream.read(max_bytes, timeout)
+        finally:
+            unregister()
+
+    def write(self, buffer: bytes, timeout: Optional[float] = None) -> None:
+        unregister = on_cancel(self._abort)
+        try:
+            self._stream.write(buffer, timeout)
+        finally:
+            unregister()
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname: Optional[str] = None, timeout: Optional[float] = None):
+        return _AbortableStream(self._stream.start_tls(ssl_context, server_hostname, timeout))
+
+    def get_extra_info(self, info: str) -> Any:
+        return self._stream.get_extra_info(info)
+
+
+class _AbortableBackend(httpcore.NetworkBackend):
+    """The default network backend, with abortable streams and connection counts"""
+
+    def __init__(self, client: "HttpClient"):
+        self._backend = httpcore.SyncBackend()
+        self._client = client
+
+    def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None, local_address=None, socket_options=None):
+        raise_if_cancelled()
+        stream = self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        self._client._count_connection(host)
+        return _AbortableStream(stream)
+
+    def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        return _AbortableStream(self._backend.connect_unix_socket(path, timeout, socket_options))
+
+    def sleep(self, seconds: float) -> None:
+        self._backend.sleep(seconds)
+
+
+class _CountingAsyncBackend(httpcore.AsyncNetworkBackend):
+    """The default async network backend, with connection counts
+
+    Keeps its open streams, so their connections can be ended once the event
+    loop they belong to is gone and the pool can no longer be closed on it.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, client: "HttpClient"):
+        self._backend = backend
+        self._client = client
+        self._streams: "weakref.WeakSet[httpcore.AsyncNetworkStream]" = weakref.WeakSet()
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None, local_address=None, socket_options=None):
+        stream = await self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        self._client._count_connection(host)
+        self._streams.add(stream)
+        return stream
+
+    def abandon(self):
+        """Shut down every stream still open; the sockets are freed with the dropped pool"""
+        for stream in list(self._streams):
+            sock = stream.get_extra_info("socket")
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._streams.clear()
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors as the httpx errors callers catch, most specific first
+_ERRORS = [
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+]
+
+
+@contextmanager
+def _httpx_errors():
+    try:
+        yield
+    except Exception as e:
+        for error, mapped in _ERRORS:
+            if isinstance(e, error):
+                raise mapped(str(e)) from e
+        raise
+
+
+def _core_request(request: httpx.Request, content) -> httpcore.Request:
+    return httpcore.Request(
+        method=request.method,
+        url=httpcore.URL(
+            scheme=request.url.raw_scheme,
+            host=request.url.raw_host,
+            port=request.url.port,
+            target=request.url.raw_path,
+        ),
+        headers=request.headers.raw,
+        content=content,
+        extensions=request.extensions,
+    )
+
+
+class _ResponseStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self):
+        with _httpx_errors():
+            for part in self._stream:
+                yield part
+
+    def close(self):
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class _AsyncResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _PoolTransport(httpx.BaseTransport):
+    """An httpx transport over a connection pool we build, with our network backend"""
+
+    def __init__(self, pool: httpcore.ConnectionPool):
+        self.pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with _httpx_errors():
+            response = self.pool.handle_request(_core_request(request, request.stream))
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        self.pool.close()
+
+
+class _AsyncPoolTransport(httpx.AsyncBaseTransport):
+    """Async version of _PoolTransport"""
+
+    def __init__(self, pool: httpcore.AsyncConnectionPool):
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with _httpx_errors():
+            response = await self.pool.handle_async_request(_core_request(request, request.stream))
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_AsyncResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+class HttpClient:
+    """One pooled HTTP client for every provider the tools call
+
+    Connections are kept alive per host (origin) and reused across tool calls
+    and sessions, so a call to Moralis or CryptoCompare only pays for DNS, TCP
+    and TLS setup when no idle connection to that host is left.
+
+    Requests are aborted when the run they belong to is cancelled, like the
+    per-call sessions they replace. Connections only speak HTTP/1.1, so a
+    connection carries one request at a time and aborting it cannot fail
+    other sessions' requests.
+
+    `arequest` is the coroutine version for async tools. It uses a pool with
+    the same settings per event loop. Pools of loops that have been closed are
+    dropped, and their connections closed, when a new loop shows up.
+
+    With HTTP_FIXTURES set, both pools record responses to, or replay them
+    from, fixture files (see http_fixtures).
+    """
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout,
+        limits: httpx.Limits,
+    ):
+        self.timeout = timeout
+        self.limits = limits
+        # httpx does not take a network backend, so build the pool ourselves
+        self._ssl_context = httpx.create_ssl_context()
+        self._pool = httpcore.ConnectionPool(network_backend=_AbortableBackend(self), **self._pool_options())
+        self._client = httpx.Client(
+            transport=http_fixtures.wrap(_PoolTransport(self._pool)), timeout=timeout, follow_redirects=True
+        )
+        # One async client per event loop: (client, pool, backend)
+        self._async_clients: Dict[asyncio.AbstractEventLoop, tuple] = {}
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostStats] = {}
+        self.in_flight = 0
+        self.versions: Dict[str, int] = {}
+
+    def _pool_options(self) -> Dict[str, Any]:
+        return {
+            "ssl_context": self._ssl_context,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "http1": True,
+            "http2": False,
+        }
+
+    def _host(self, host: str) -> _HostStats:
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = _HostStats()
+        return stats
+
+    def _count_connection(self, host: str):
+        with self._lock:
+            self._host(host).connections += 1
+
+    @staticmethod
+    def _prepare(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Request arguments with None params and headers left out, as requests does"""
+        raise_if_cancelled()
+        params = kwargs.get("params")
+        if params is not None:
+            kwargs["params"] = {
+                key: [_param(item) for item in value] if isinstance(value, (list, tuple)) else _param(value)
+                for key, value in params.items()
+                if value is not None
+            }
+        headers = kwargs.get("headers")
+        if headers is not None:
+            kwargs["headers"] = {key: value for key, value in headers.items() if value is not None}
+        return kwargs
+
+    @contextmanager
+    def _track(self, url: str):
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                stats = self._host(host)
+                stats.requests += 1
+                stats.errors += failed
+                stats.seconds += time.monotonic() - started
+
+    def _count_version(self, response: httpx.Response):
+        with self._lock:
+            self.versions[response.http_version] = self.versions.get(response.http_version, 0) + 1
+
+    @staticmethod
+    def _cancelled() -> Optional[RunCancelled]:
+        scope = current_scope()
+        if scope is not None and scope.cancelled:
+            record_aborted_request()
+            return RunCancelled(scope.reason)
+        return None
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request on a pooled connection
+
+        Takes the same arguments as `requests.request` for the ones the tools
+        use (params, headers, json, data, files, timeout). Params and headers
+        that are None are left out and enums are sent by value, as requests
+        does.
+        """
+        kwargs = self._prepare(kwargs)
+        with self._track(url):
+            try:
+                response = self._client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                cancelled = self._cancelled()
+                if cancelled is not None:
+                    raise cancelled
+                raise
+        self._count_version(response)
+        return response
+
+    def _drop_closed_loops(self):
+        for loop in [loop for loop in self._async_clients if loop.is_closed()]:
+            _, _, backend = self._async_clients.pop(loop)
+            backend.abandon()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                self._drop_closed_loops()
+                backend = _CountingAsyncBackend(httpcore.AnyIOBackend(), self)
+                pool = httpcore.AsyncConnectionPool(network_backend=backend, **self._pool_options())
+                client = httpx.AsyncClient(
+                    transport=http_fixtures.wrap_async(_AsyncPoolTransport(pool)), timeout=self.timeout, follow_redirects=True
+                )
+                entry = self._async_clients[loop] = (client, pool, backend)
+            return entry[0]
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Coroutine version of `request`
+
+        Cancelling the awaiting task aborts the request. Cancelling the run's
+        scope does too, and raises RunCancelled.
+        """
+        kwargs = self._prepare(kwargs)
+        client = self._get_async_client()
+        loop = asyncio.get_running_loop()
+        with self._track(url):
+            send = asyncio.ensure_future(client.request(method, url, **kwargs))
+            unregister = on_cancel(lambda: loop.call_soon_threadsafe(send.cancel))
+            try:
+                response = await send
+            except asyncio.CancelledError:
+                # Cancelled through the scope rather than by cancelling this task
+                if not asyncio.current_task().cancelling():
+                    cancelled = self._cancelled()
+                    if cancelled is not None:
+                        raise cancelled
+                raise
+            finally:
+                unregister()
+        self._count_version(response)
+        return response
+
+    def close(self):
+        self._client.close()
+
+    async def aclose(self):
+        """Close every pool: the current loop's here, other running loops' on their loop"""
+        self._client.close()
+        current = asyncio.get_running_loop()
+        with self._lock:
+            self._drop_closed_loops()
+            clients, self._async_clients = self._async_clients, {}
+        for loop, (client, _, _) in clients.items():
+            if loop is not current:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        if current in clients:
+            await clients[current][0].aclose()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            self._drop_closed_loops()
+            pools = [pool for _, pool, _ in self._async_clients.values()]
+        connections = list(self._pool.connections)
+        for pool in pools:
+            connections.extend(pool.connections)
+        with self._lock:
+            hosts = {
+                host: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "connections_opened": stats.connections,
+                    "reuse_rate": round(1 - stats.connections / stats.requests, 4) if stats.requests else None,
+                    "avg_seconds": round(stats.seconds / stats.requests, 4) if stats.requests else None,
+                }
+                for host, stats in self._hosts.items()
+            }
+            return {
+                "in_flight": self.in_flight,
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "http_versions": dict(self.versions),
+                "hosts": hosts,
+            }
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """The shared HttpClient, created on first call"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(
+                httpx.Timeout(
+                    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+                    read=float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+                    write=float(os.getenv("HTTP_WRITE_TIMEOUT", "30")),
+                    pool=float(os.getenv("HTTP_POOL_TIMEOUT", "10")),
+                ),
+                httpx.Limits(
+                    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+                    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+                    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+                ),
+            )
+        return _client
+
+
+def http_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request with the shared client; aborted when the current run is cancelled"""
+    return get_http_client().request(method, url, **kwargs)
+
+
+async def async_http_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Coroutine version of `http_request`"""
+    return await get_http_client().arequest(method, url, **kwargs)
+
+
+async def aclose():
+    """Close the shared client's connections, if it was created"""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+def stats() -> Optional[Dict[str, object]]:
+    return _client.stats() if _client is not None else None
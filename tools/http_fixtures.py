@@ -0,0 +1,302 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+
+from . import cancellation
+
+# Bump when the fixture format changes; replay refuses fixtures of another
+# version instead of misreading them
+FIXTURE_VERSION = 1
+
+# Query parameters and path segments that carry credentials, left out of
+# fixture keys and files
+SECRET_PARAMS = {"api_key", "apikey", "key", "token", "access_token"}
+SECRET_PATHS = [re.compile(r"(/api/)[^/]+(/subgraphs/)")]
+
+
+class FixtureNotFound(httpx.HTTPError):
+    """No recorded response matches a request being replayed"""
+
+
+def _redact_url(url: httpx.URL) -> str:
+    path = url.path
+    for pattern in SECRET_PATHS:
+        path = pattern.sub(r"\1<redacted>\2", path)
+    query = sorted((k, "<redacted>" if k.lower() in SECRET_PARAMS else v) for k, v in parse_qsl(url.query.decode()))
+    origin = f"{url.scheme}://{url.host}" + (f":{url.port}" if url.port else "")
+    return origin + path + (f"?{urlencode(query)}" if query else "")
+
+
+def _body_digest(request: httpx.Request) -> str:
+    content = request.content
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        # The boundary is random; hash the parts without it
+        boundary = request.headers["content-type"].split("boundary=")[-1].encode()
+        content = content.replace(boundary, b"")
+    return hashlib.sha256(content).hexdigest()
+
+
+class FixtureStore:
+    """Recorded responses in a directory, one JSON file per request
+
+    Files are grouped by host and named after a hash of the method, the URL
+    with credentials redacted and the request body. Requests whose bodies or
+    query strings hold the current time (news by timestamp, swaps of the last
+    day) never match exactly on replay, so a request without an exact match
+    gets the latest recording of the same method, host and path instead.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loose: Optional[Dict[Tuple[str, str, str], str]] = None
+        self.recorded = 0
+        self.exact = 0
+        self.loose = 0
+        self.missing = 0
+
+    @staticmethod
+    def _route(request: httpx.Request) -> Tuple[str, str, str]:
+        url = urlsplit(_redact_url(request.url))
+        return request.method, url.netloc, url.path
+
+    def _path(self, request: httpx.Request) -> str:
+        key = f"{request.method} {_redact_url(request.url)} {_body_digest(request)}"
+        digest = hashlib.sha256(key.encode()).hexdigest()[:20]
+        return os.path.join(self.directory, request.url.host, f"{digest}.json")
+
+    def save(self, request: httpx.Request, response: httpx.Response, body: bytes, elapsed: float):
+        method, host, path = self._route(request)
+        fixture = {
+            "version": FIXTURE_VERSION,
+            "recorded_at": time.time(),
+            "request": {"method": method, "url": _redact_url(request.url), "body_sha256": _body_digest(request)},
+            "response": {
+                "status": response.status_code,
+                "headers": [[k, v] for k, v in response.headers.multi_items() if k.lower() not in ("transfer-encoding", "set-cookie")],
+                "elapsed": elapsed,
+            },
+        }
+        if "content-encoding" not in response.headers:
+            try:
+                fixture["response"]["text"] = body.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        if "text" not in fixture["response"]:
+            fixture["response"]["base64"] = base64.b64encode(body).decode()
+
+        file = self._path(request)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        temporary = f"{file}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(fixture, f, indent=2)
+        os.replace(temporary, file)
+        with self._lock:
+            self.recorded += 1
+            if self._loose is not None:
+                self._loose[(method, host, path)] = file
+
+    def _load(self, file: str) -> Dict[str, Any]:
+        with open(file) as f:
+            fixture = json.load(f)
+        if fixture.get("version") != FIXTURE_VERSION:
+            raise FixtureNotFound(
+                f"Fixture {file} has version {fixture.get('version')}, expected {FIXTURE_VERSION}; record it again"
+            )
+        return fixture
+
+    def _index(self) -> Dict[Tuple[str, str, str], str]:
+        """The latest fixture file per (method, host, path)"""
+        with self._lock:
+            if self._loose is not None:
+                return self._loose
+        latest: Dict[Tuple[str, str, str], Tuple[float, str]] = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                file = os.path.join(root, name)
+                try:
+                    fixture = self._load(file)
+                except (FixtureNotFound, ValueError, OSError):
+                    continue
+                url = urlsplit(fixture["request"]["url"])
+                route = (fixture["request"]["method"], url.netloc, url.path)
+                if route not in latest or latest[route][0] < fixture["recorded_at"]:
+                    latest[route] = (fixture["recorded_at"], file)
+        with self._lock:
+            self._loose = {route: file for route, (_, file) in latest.items()}
+            return self._loose
+
+    def find(self, request: httpx.Request) -> Dict[str, Any]:
+        file = self._path(request)
+        if os.path.exists(file):
+            with self._lock:
+                self.exact += 1
+            return self._load(file)
+        file = self._index().get(self._route(request))
+        if file is not None:
+            with self._lock:
+                self.loose += 1
+            return self._load(file)
+        with self._lock:
+            self.missing += 1
+        raise FixtureNotFound(f"No recorded response for {request.method} {_redact_url(request.url)}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "recorded": self.recorded,
+                "exact_matches": self.exact,
+                "loose_matches": self.loose,
+                "missing": self.missing,
+            }
+
+
+def _replayed(fixture: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+    recorded = fixture["response"]
+    if "text" in recorded:
+        body = recorded["text"].encode("utf-8")
+    else:
+        body = base64.b64decode(recorded["base64"])
+    headers = [(k, v) for k, v in recorded["headers"] if k.lower() != "content-length"]
+    return httpx.Response(recorded["status"], headers=headers, content=body, request=request)
+
+
+class _Replay:
+    """Shared settings of the sync and async transports"""
+
+    def __init__(self, store: FixtureStore, mode: str, latency: Optional[float], jitter: float):
+        self.store = store
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+
+    def delay(self, fixture: Dict[str, Any]) -> float:
+        """How long a replayed response takes: the recorded (or a fixed) latency, plus jitter"""
+        latency = fixture["response"]["elapsed"] if self.latency is None else self.latency
+        return max(latency + random.uniform(-self.jitter, self.jitter), 0.0)
+
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """Record real responses to fixtures, or replay them without a network"""
+
+    def __init__(self, transport: httpx.BaseTransport, replay: _Replay):
+        self._transport = transport
+        self._replay = replay
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # Multipart uploads are streamed; read them so they can be hashed
+        request.read()
+        if self._replay.mode == "replay":
+            fixture = self._replay.store.find(request)
+            cancellation.sleep(self._replay.delay(fixture))
+            return _replayed(fixture, request)
+
+        started = time.monotonic()
+        response = self._transport.handle_request(request)
+        try:
+            body = b"".join(response.iter_raw())
+        finally:
+            response.close()
+        self._replay.store.save(request, response, body, time.monotonic() - started)
+        return httpx.Response(response.status_code, headers=response.headers, content=body, extensions=response.extensions, request=request)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncRecordReplayTransport(httpx.AsyncBaseTransport):
+    """Async version of RecordReplayTransport"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, replay: _Replay):
+        self._transport = transport
+        self._replay = replay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if self._replay.mode == "replay":
+            fixture = self._replay.store.find(request)
+            await cancellation.asleep(self._replay.delay(fixture))
+            return _replayed(fixture, request)
+
+        started = time.monotonic()
+        response = await self._transport.handle_async_request(request)
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        await asyncio.to_thread(self._replay.store.save, request, response, body, time.monotonic() - started)
+        return httpx.Response(response.status_code, headers=response.headers, content=body, extensions=response.extensions, request=request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_replay: Optional[_Replay] = None
+_replay_lock = threading.Lock()
+
+
+def get_replay() -> Optional[_Replay]:
+    """The record/replay settings from HTTP_FIXTURES, or None when it is off
+
+    HTTP_FIXTURES is "record" or "replay"; fixtures live in
+    HTTP_FIXTURES_DIR. On replay, each response takes its recorded latency,
+    or HTTP_REPLAY_LATENCY seconds if set, plus up to HTTP_REPLAY_JITTER
+    seconds either way.
+    """
+    global _replay
+    mode = os.getenv("HTTP_FIXTURES", "").lower()
+    if mode not in ("record", "replay"):
+        return None
+    with _replay_lock:
+        if _replay is None:
+            latency = os.getenv("HTTP_REPLAY_LATENCY")
+            _replay = _Replay(
+                FixtureStore(os.getenv("HTTP_FIXTURES_DIR", "fixtures/http")),
+                mode,
+                latency=float(latency) if latency else None,
+                jitter=float(os.getenv("HTTP_REPLAY_JITTER", "0")),
+            )
+        return _replay
+
+
+def wrap(transport: httpx.BaseTransport) -> httpx.BaseTransport:
+    """The transport, recording or replaying if HTTP_FIXTURES is set"""
+    replay = get_replay()
+    return RecordReplayTransport(transport, replay) if replay else transport
+
+
+def wrap_async(transport: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    replay = get_replay()
+    return AsyncRecordReplayTransport(transport, replay) if replay else transport
+
+
+def openai_http_clients() -> Dict[str, Any]:
+    """httpx clients for the OpenAI SDK that record or replay too; empty when off
+
+    Pass them to ChatOpenAI (http_client, http_async_client) so agent turns can
+    be replayed without an OpenAI key.
+    """
+    if get_replay() is None:
+        return {}
+    return {
+        "http_client": httpx.Client(transport=wrap(httpx.HTTPTransport()), timeout=60.0),
+        "http_async_client": httpx.AsyncClient(transport=wrap_async(httpx.AsyncHTTPTransport()), timeout=60.0),
+    }
+
+
+def stats() -> Optional[Dict[str, object]]:
+    replay = get_replay()
+    return {"mode": replay.mode, **replay.store.stats()} if replay else None
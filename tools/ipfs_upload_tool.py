@@ -1,7 +1,8 @@
 import os
 import io
 import mimetypes
-import requests
+from .http_client import http_request
+from .resilience import provider_request
 from datetime import datetime
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
@@ -9,6 +10,8 @@ from dotenv import load_dotenv
 # Load environment variables from a .env file, if available
 load_dotenv()
 
+PINATA_API_URL = os.getenv("PINATA_API_URL", "https://api.pinata.cloud")
+
 class UploadImageToPinataInput(BaseModel):
     image_url: str = Field(
         ...,
@@ -39,7 +42,7 @@ def create_pinata_upload_tool(image_url: str, save_locally: bool = True) -> dict
             raise Exception("Missing Pinata JWT token in environment variables.")
 
         # Download the image from the provided URL
-        response = requests.get(image_url)
+        response = http_request("GET", image_url)
         response.raise_for_status()  # Raise an exception for bad status codes
         image_data = response.content
 
@@ -66,8 +69,8 @@ def create_pinata_upload_tool(image_url: str, save_locally: bool = True) -> dict
         }
 
         # Upload the file to Pinata
-        url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-        pinata_response = requests.post(url, files=files, headers=headers)
+        url = f"{PINATA_API_URL}/pinning/pinFileToIPFS"
+        pinata_response = provider_request("pinata", "POST", url, files=files, headers=headers)
         pinata_response.raise_for_status()  # Raise an error if the upload fails
         pinata_data = pinata_response.json()
 
@@ -0,0 +1,44 @@
+import time
+from pydantic import BaseModel, Field
+
+from .jobs import get_job_manager
+
+class JobStatusInput(BaseModel):
+    """Input argument schema for the job status action."""
+    job_id: str = Field(
+        ...,
+        description="The id of the background job, as returned when it was started",
+        example="3f2b8c1e-5d4a-4c7e-9b1a-2e6f8d9c0a7b"
+    )
+
+JOB_STATUS_PROMPT = """
+This tool checks on a background job, such as generating an NFT, deploying a multi-token contract
+or browsing the web, which were started earlier and returned a job id.
+It returns whether the job is queued, running, succeeded, failed, cancelled or interrupted,
+its latest progress, and its result once it has finished.
+"""
+
+def job_status(job_id: str) -> str:
+    """Look up the status of a background job.
+
+    Args:
+        job_id (str): The id of the job.
+
+    Returns:
+        str: The job's status, progress and result or error.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return f"No background job found with id {job_id}"
+
+    lines = [f"Job {job_id} ({job['kind']}): {job['status']}"]
+    if job["started_at"]:
+        elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+        lines.append(f"Running time: {elapsed:.0f}s")
+    if job["progress"] and job["status"] in ("queued", "running"):
+        lines.append(f"Progress: {job['progress']}")
+    if job["result"]:
+        lines.append(f"Result: {job['result']}")
+    if job["error"]:
+        lines.append(f"Error: {job['error']}")
+    return "\n".join(lines)
@@ -0,0 +1,308 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from event_stream import RunStream
+
+from . import cancellation
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    session_id TEXT,
+    args TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, created_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+"""
+
+COLUMNS = ("id", "kind", "session_id", "args", "status", "progress", "result", "error", "created_at", "started_at", "finished_at")
+FINISHED = ("succeeded", "failed", "cancelled", "interrupted")
+
+
+class JobRejected(Exception):
+    """Too many jobs are queued to accept another one"""
+
+
+class JobManager:
+    """Durable background jobs for slow tools, on a bounded worker pool
+
+    A tool wrapped with `background()` submits a job and returns its id right
+    away, so the agent turn (and the client's connection) ends in seconds
+    while the work continues. At most `workers` jobs run at once and at most
+    `max_queued` wait. Every job is recorded in SQLite with its status, last
+    progress message, result or error, so it can be looked up after the turn,
+    and after a restart: jobs that were queued or running when the process
+    stopped are marked "interrupted" rather than re-run, since they may have
+    already sent transactions onchain.
+
+    Each job runs in a fresh context with its own cancel scope. Progress
+    events are kept in a RunStream for `retention` seconds after the job
+    finishes, so clients can follow them live.
+    """
+
+    def __init__(self, path: str = "jobs.db", workers: int = 4, max_queued: int = 100, retention: float = 60.0):
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.interrupted = self._conn.execute(
+            "UPDATE jobs SET status = 'interrupted', error = 'The server restarted before the job finished', "
+            "finished_at = ? WHERE status IN ('queued', 'running')",
+            (time.time(),),
+        ).rowcount
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._futures: Dict[str, Future] = {}
+        self._scopes: Dict[str, cancellation.CancelScope] = {}
+        self._streams: Dict[str, RunStream] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.submitted = 0
+        self.rejected = 0
+        self.running = 0
+        self.queued = 0
+        self.completed: Dict[str, int] = {status: 0 for status in FINISHED}
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        """Publish progress events on this event loop, where clients follow them"""
+        self._loop = loop
+
+    def submit(self, kind: str, func: Callable[..., Any], args: Dict[str, Any], session_id: Optional[str] = None) -> str:
+        """Queue `func(**args)` as a job and return its id"""
+        self._expire()
+        with self._lock:
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise JobRejected(f"Too many background jobs are queued ({self.queued}); try again later")
+            self.queued += 1
+            self.submitted += 1
+            job_id = str(uuid.uuid4())
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, session_id, args, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, session_id, json.dumps(args, default=str), time.time()),
+            )
+            self._streams[job_id] = RunStream(job_id, session_id)
+            self._scopes[job_id] = cancellation.CancelScope()
+            # A fresh context, so the job does not inherit the submitting turn's
+            # cancel scope and outlives it
+            self._futures[job_id] = self._executor.submit(contextvars.Context().run, self._run, job_id, func, args)
+        self._publish(job_id, "status", {"status": "queued", "kind": kind})
+        return job_id
+
+    def _run(self, job_id: str, func: Callable[..., Any], args: Dict[str, Any]):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            scope = self._scopes[job_id]
+        cancellation._current_scope.set(scope)
+        _current_job.set(job_id)
+        self._update(job_id, status="running", started_at=time.time())
+        self._publish(job_id, "status", {"status": "running"})
+        try:
+            scope.raise_if_cancelled()
+            result = func(**args)
+            status, fields = "succeeded", {"result": str(result)}
+        except cancellation.RunCancelled:
+            status, fields = "cancelled", {"error": "Job cancelled"}
+        except Exception as e:
+            status, fields = "failed", {"error": str(e)}
+        finally:
+            with self._lock:
+                self.running -= 1
+        self._finish(job_id, status, fields)
+
+    def _finish(self, job_id: str, status: str, fields: Dict[str, Any]):
+        self._update(job_id, status=status, finished_at=time.time(), **fields)
+        with self._lock:
+            self.completed[status] += 1
+            self._futures.pop(job_id, None)
+            self._scopes.pop(job_id, None)
+        self._publish(job_id, status, fields)
+        self._close(job_id)
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _call_on_loop(self, callback: Callable, *args):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(callback, *args)
+        else:
+            callback(*args)
+
+    def _publish(self, job_id: str, event: str, data: Dict[str, Any]):
+        stream = self._streams.get(job_id)
+        if stream is not None:
+            self._call_on_loop(stream.publish, event, data)
+
+    def _close(self, job_id: str):
+        stream = self._streams.get(job_id)
+        if stream is not None:
+            self._call_on_loop(stream.close)
+
+    def progress(self, job_id: str, message: str, **data):
+        """Record a progress message of a running job"""
+        self._update(job_id, progress=message)
+        self._publish(job_id, "progress", {"message": message, **data})
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, session_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(COLUMNS)} FROM jobs"
+        conditions, params = [], []
+        if session_id is not None:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        job = dict(zip(COLUMNS, row))
+        job["args"] = json.loads(job["args"])
+        return job
+
+    def stream(self, job_id: str) -> Optional[RunStream]:
+        """The progress events of a job that is running or finished recently"""
+        self._expire()
+        return self._streams.get(job_id)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.retention
+        with self._lock:
+            for job_id in [j for j, s in self._streams.items() if s.done and s.finished < cutoff]:
+                del self._streams[job_id]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it is not active"""
+        with self._lock:
+            future = self._futures.get(job_id)
+            scope = self._scopes.get(job_id)
+        if future is None:
+            return False
+        if future.cancel():
+            # Never started
+            with self._lock:
+                self.queued -= 1
+            self._finish(job_id, "cancelled", {"error": "Job cancelled"})
+        elif scope is not None:
+            scope.cancel("job cancelled")
+        return True
+
+    def prune(self, max_age: float) -> int:
+        """Delete finished jobs older than max_age seconds"""
+        with self._lock:
+            return self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND finished_at < ?",
+                (*FINISHED, time.time() - max_age),
+            ).rowcount
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queued": self.queued,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "interrupted_at_startup": self.interrupted,
+                **self.completed,
+            }
+
+    def shutdown(self):
+        """Cancel queued and running jobs without waiting for them
+
+        A job that does not stop in time is marked interrupted on next start.
+        """
+        with self._lock:
+            job_ids = list(self._futures)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False)
+
+
+_current_job: ContextVar[Optional[str]] = ContextVar("current_job", default=None)
+_current_session: ContextVar[Optional[str]] = ContextVar("job_session", default=None)
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The shared JobManager, created on first call"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                os.getenv("JOBS_DB", "jobs.db"),
+                workers=int(os.getenv("JOB_WORKERS", "4")),
+                max_queued=int(os.getenv("MAX_QUEUED_JOBS", "100")),
+                retention=float(os.getenv("STREAM_RETENTION", "60")),
+            )
+        return _manager
+
+
+def set_session(session_id: Optional[str]):
+    """Record the chat session that jobs submitted from this context belong to"""
+    _current_session.set(session_id)
+
+
+def report_progress(message: str, **data):
+    """Report progress of the job this code runs in; does nothing outside a job"""
+    job_id = _current_job.get()
+    if job_id is not None:
+        get_job_manager().progress(job_id, message, **data)
+
+
+def background(kind: str, func: Callable[..., str]) -> Callable[..., str]:
+    """Wrap a tool function so each call runs as a background job
+
+    The wrapper keeps func's signature (CdpTool passes the wallet by looking
+    at it) and returns a message with the job id for the agent to relay.
+    """
+    @functools.wraps(func)
+    def submit(*args, **kwargs) -> str:
+        call = functools.partial(func, *args)
+        try:
+            job_id = get_job_manager().submit(kind, call, kwargs, session_id=_current_session.get())
+        except JobRejected as e:
+            return str(e)
+        return (
+            f"Started {kind} job {job_id} in the background. It can take a few minutes; "
+            f"check on it with the job_status tool using this job id."
+        )
+
+    return submit
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
-import requests
+from .provider_tool import request_tool
+from .resilience import async_provider_request, provider_request
 import os
 from datetime import datetime
 
@@ -88,7 +89,7 @@ class OrderDirection(str, Enum):
 
 # Base configuration
 class MoralisConfig:
-    BASE_URL = "https://deep-index.moralis.io/api/v2.2"
+    BASE_URL = os.getenv("MORALIS_BASE_URL", "https://deep-index.moralis.io/api/v2.2")
     API_KEY = os.getenv("MORALIS_API_KEY")
     
     @classmethod
@@ -148,88 +149,83 @@ class PairOHLCVInput(BaseModel):
     to_date: str = Field(..., description="End date for OHLCV data")
 
 # API Implementation
-def make_request(endpoint: str, params: Optional[Dict[str, Any]] = None, method: str = "GET", json_data: Optional[Dict] = None) -> Dict:
-    """Make a request to the Moralis API."""
-    url = f"{MoralisConfig.BASE_URL}/{endpoint}"
+def _request_kwargs(params: Optional[Dict[str, Any]], json_data: Optional[Dict]) -> Dict[str, Any]:
     kwargs = {
         "headers": MoralisConfig.get_headers(),
         "params": params
     }
     if json_data:
         kwargs["json"] = json_data
+    return kwargs
 
-    response = requests.request(method, url, **kwargs)
+def make_request(endpoint: str, params: Optional[Dict[str, Any]] = None, method: str = "GET", json_data: Optional[Dict] = None) -> Dict:
+    """Make a request to the Moralis API."""
+    url = f"{MoralisConfig.BASE_URL}/{endpoint}"
+    response = provider_request("moralis", method, url, **_request_kwargs(params, json_data))
     response.raise_for_status()
     return response.json()
 
-# Function implementations
-def fetch_wallet_history(address: str, chain: str = "eth", order: str = "DESC") -> Dict:
+async def amake_request(endpoint: str, params: Optional[Dict[str, Any]] = None, method: str = "GET", json_data: Optional[Dict] = None) -> Dict:
+    """Make a request to the Moralis API without blocking the event loop."""
+    url = f"{MoralisConfig.BASE_URL}/{endpoint}"
+    response = await async_provider_request("moralis", method, url, **_request_kwargs(params, json_data))
+    response.raise_for_status()
+    return response.json()
+
+# Function implementations. Each builder returns the make_request arguments;
+# request_tool turns it into the tool and its coroutine twin.
+def _moralis_tool(name, build, cache=False):
+    return request_tool(name, build, make_request, amake_request, cache=cache)
+
+def _wallet_history(address: str, chain: str = "eth", order: str = "DESC"):
     """Fetch wallet transaction history."""
-    endpoint = f"wallets/{address}/history"
-    params = {"chain": chain, "order": order}
-    return make_request(endpoint, params)
+    return f"wallets/{address}/history", {"chain": chain, "order": order}
 
-def fetch_wallet_balance(address: str, chain: str = "eth") -> Dict:
+def _wallet_balance(address: str, chain: str = "eth"):
     """Fetch wallet balance."""
-    endpoint = f"{address}/balance"
-    params = {"chain": chain}
-    return make_request(endpoint, params)
+    return f"{address}/balance", {"chain": chain}
 
-def fetch_nft_transfers(address: str, chain: str = "eth", format: str = "decimal") -> Dict:
+def _nft_transfers(address: str, chain: str = "eth", format: str = "decimal"):
     """Fetch NFT transfers for an address."""
-    endpoint = f"{address}/nft/transfers"
-    params = {"chain": chain, "format": format}
-    return make_request(endpoint, params)
+    return f"{address}/nft/transfers", {"chain": chain, "format": format}
 
-def fetch_token_transfers(address: str, chain: str = "eth", order: str = "DESC") -> Dict:
+def _token_transfers(address: str, chain: str = "eth", order: str = "DESC"):
     """Fetch token transfers for an address."""
-    endpoint = f"{address}/erc20/transfers"
-    params = {"chain": chain, "order": order}
-    return make_request(endpoint, params)
+    return f"{address}/erc20/transfers", {"chain": chain, "order": order}
 
-def fetch_wallet_nft_trades(address: str, chain: str = "eth") -> Dict:
+def _wallet_nft_trades(address: str, chain: str = "eth"):
     """Fetch NFT trades for a wallet."""
-    endpoint = f"wallets/{address}/nfts/trades"
-    params = {"chain": chain}
-    return make_request(endpoint, params)
+    return f"wallets/{address}/nfts/trades", {"chain": chain}
 
-def fetch_wallet_tokens(address: str, chain: str = "eth") -> Dict:
+def _wallet_tokens(address: str, chain: str = "eth"):
     """Fetch tokens owned by a wallet."""
-    endpoint = f"wallets/{address}/tokens"
-    params = {"chain": chain}
-    return make_request(endpoint, params)
+    return f"wallets/{address}/tokens", {"chain": chain}
 
-def fetch_defi_positions(address: str, chain: str = "eth") -> Dict:
+def _defi_positions(address: str, chain: str = "eth"):
     """Fetch DeFi positions for a wallet."""
-    endpoint = f"wallets/{address}/defi/positions"
-    params = {"chain": chain}
-    return make_request(endpoint, params)
+    return f"wallets/{address}/defi/positions", {"chain": chain}
 
-def fetch_token_price(token_address: str, chain: str = "eth", include_percent_change: bool = True) -> Dict:
+def _token_price(token_address: str, chain: str = "eth", include_percent_change: bool = True):
     """Fetch price for a specific token."""
-    endpoint = f"erc20/{token_address}/price"
     params = {
         "chain": chain,
         "include": "percent_change" if include_percent_change else None
     }
-    return make_request(endpoint, params)
+    return f"erc20/{token_address}/price", params
 
-def fetch_batch_token_prices(tokens: List[dict], chain: str = "eth") -> Dict:
+def _batch_token_prices(tokens: List[dict], chain: str = "eth"):
     """Fetch prices for multiple tokens."""
-    endpoint = "erc20/prices"
-    params = {"chain": chain}
-    return make_request(endpoint, params=params, method="POST", json_data={"tokens": tokens})
+    return "erc20/prices", {"chain": chain}, "POST", {"tokens": tokens}
 
-def fetch_pair_ohlcv(
+def _pair_ohlcv(
     pair_address: str,
     chain: str = "eth",
     timeframe: str = "1h",
     currency: str = "usd",
     from_date: str = None,
     to_date: str = None
-) -> Dict:
+):
     """Fetch OHLCV data for a trading pair."""
-    endpoint = f"pairs/{pair_address}/ohlcv"
     params = {
         "chain": chain,
         "timeframe": timeframe,
@@ -237,33 +233,44 @@ def fetch_pair_ohlcv(
         "fromDate": from_date,
         "toDate": to_date
     }
-    return make_request(endpoint, params)
+    return f"pairs/{pair_address}/ohlcv", params
 
 # Additional Moralis API endpoints
-def fetch_wallet_net_worth(address: str, exclude_spam: bool = True, exclude_unverified_contracts: bool = True) -> Dict:
+def _wallet_net_worth(address: str, exclude_spam: bool = True, exclude_unverified_contracts: bool = True):
     """Fetch wallet net worth."""
-    endpoint = f"wallets/{address}/net-worth"
     params = {
         "exclude_spam": str(exclude_spam).lower(),
         "exclude_unverified_contracts": str(exclude_unverified_contracts).lower()
     }
-    return make_request(endpoint, params)
+    return f"wallets/{address}/net-worth", params
 
-def fetch_wallet_stats(address: str, chain: str = "eth") -> Dict:
+def _wallet_stats(address: str, chain: str = "eth"):
     """Fetch wallet statistics."""
-    endpoint = f"wallets/{address}/stats"
-    params = {"chain": chain}
-    return make_request(endpoint, params)
+    return f"wallets/{address}/stats", {"chain": chain}
 
-def resolve_ens_domain(domain: str) -> Dict:
+def _resolve_ens_domain(domain: str):
     """Resolve ENS domain to address."""
-    endpoint = f"resolve/ens/{domain}"
-    return make_request(endpoint)
+    return (f"resolve/ens/{domain}",)
 
-def resolve_address_to_domain(address: str) -> Dict:
+def _resolve_address_to_domain(address: str):
     """Resolve address to ENS domain."""
-    endpoint = f"resolve/{address}/reverse"
-    return make_request(endpoint)
+    return (f"resolve/{address}/reverse",)
+
+# The async versions are used when the agent runs tool calls concurrently
+fetch_wallet_history, afetch_wallet_history = _moralis_tool("fetch_wallet_history", _wallet_history)
+fetch_wallet_balance, afetch_wallet_balance = _moralis_tool("fetch_wallet_balance", _wallet_balance)
+fetch_nft_transfers, afetch_nft_transfers = _moralis_tool("fetch_nft_transfers", _nft_transfers)
+fetch_token_transfers, afetch_token_transfers = _moralis_tool("fetch_token_transfers", _token_transfers)
+fetch_wallet_nft_trades, afetch_wallet_nft_trades = _moralis_tool("fetch_wallet_nft_trades", _wallet_nft_trades)
+fetch_wallet_tokens, afetch_wallet_tokens = _moralis_tool("fetch_wallet_tokens", _wallet_tokens)
+fetch_defi_positions, afetch_defi_positions = _moralis_tool("fetch_defi_positions", _defi_positions)
+fetch_token_price, afetch_token_price = _moralis_tool("fetch_token_price", _token_price, cache=True)
+fetch_batch_token_prices, afetch_batch_token_prices = _moralis_tool("fetch_batch_token_prices", _batch_token_prices)
+fetch_pair_ohlcv, afetch_pair_ohlcv = _moralis_tool("fetch_pair_ohlcv", _pair_ohlcv)
+fetch_wallet_net_worth, afetch_wallet_net_worth = _moralis_tool("fetch_wallet_net_worth", _wallet_net_worth)
+fetch_wallet_stats, afetch_wallet_stats = _moralis_tool("fetch_wallet_stats", _wallet_stats)
+resolve_ens_domain, aresolve_ens_domain = _moralis_tool("resolve_ens_domain", _resolve_ens_domain, cache=True)
+resolve_address_to_domain, aresolve_address_to_domain = _moralis_tool("resolve_address_to_domain", _resolve_address_to_domain)
 
 
 """Moralis API Tool Prompts"""
@@ -0,0 +1,39 @@
+import functools
+from typing import Any, Awaitable, Callable, Tuple
+
+from .response_cache import cached
+from .single_flight import single_flight
+
+
+def request_tool(
+    name: str,
+    build: Callable[..., Tuple],
+    send: Callable[..., Any],
+    asend: Callable[..., Awaitable[Any]],
+    cache: bool = False,
+) -> Tuple[Callable[..., Any], Callable[..., Awaitable[Any]]]:
+    """A read-only provider tool and its coroutine twin, from one request builder
+
+    `build` takes the tool's arguments and returns the arguments of the
+    provider's request helper (endpoint or query, params, ...), so each
+    endpoint is written once; only the send step, `send` or `asend`, differs.
+    Both versions share calls through single flight, and the response cache
+    if `cache`, under `name`, and keep the builder's signature and docstring.
+
+    Returns:
+        The sync tool, and the coroutine tool (named "a" + name)
+    """
+    @functools.wraps(build)
+    def func(*args, **kwargs):
+        return send(*build(*args, **kwargs))
+
+    @functools.wraps(build)
+    async def afunc(*args, **kwargs):
+        return await asend(*build(*args, **kwargs))
+
+    func.__name__ = func.__qualname__ = name
+    afunc.__name__ = afunc.__qualname__ = f"a{name}"
+    func, afunc = single_flight(name)(func), single_flight(name)(afunc)
+    if cache:
+        func, afunc = cached(name)(func), cached(name)(afunc)
+    return func, afunc
@@ -0,0 +1,353 @@
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from . import cancellation
+from .http_client import async_http_request, http_request
+
+# Responses worth another attempt; 429 slows the provider down but does not
+# count as a failure towards its circuit breaker
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ProviderUnavailable(Exception):
+    """A provider's circuit breaker is open, so the request was not sent"""
+
+
+class TokenBucket:
+    """Rate limit of `rate` requests per second, with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _take(self) -> float:
+        """Take a token; 0 on success, otherwise how long to wait for one"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            self.waited += delay
+            return delay
+
+    def _count_throttled(self):
+        with self._lock:
+            self.throttled += 1
+
+    def acquire(self):
+        """Take a token, waiting (cancellably) until one is available"""
+        delay = self._take()
+        if delay:
+            self._count_throttled()
+        while delay:
+            cancellation.sleep(delay)
+            delay = self._take()
+
+    async def aacquire(self):
+        """Coroutine version of `acquire`"""
+        delay = self._take()
+        if delay:
+            self._count_throttled()
+        while delay:
+            await cancellation.asleep(delay)
+            delay = self._take()
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for a while, e.g. after the provider sent 429"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Stop calling a provider that keeps failing, then probe it
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    requests fail fast for `reset_timeout` seconds. Then it is half-open: one
+    request at a time is let through as a probe, and the breaker closes on its
+    success or opens again on its failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; it is a probe if the breaker is half-open"""
+        with self._lock:
+            if self.state == "open" and self.retry_after() == 0:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Give up a probe without an outcome, e.g. when its run was cancelled"""
+        with self._lock:
+            self._probing = False
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header, given in seconds or as an HTTP date"""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rewind(files: Any):
+    """Seek file objects of a multipart upload back to the start before a retry"""
+    if not isinstance(files, dict):
+        return
+    for value in files.values():
+        fileobj = value[1] if isinstance(value, tuple) else value
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+
+class Provider:
+    """Rate limiting, retries and a circuit breaker for one upstream API
+
+    Requests wait for the provider's token bucket, and are retried on
+    connection errors, 429 and 5xx responses with exponential backoff and full
+    jitter. A Retry-After header sets the delay instead, and also holds back
+    the provider's other requests. A Retry-After longer than `max_delay` is not
+    waited for: the response is returned as is.
+
+    When the breaker is open, requests raise ProviderUnavailable at once
+    instead of spending quota and time on a provider that is down.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _admit(self):
+        if not self.breaker.allow():
+            raise ProviderUnavailable(
+                f"{self.name} is temporarily unavailable after repeated failures; "
+                f"try again in {self.breaker.retry_after():.0f} seconds"
+            )
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response], error: Optional[Exception]) -> Optional[float]:
+        """Record an attempt's outcome; how long to wait before retrying, or None to stop"""
+        delay = None
+        if error is not None:
+            self.breaker.failure()
+        else:
+            if response.status_code >= 500:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            if response.status_code not in RETRY_STATUSES:
+                return None
+            delay = _retry_after(response)
+            if response.status_code == 429:
+                self._count("rate_limited")
+                self.bucket.pause(delay if delay is not None else self._backoff(attempt + 1))
+        if delay is None:
+            delay = self._backoff(attempt)
+        if attempt >= self.max_retries or delay > self.max_delay:
+            self._count("failed")
+            return None
+        self._count("retries")
+        return delay
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """`http_request` with this provider's rate limit, retries and breaker"""
+        self._count("requests")
+        attempt = 0
+        while True:
+            self._admit()
+            response, error = None, None
+            try:
+                self.bucket.acquire()
+                if attempt:
+                    _rewind(kwargs.get("files"))
+                self._count("attempts")
+                response = http_request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # Cancelled, or a bad request rather than a provider failure
+                self.breaker.release()
+                raise
+            delay = self._retry_delay(attempt, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            cancellation.sleep(delay)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Coroutine version of `request`"""
+        self._count("requests")
+        attempt = 0
+        while True:
+            self._admit()
+            response, error = None, None
+            try:
+                await self.bucket.aacquire()
+                if attempt:
+                    _rewind(kwargs.get("files"))
+                self._count("attempts")
+                response = await async_http_request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                self.breaker.release()
+                raise
+            delay = self._retry_delay(attempt, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            await cancellation.asleep(delay)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failed": self.failed,
+                "throttled": self.bucket.throttled,
+                "throttled_seconds": round(self.bucket.waited, 3),
+                "circuit": self.breaker.state,
+                "circuit_opened": self.breaker.opened,
+                "circuit_rejected": self.breaker.rejected,
+            }
+
+
+# Default requests per second and burst size of each provider, within the
+# free tiers' limits
+DEFAULT_LIMITS = {
+    "moralis": (25, 25),
+    "graph": (10, 20),
+    "crypto_compare": (20, 20),
+    "pinata": (3, 5),
+}
+
+_providers: Dict[str, Provider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: str) -> Provider:
+    """The shared Provider for `name`, created on first call
+
+    The limits can be set per provider with <NAME>_RATE_LIMIT and <NAME>_BURST,
+    e.g. MORALIS_RATE_LIMIT=10.
+    """
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            rate, burst = DEFAULT_LIMITS.get(name, (10, 10))
+            prefix = name.upper()
+            provider = _providers[name] = Provider(
+                name,
+                rate=float(os.getenv(f"{prefix}_RATE_LIMIT", str(rate))),
+                burst=float(os.getenv(f"{prefix}_BURST", str(burst))),
+                max_retries=int(os.getenv("HTTP_MAX_RETRIES", "3")),
+                base_delay=float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.5")),
+                max_delay=float(os.getenv("HTTP_RETRY_MAX_DELAY", "20")),
+                failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30")),
+            )
+        return provider
+
+
+def provider_request(provider: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request to a provider through its rate limit, retries and breaker"""
+    return get_provider(provider).request(method, url, **kwargs)
+
+
+async def async_provider_request(provider: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """Coroutine version of `provider_request`"""
+    return await get_provider(provider).arequest(method, url, **kwargs)
+
+
+def stats() -> Dict[str, object]:
+    with _providers_lock:
+        providers = dict(_providers)
+    return {name: provider.stats() for name, provider in providers.items()}
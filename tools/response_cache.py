@@ -0,0 +1,406 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .single_flight import call_key
+
+# Seconds a result stays fresh, per tool: spot prices for seconds, rankings
+# and analytics for minutes, ENS names and pool metadata for hours. Override
+# one with CACHE_TTL_<TOOL>, e.g. CACHE_TTL_FETCH_PRICE=5, or 0 to not cache it.
+TTLS = {
+    "fetch_price": 10,
+    "fetch_token_price": 15,
+    "fetch_top_market_cap": 300,
+    "fetch_top_volume": 300,
+    "fetch_top_exchanges": 300,
+    "resolve_ens_domain": 6 * 3600,
+    "fetch_large_swaps": 60,
+    "fetch_whale_accumulation": 60,
+    "fetch_gas_fees": 300,
+    "fetch_undervalued_tokens": 300,
+    "fetch_swap_trends": 600,
+    "fetch_new_high_tvl_pools": 600,
+    "fetch_high_fee_pools": 3600,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_expiry ON responses (expires_at);
+"""
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "ttl", "size")
+
+    def __init__(self, value: str, stored_at: float, ttl: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.size = len(value)
+
+
+class _ToolStats:
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+
+class ResponseCache:
+    """Two-tier TTL cache of read-only tool results
+
+    Results are kept as JSON in memory, least recently used first out once
+    they take more than `max_bytes`, and, with a `path`, in SQLite as well, so
+    they survive a restart. Each entry is fresh for its tool's TTL. For as
+    long again it is stale: it is still returned, and the tool is called in
+    the background to refresh it (stale-while-revalidate), so a caller only
+    waits for the provider on a miss.
+
+    Times are wall-clock, since disk entries outlive the process. Disk writes
+    go through one writer thread, and the coroutine tools read from disk in a
+    worker thread, so SQLite never blocks the event loop or holds up the
+    memory tier's lock.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, path: Optional[str] = None, stale_factor: float = 1.0):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.stale_factor = stale_factor
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._stats: Dict[str, _ToolStats] = {}
+        self._refreshing: Set[str] = set()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+        self._tasks: Set[asyncio.Task] = set()
+        self.evictions = 0
+        self.disk_hits = 0
+        self._writes = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # A crash may lose the last writes, which only costs cache misses
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self.prune()
+
+    def _tool(self, tool: str) -> _ToolStats:
+        stats = self._stats.get(tool)
+        if stats is None:
+            stats = self._stats[tool] = _ToolStats()
+        return stats
+
+    def _get_memory(self, key: str, now: float) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if now - entry.stored_at < entry.ttl * (1 + self.stale_factor):
+                self._memory.move_to_end(key)
+                return entry
+            self._remove(key)
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[_Entry]:
+        if self._conn is None:
+            return None
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, stored_at, expires_at = row
+        entry = _Entry(value, stored_at, expires_at - stored_at)
+        if now - entry.stored_at >= entry.ttl * (1 + self.stale_factor):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self._insert(key, entry)
+        return entry
+
+    def get(self, key: str) -> Optional[_Entry]:
+        """The entry for key, fresh or stale, from memory or disk"""
+        now = time.time()
+        entry = self._get_memory(key, now)
+        if entry is None and self._conn is not None:
+            entry = self._get_disk(key, now)
+        return entry
+
+    async def aget(self, key: str) -> Optional[_Entry]:
+        """Coroutine version of `get`; reads the disk tier in a worker thread"""
+        now = time.time()
+        entry = self._get_memory(key, now)
+        if entry is None and self._conn is not None:
+            entry = await asyncio.to_thread(self._get_disk, key, now)
+        return entry
+
+    def set(self, key: str, tool: str, value: Any, ttl: float):
+        """Store a result in memory now, and on disk from the writer thread"""
+        entry = _Entry(json.dumps(value), time.time(), ttl)
+        with self._lock:
+            self._insert(key, entry)
+        if self._conn is not None:
+            self._writer.submit(self._write, key, tool, entry)
+
+    def _write(self, key: str, tool: str, entry: _Entry):
+        try:
+            with self._db_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, tool, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, tool, entry.value, entry.stored_at, entry.stored_at + entry.ttl),
+                )
+                self._writes += 1
+                prune = self._writes % 1000 == 0
+            if prune:
+                self.prune()
+        except sqlite3.Error as e:
+            print(f"Error writing cached {tool}: {e}")
+
+    def _insert(self, key: str, entry: _Entry):
+        if key in self._memory:
+            self._remove(key)
+        if entry.size > self.max_bytes:
+            return
+        self._memory[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._memory.pop(key)
+        self._bytes -= entry.size
+
+    def prune(self) -> int:
+        """Delete disk entries that are past their stale window"""
+        if self._conn is None:
+            return 0
+        with self._db_lock:
+            # expires_at is the end of the fresh period; keep the stale one
+            return self._conn.execute(
+                "DELETE FROM responses WHERE expires_at + (expires_at - stored_at) * ? < ?",
+                (self.stale_factor, time.time()),
+            ).rowcount
+
+    def is_fresh(self, entry: _Entry) -> bool:
+        return time.time() - entry.stored_at < entry.ttl
+
+    def record(self, tool: str, outcome: str):
+        with self._lock:
+            stats = self._tool(tool)
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    def _start_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def refresh(self, key: str, tool: str, ttl: float, call: Callable[[], Any]):
+        """Call the tool in a worker thread and store its result, once per key at a time"""
+        if not self._start_refresh(key):
+            return
+
+        def run():
+            try:
+                result = call()
+                if _cacheable(result):
+                    self.set(key, tool, result, ttl)
+            except Exception as e:
+                print(f"Error refreshing cached {tool}: {e}")
+            finally:
+                self._end_refresh(key)
+
+        self.record(tool, "refreshes")
+        # A fresh context, so cancelling the run that found the stale entry
+        # does not abort the refresh
+        self._refresher.submit(contextvars.Context().run, run)
+
+    def arefresh(self, key: str, tool: str, ttl: float, call: Callable[[], Any]):
+        """Coroutine version of `refresh`; runs the tool as a task on the current loop"""
+        if not self._start_refresh(key):
+            return
+
+        async def run():
+            try:
+                result = await call()
+                if _cacheable(result):
+                    self.set(key, tool, result, ttl)
+            except Exception as e:
+                print(f"Error refreshing cached {tool}: {e}")
+            finally:
+                self._end_refresh(key)
+
+        self.record(tool, "refreshes")
+        task = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        if self._conn is not None:
+            # After any writes still queued
+            self._writer.submit(self._clear_disk).result()
+
+    def _clear_disk(self):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            tools = {}
+            for tool, stats in self._stats.items():
+                served = stats.hits + stats.stale_hits
+                calls = served + stats.misses
+                tools[tool] = {
+                    "hits": stats.hits,
+                    "stale_hits": stats.stale_hits,
+                    "misses": stats.misses,
+                    "refreshes": stats.refreshes,
+                    "hit_ratio": round(served / calls, 4) if calls else None,
+                }
+            return {
+                "entries": len(self._memory),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "disk": self.path,
+                "disk_hits": self.disk_hits,
+                "refreshing": len(self._refreshing),
+                "tools": tools,
+            }
+
+
+def _cacheable(result: Any) -> bool:
+    """Whether a tool result is worth keeping; error messages and error bodies are not"""
+    if result is None:
+        return False
+    if isinstance(result, str) and result.startswith("Error"):
+        return False
+    # Provider error bodies sent with status 200: CryptoCompare's and GraphQL's
+    if isinstance(result, dict) and (result.get("Response") == "Error" or result.get("errors")):
+        return False
+    return True
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """The shared ResponseCache, created on first call"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+                path=os.getenv("RESPONSE_CACHE_DB") or None,
+                stale_factor=float(os.getenv("RESPONSE_CACHE_STALE_FACTOR", "1")),
+            )
+        return _cache
+
+
+def ttl_for(tool: str) -> float:
+    return float(os.getenv(f"CACHE_TTL_{tool.upper()}", str(TTLS.get(tool, 0))))
+
+
+def cached(name: Optional[str] = None):
+    """Serve a read-only tool's results from the response cache
+
+    The TTL comes from TTLS (or CACHE_TTL_<TOOL>) under the tool name, which
+    is the function name unless given, so a coroutine twin can share its sync
+    tool's entries. Put it above @single_flight, so concurrent misses still
+    make one provider call.
+    """
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        tool_name = name or func.__name__
+        signature = inspect.signature(func)
+        enabled = os.getenv("RESPONSE_CACHE", "true").lower() not in ("0", "false", "no")
+
+        def lookup(args, kwargs) -> Tuple[str, Optional[_Entry]]:
+            key = json.dumps(call_key(tool_name, signature, args, kwargs))
+            return key, get_cache().get(key)
+
+        async def alookup(args, kwargs) -> Tuple[str, Optional[_Entry]]:
+            key = json.dumps(call_key(tool_name, signature, args, kwargs))
+            return key, await get_cache().aget(key)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                ttl = ttl_for(tool_name)
+                if not enabled or ttl <= 0:
+                    return await func(*args, **kwargs)
+                cache = get_cache()
+                key, entry = await alookup(args, kwargs)
+                if entry is not None:
+                    if cache.is_fresh(entry):
+                        cache.record(tool_name, "hits")
+                    else:
+                        cache.record(tool_name, "stale_hits")
+                        cache.arefresh(key, tool_name, ttl, lambda: func(*args, **kwargs))
+                    return json.loads(entry.value)
+                cache.record(tool_name, "misses")
+                result = await func(*args, **kwargs)
+                if _cacheable(result):
+                    cache.set(key, tool_name, result, ttl)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ttl = ttl_for(tool_name)
+            if not enabled or ttl <= 0:
+                return func(*args, **kwargs)
+            cache = get_cache()
+            key, entry = lookup(args, kwargs)
+            if entry is not None:
+                if cache.is_fresh(entry):
+                    cache.record(tool_name, "hits")
+                else:
+                    cache.record(tool_name, "stale_hits")
+                    cache.refresh(key, tool_name, ttl, lambda: func(*args, **kwargs))
+                return json.loads(entry.value)
+            cache.record(tool_name, "misses")
+            result = func(*args, **kwargs)
+            if _cacheable(result):
+                cache.set(key, tool_name, result, ttl)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def stats() -> Optional[Dict[str, object]]:
+    return _cache.stats() if _cache is not None else None
@@ -0,0 +1,196 @@
+import asyncio
+import enum
+import functools
+import inspect
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .cancellation import RunCancelled, raise_if_cancelled
+
+
+class _Call:
+    """One upstream call that concurrent identical callers share"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one
+
+    The first caller for a key (the leader) runs the call; callers with the
+    same key that arrive while it is in flight wait for it and get the same
+    result, or the same exception. Nothing is cached once the call returns.
+
+    A follower still honours its own run's cancellation while it waits. If the
+    leader's run is cancelled, which aborts its HTTP request, the followers
+    are not: one of them runs the call again instead.
+    """
+
+    def __init__(self, poll_interval: float = 0.25):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # Calls made by coroutines, per event loop
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.shared_by_name: Dict[str, int] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], name: str = "") -> Any:
+        with self._lock:
+            self.calls += 1
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.executions += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                    return call.result
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+
+            while not call.done.wait(self.poll_interval):
+                raise_if_cancelled()
+            if isinstance(call.error, RunCancelled):
+                # The leader's run was cancelled, not ours; try again
+                raise_if_cancelled()
+                continue
+            self._count_shared(name)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]], name: str = "") -> Any:
+        """Coroutine version of `do`, for callers on the same event loop"""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        with self._lock:
+            self.calls += 1
+        while True:
+            with self._lock:
+                call = self._async_calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._async_calls[key] = loop.create_future()
+                    self.executions += 1
+
+            if leader:
+                try:
+                    call.set_result(await fn())
+                    return call.result()
+                except BaseException as e:
+                    # A cancelled leader makes a follower try again, as in `do`
+                    call.set_exception(RunCancelled(str(e)) if isinstance(e, asyncio.CancelledError) else e)
+                    # Mark it retrieved, in case there are no followers
+                    call.exception()
+                    raise
+                finally:
+                    with self._lock:
+                        del self._async_calls[key]
+
+            try:
+                result = await asyncio.shield(call)
+            except RunCancelled:
+                # The leader's run was cancelled, not ours; try again
+                raise_if_cancelled()
+                continue
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                self._count_shared(name)
+                raise
+            self._count_shared(name)
+            return result
+
+    def _count_shared(self, name: str):
+        with self._lock:
+            self.shared += 1
+            self.shared_by_name[name] = self.shared_by_name.get(name, 0) + 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "upstream_calls": self.executions,
+                "shared": self.shared,
+                "dedup_rate": self.shared / self.calls if self.calls else None,
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "shared_by_tool": dict(self.shared_by_name),
+            }
+
+
+def _normalize(value: Any) -> Any:
+    """A JSON-serializable form of a tool argument, equal for equal arguments"""
+    if isinstance(value, enum.Enum):
+        return _normalize(value.value)
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def call_key(name: str, signature: inspect.Signature, args: tuple, kwargs: dict) -> Tuple[str, str]:
+    """The tool name and its normalized arguments, with defaults filled in"""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return (name, json.dumps(_normalize(bound.arguments), sort_keys=True, default=str))
+
+
+_group = SingleFlight()
+
+
+def single_flight(name: Optional[str] = None):
+    """Share one upstream call between concurrent identical calls of a tool
+
+    The key is the tool name plus its normalized arguments, with defaults
+    filled in, so `fetch_price("ETH", ["USD"])` from many sessions at once
+    costs one provider request. Only use it on read-only tools. Coroutine
+    functions share calls with other coroutines on the same event loop.
+    """
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        tool_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        def key(args, kwargs):
+            return call_key(tool_name, signature, args, kwargs)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await _group.ado(key(args, kwargs), lambda: func(*args, **kwargs), tool_name)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return _group.do(key(args, kwargs), lambda: func(*args, **kwargs), tool_name)
+
+        return wrapper
+
+    return decorate
+
+
+def stats() -> Dict[str, object]:
+    return _group.stats()
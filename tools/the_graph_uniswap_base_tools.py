@@ -1,37 +1,64 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import os
-import requests
+from .provider_tool import request_tool
+from .resilience import async_provider_request, provider_request
+from .single_flight import single_flight
 import time
 import math
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Override the gateway with THE_GRAPH_GATEWAY_URL, e.g. to point at a local stand-in
+GRAPH_GATEWAY_URL = os.getenv("THE_GRAPH_GATEWAY_URL", "https://gateway.thegraph.com")
+UNISWAP_V3_SUBGRAPH_ID = "43Hwfi3dJSoGpyas9VwNoDAv55yjgGrPpNSmbQZArzMG"
+BUNNI_SUBGRAPH_ID = "3oawHiCt7L9wJTEY9DynwAEmoThy8bvRhuMZdaaAooqW"
+
 ###############################################
 # Helper Functions to Execute GraphQL Queries
 ###############################################
 
-def execute_graph_query(query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """
-    Executes a GraphQL query against the primary Uniswap V3 subgraph endpoint.
-    
-    The API key is read from the environment variable THE_GRAPH_API_KEY.
-    """
+def _subgraph_url(api_key: str, subgraph_id: str) -> str:
+    return f"{GRAPH_GATEWAY_URL}/api/{api_key}/subgraphs/id/{subgraph_id}"
+
+
+def _graph_endpoint() -> str:
+    """The primary Uniswap V3 subgraph endpoint; the API key is read from THE_GRAPH_API_KEY."""
     api_key = os.getenv("THE_GRAPH_API_KEY")
     if not api_key:
         raise Exception("Environment variable THE_GRAPH_API_KEY is not set.")
     
     # Primary DEX endpoint (Uniswap V3, for example)
-    endpoint = f"https://gateway.thegraph.com/api/{api_key}/subgraphs/id/43Hwfi3dJSoGpyas9VwNoDAv55yjgGrPpNSmbQZArzMG"
-    headers = {"Content-Type": "application/json"}
+    return _subgraph_url(api_key, UNISWAP_V3_SUBGRAPH_ID)
+
+
+def _graph_payload(query: str, variables: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
+    return payload
+
 
-    response = requests.post(endpoint, json=payload, headers=headers)
+def _graph_result(response) -> Union[Dict[str, Any], str]:
+    """The query result, or an error message if the gateway reported errors"""
     response.raise_for_status()
-    return response.json()
+    result = response.json()
+    # Query, indexing and gateway errors come back with status 200
+    errors = result.get("errors") if isinstance(result, dict) else None
+    if errors:
+        messages = "; ".join(error.get("message", str(error)) if isinstance(error, dict) else str(error) for error in errors)
+        return f"Error: The Graph returned errors: {messages}"
+    return result
+
+
+def execute_graph_query(query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Executes a GraphQL query against the primary Uniswap V3 subgraph endpoint.
+    
+    The API key is read from the environment variable THE_GRAPH_API_KEY.
+    """
+    return execute_graph_query_custom(query, _graph_endpoint(), variables)
 
 
 def execute_graph_query_custom(query: str, endpoint: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -41,12 +68,33 @@ def execute_graph_query_custom(query: str, endpoint: str, variables: Optional[Di
     Use this helper to query the secondary DEX subgraph.
     """
     headers = {"Content-Type": "application/json"}
-    payload = {"query": query}
-    if variables:
-        payload["variables"] = variables
-    response = requests.post(endpoint, json=payload, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    response = provider_request("graph", "POST", endpoint, json=_graph_payload(query, variables), headers=headers)
+    return _graph_result(response)
+
+
+async def aexecute_graph_query(query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Coroutine version of execute_graph_query.
+    """
+    return await aexecute_graph_query_custom(query, _graph_endpoint(), variables)
+
+
+async def aexecute_graph_query_custom(query: str, endpoint: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Coroutine version of execute_graph_query_custom.
+    """
+    headers = {"Content-Type": "application/json"}
+    response = await async_provider_request("graph", "POST", endpoint, json=_graph_payload(query, variables), headers=headers)
+    return _graph_result(response)
+
+
+def _graph_tool(name: str, input_class):
+    """A query tool and its coroutine twin, built from its input class's to_query"""
+    def build(**kwargs):
+        input_data = input_class(**kwargs)
+        return input_data.to_query(), input_data.variables
+
+    return request_tool(name, build, execute_graph_query, aexecute_graph_query, cache=True)
 
 
 def compute_price(sqrt_price_str: str) -> Optional[float]:
@@ -113,10 +161,7 @@ class GraphLargeSwapsInput(GraphQueryBase):
         print(query)
         return query
 
-def fetch_large_swaps(**kwargs) -> Dict[str, Any]:
-    input_data = GraphLargeSwapsInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_large_swaps, afetch_large_swaps = _graph_tool("fetch_large_swaps", GraphLargeSwapsInput)
 
 
 ###############################################
@@ -145,10 +190,7 @@ class GraphNewHighTVLPoolsInput(GraphQueryBase):
             f'}}'
         )
 
-def fetch_new_high_tvl_pools(**kwargs) -> Dict[str, Any]:
-    input_data = GraphNewHighTVLPoolsInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_new_high_tvl_pools, afetch_new_high_tvl_pools = _graph_tool("fetch_new_high_tvl_pools", GraphNewHighTVLPoolsInput)
 
 
 ###############################################
@@ -179,10 +221,7 @@ class GraphHighFeePoolsInput(GraphQueryBase):
         print(query)
         return query
 
-def fetch_high_fee_pools(**kwargs) -> Dict[str, Any]:
-    input_data = GraphHighFeePoolsInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_high_fee_pools, afetch_high_fee_pools = _graph_tool("fetch_high_fee_pools", GraphHighFeePoolsInput)
 
 
 ###############################################
@@ -210,10 +249,7 @@ class GraphUndervaluedTokensInput(GraphQueryBase):
             f'}}'
         )
 
-def fetch_undervalued_tokens(**kwargs) -> Dict[str, Any]:
-    input_data = GraphUndervaluedTokensInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_undervalued_tokens, afetch_undervalued_tokens = _graph_tool("fetch_undervalued_tokens", GraphUndervaluedTokensInput)
 
 
 ###############################################
@@ -242,10 +278,7 @@ class GraphWhaleAccumulationInput(GraphQueryBase):
             f'}}'
         )
 
-def fetch_whale_accumulation(**kwargs) -> Dict[str, Any]:
-    input_data = GraphWhaleAccumulationInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_whale_accumulation, afetch_whale_accumulation = _graph_tool("fetch_whale_accumulation", GraphWhaleAccumulationInput)
 
 
 ###############################################
@@ -271,10 +304,7 @@ class GraphSwapTrendsInput(GraphQueryBase):
             f'}}'
         )
 
-def fetch_swap_trends(**kwargs) -> Dict[str, Any]:
-    input_data = GraphSwapTrendsInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_swap_trends, afetch_swap_trends = _graph_tool("fetch_swap_trends", GraphSwapTrendsInput)
 
 
 ###############################################
@@ -300,10 +330,7 @@ class GraphGasFeesInput(GraphQueryBase):
             f'}}'
         )
 
-def fetch_gas_fees(**kwargs) -> Dict[str, Any]:
-    input_data = GraphGasFeesInput(**kwargs)
-    query = input_data.to_query()
-    return execute_graph_query(query, input_data.variables)
+fetch_gas_fees, afetch_gas_fees = _graph_tool("fetch_gas_fees", GraphGasFeesInput)
 
 
 ###############################################
@@ -345,6 +372,7 @@ class GraphArbitrageInput(GraphQueryBase):
             f'}}'
         )
 
+@single_flight()
 def fetch_arbitrage_opportunities(**kwargs) -> Dict[str, Any]:
     input_data = GraphArbitrageInput(**kwargs)
     query_uniswap = input_data.to_query_uniswap()
@@ -355,8 +383,8 @@ def fetch_arbitrage_opportunities(**kwargs) -> Dict[str, Any]:
         raise Exception("Environment variable THE_GRAPH_API_KEY is not set.")
     
     # Define the two endpoints:
-    uniswap_endpoint = f"https://gateway.thegraph.com/api/{api_key}/subgraphs/id/43Hwfi3dJSoGpyas9VwNoDAv55yjgGrPpNSmbQZArzMG"
-    bunni_endpoint = f"https://gateway.thegraph.com/api/{api_key}/subgraphs/id/3oawHiCt7L9wJTEY9DynwAEmoThy8bvRhuMZdaaAooqW"
+    uniswap_endpoint = _subgraph_url(api_key, UNISWAP_V3_SUBGRAPH_ID)
+    bunni_endpoint = _subgraph_url(api_key, BUNNI_SUBGRAPH_ID)
     
     result_uniswap = execute_graph_query_custom(query_uniswap, uniswap_endpoint, input_data.variables)
     result_bunni = execute_graph_query_custom(query_bunni, bunni_endpoint, input_data.variables)
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field
 from cdp import Wallet
 
+from .cancellation import raise_if_cancelled
+from .jobs import report_progress
+
 DEPLOY_MULTITOKEN_PROMPT = """
 This tool deploys a new multi-token contract with a specified base URI for token metadata.
 The base URI should be a template URL containing {id} which will be replaced with the token ID.
@@ -15,12 +18,13 @@ class DeployMultiTokenInput(BaseModel):
         "The base URI template for token metadata. Must contain {id} placeholder.",
         example="https://example.com/metadata/{id}.json")
 
-def deploy_multi_token(wallet: Wallet, base_uri: str) -> str:
+def deploy_multi_token(wallet: Wallet, base_uri: str, wallet_service=None) -> str:
     """Deploy a new multi-token contract with the specified base URI.
 
     Args:
         wallet (Wallet): The wallet to deploy the contract from.
         base_uri (str): The base URI template for token metadata. Must contain {id} placeholder.
+        wallet_service (WalletService | None): Shared wallet service; its cached balances are invalidated after the deployment.
 
     Returns:
         str: A message confirming deployment with the contract address.
@@ -29,8 +33,13 @@ def deploy_multi_token(wallet: Wallet, base_uri: str) -> str:
     if "{id}" not in base_uri:
         raise ValueError("base_uri must contain {id} placeholder")
 
-    # Deploy the contract
+    # Deploy the contract, unless the run was cancelled meanwhile
+    raise_if_cancelled()
+    report_progress("Deploying multi-token contract")
     deployed_contract = wallet.deploy_multi_token(base_uri)
+    report_progress("Waiting for the deployment to be confirmed")
     result = deployed_contract.wait()
+    if wallet_service is not None:
+        wallet_service.invalidate()
 
     return f"Successfully deployed multi-token contract at address: {result.contract_address}"
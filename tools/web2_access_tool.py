@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain_community.tools import DuckDuckGoSearchRun
+from .single_flight import single_flight
 
 class WebSearchInput(BaseModel):
     """Input argument schema for web search action."""
@@ -23,6 +23,7 @@ Input: {
 }
 """
 
+@single_flight()
 def web_search_tool(query: str) -> str:
     """Perform a web search using DuckDuckGo.
 
@@ -32,6 +33,9 @@ def web_search_tool(query: str) -> str:
     Returns:
         str: The search results.
     """
+    # langchain_community is slow to import, so load it on first use
+    from langchain_community.tools import DuckDuckGoSearchRun
+
     try:
         search = DuckDuckGoSearchRun()
         result = search.invoke(query)